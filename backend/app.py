@@ -1,16 +1,48 @@
-from flask import Flask
-from flask_cors import CORS
+import os
+import sys
 
-from routes.prices import prices_bp
-from routes.change_points import cp_bp
-from routes.events import events_bp
+# Make the analysis package (modules/) importable from the backend
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-app = Flask(__name__)
-CORS(app)
 
-app.register_blueprint(prices_bp)
-app.register_blueprint(cp_bp)
-app.register_blueprint(events_bp)
+def create_app():
+    """Build the Flask app, register every route and start warming up the regime detector."""
+    from flask import Flask
+    from flask_cors import CORS
+
+    from routes.prices import prices_bp
+    from routes.change_points import cp_bp
+    from routes.events import events_bp
+    from routes.regime import regime_bp, warm_up as warm_up_regime
+    from routes.features import features_bp
+    from routes.fits import fits_bp
+    from routes.panel import panel_bp
+    from routes.plots import plots_bp
+    from utils import http_cache
+
+    app = Flask(__name__)
+    CORS(app)
+    # Conditional GETs (ETag / 304) and a response body cache for read-only routes
+    http_cache.init_app(app)
+
+    app.register_blueprint(prices_bp)
+    app.register_blueprint(cp_bp)
+    app.register_blueprint(events_bp)
+    app.register_blueprint(regime_bp)
+    app.register_blueprint(features_bp)
+    app.register_blueprint(fits_bp)
+    app.register_blueprint(panel_bp)
+    app.register_blueprint(plots_bp)
+
+    # Replay the default regime detector over the price history off the request path
+    warm_up_regime()
+    return app
+
+
+# The fit job workers (modules.fit_jobs) are started with 'spawn', which re-runs
+# this file as __mp_main__ in every worker; they need none of the app
+if __name__ != "__mp_main__":
+    app = create_app()
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -1,17 +1,18 @@
 from flask import Blueprint, jsonify, request
 from utils.load_data import load_prices, load_events, load_trace
+from utils import serialization
 
 router = Blueprint("analysis", __name__)
 
 @router.route("/api/prices")
 def prices():
     df = load_prices()
-    return jsonify(df.to_dict(orient="records"))
+    return serialization.respond(serialization.frame_columns(df))
 
 @router.route("/api/events")
 def events():
     df = load_events()
-    return jsonify(df.to_dict(orient="records"))
+    return serialization.respond(serialization.frame_columns(df))
 
 @router.route("/api/change-points/<cp_type>")
 def change_points(cp_type):
@@ -1,48 +1,91 @@
 from flask import Blueprint, jsonify
-import arviz as az
+import json
 import os
-import numpy as np
-import pandas as pd
+import threading
+
+from modules.change_point_summary import TRACE_FILES, compile_trace_summary, is_stale, summary_path
+from utils import http_cache, loader
 
 cp_bp = Blueprint("change_points", __name__)
 MODEL_DIR = os.path.join(os.path.dirname(__file__), "../../models")
-DATA_DIR = os.path.join(os.path.dirname(__file__), "../../data")
 
-@cp_bp.route("/api/change_points/<string:type>", methods=["GET"])
-def get_change_points(type):
-    file_map = {
-        "mean": "trace_mean.nc",
-        "trend": "trace_trend.nc",
-        "var": "trace_var.nc"
-    }
-
-    filename = file_map.get(type)
-    if not filename:
-        return jsonify({"error": "Invalid change point type"}), 400
+# Serializes compiling summaries, so concurrent first requests read a trace once
+_compile_lock = threading.Lock()
+
+
+def _load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# Sidecar summaries are parsed once per file version, like the CSV datasets
+for _type, _filename in TRACE_FILES.items():
+    loader.registry.register(f"cp_{_type}", str(summary_path(os.path.join(MODEL_DIR, _filename))), _load_json)
+
+
+def _trace_path(type):
+    return os.path.join(MODEL_DIR, TRACE_FILES[type])
 
-    # Load full price data (to map indices to dates)
-    prices_path = os.path.join(DATA_DIR, "brent_prices.csv")
-    df_prices = pd.read_csv(prices_path)
-    df_prices.columns = [c.lower() for c in df_prices.columns]
-    df_prices["date"] = pd.to_datetime(df_prices["date"], format="%d-%b-%y", errors="coerce")
 
-    df_prices = df_prices.dropna(subset=["date"])
-    df_prices = df_prices.sort_values("date").reset_index(drop=True)
+def change_point_sources(type):
+    if type not in TRACE_FILES:
+        return None
+    trace_path = _trace_path(type)
+    sources = [loader.PRICES_FILE, str(summary_path(trace_path))]
+    # A replaced trace makes the summary stale, which changes the response
+    return sources + [trace_path] if os.path.exists(trace_path) else sources
 
-    path = os.path.join(MODEL_DIR, filename)
-    trace = az.from_netcdf(path)
 
-    if type == "mean":
-        idxs = trace.posterior["tau_pos"].values.flatten()
-    else:
-        idxs = trace.posterior["cp"].values.flatten()
+def _current_summary(type, trace_path, dates):
+    """The sidecar summary if it matches the trace and the prices, else None."""
+    try:
+        summary = loader.registry.get(f"cp_{type}")
+    except FileNotFoundError:
+        return None
+    return None if is_stale(summary, trace_path, dates) else summary
 
-    unique_idxs = np.unique(idxs).astype(int)
 
-    # Map indices to actual dates (as strings)
-    dates = []
-    for idx in unique_idxs:
-        if 0 <= idx < len(df_prices):
-            dates.append(df_prices.iloc[idx]["date"].strftime("%Y-%m-%d"))
+def load_change_point_summary(type):
+    """
+    Return the compiled summary of a trace, compiling it first if needed.
+
+    The summary is (re)compiled from the trace when it is missing, older than
+    the trace, or was mapped onto a price series of another length, and the
+    sidecar is written for later requests. Otherwise the NetCDF trace is never
+    opened here.
+
+    Raises:
+        FileNotFoundError: If the trace does not exist.
+    """
+    trace_path = _trace_path(type)
+    if not os.path.exists(trace_path):
+        raise FileNotFoundError(f"No {type} change point trace at {os.path.normpath(trace_path)}")
+
+    dates = loader.get_prices().index.values
+    summary = _current_summary(type, trace_path, dates)
+    if summary is not None:
+        return summary
+
+    with _compile_lock:
+        # Another request may have compiled it while we waited for the lock
+        summary = _current_summary(type, trace_path, dates)
+        if summary is None:
+            summary = compile_trace_summary(trace_path, dates)
+    return summary
+
+
+@cp_bp.route("/api/change_points/<string:type>", methods=["GET"])
+@http_cache.cacheable(change_point_sources)
+def get_change_points(type):
+    if type not in TRACE_FILES:
+        return jsonify({"error": "Invalid change point type"}), 400
+
+    try:
+        summary = load_change_point_summary(type)
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        print("Error in /api/change_points:", e)
+        return jsonify({"error": str(e)}), 500
 
-    return jsonify({"change_points": dates})
+    return jsonify({"change_points": summary["dates"], "summary": summary["change_points"]})
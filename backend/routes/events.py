@@ -1,41 +1,32 @@
 from flask import Blueprint, jsonify, request
-import pandas as pd
-import os
+
+from utils import http_cache, loader, serialization
 
 events_bp = Blueprint("events", __name__)
-DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data"))
 
 @events_bp.route("/api/events", methods=["GET"])
+@http_cache.cacheable(lambda: [loader.EVENTS_FILE])
 def get_events():
     try:
         start_date = request.args.get("start_date")
         end_date = request.args.get("end_date")
 
-        file_path = os.path.join(DATA_DIR, "key_events.csv")
-        df = pd.read_csv(file_path)
-
-        # Rename columns lowercase for consistency if needed
-        df.columns = [col.lower() for col in df.columns]
-
-        # The event CSV has columns: event, start_date, region, type, notes
-        df["start_date"] = pd.to_datetime(df["start_date"], format="%Y-%m-%d", errors="coerce")
+        # Parsed and sorted once per file version; never mutate the shared frame
+        df = loader.get_events()
 
-        df = df.dropna(subset=["start_date", "event"])
-
-        if start_date:
-            df = df[df["start_date"] >= pd.to_datetime(start_date)]
-        if end_date:
-            df = df[df["start_date"] <= pd.to_datetime(end_date)]
-
-        df = df.sort_values("start_date")
-        df["start_date"] = df["start_date"].dt.strftime("%Y-%m-%d")
+        df = loader.slice_dates(df, start_date, end_date)
 
         # Return only event and date (as start_date)
-        result = df[["start_date", "event", "notes"]].rename(columns={"start_date": "date"})
-
+        columns = {
+            "date": df.index.to_numpy(),
+            "event": df["event"].to_numpy(),
+            "notes": df["notes"].to_numpy(),
+        }
 
-        return jsonify(result.to_dict(orient="records"))
+        return serialization.respond(columns)
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print("Error in /api/events:", e)
         return jsonify({"error": str(e)}), 500
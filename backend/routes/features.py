@@ -0,0 +1,68 @@
+from flask import Blueprint, jsonify, request
+
+from modules.panel import select_assets
+from modules.time_series_utils import compute_features
+from utils import http_cache, loader, serialization
+
+features_bp = Blueprint("features", __name__)
+
+DEFAULT_WINDOW = 21
+DEFAULT_SPAN = 21
+# About 40 years of trading days
+MAX_WINDOW = 10_000
+FEATURES = ("log_return", "volatility", "zscore", "ewma_mean", "ewma_volatility", "drawdown")
+
+
+@features_bp.route("/api/features", methods=["GET"])
+@http_cache.cacheable(lambda: loader.panel_sources())
+def get_features():
+    """
+    Rolling features of the price series: log returns, rolling volatility and
+    z-score, EWMA mean / volatility of the returns and drawdown from the peak.
+    Brent by default; `asset` selects another asset of the price panel, over
+    the dates it has prices for.
+
+    Features are computed over the full history in O(n) and then sliced, so a
+    window starting before `start_date` still sees its earlier prices.
+    """
+    try:
+        asset = request.args.get("asset")
+        start_date = request.args.get("start_date")
+        end_date = request.args.get("end_date")
+        window = request.args.get("window", str(DEFAULT_WINDOW))
+        span = request.args.get("span", str(DEFAULT_SPAN))
+        annualize = request.args.get("annualize", "false").lower() in ("1", "true", "yes")
+        names = request.args.get("features")
+        names = FEATURES if names is None else tuple(name.strip() for name in names.split(",") if name.strip())
+
+        # Parsed here rather than with type=int / type=float, which drop malformed values silently
+        if not window.isdigit() or not 2 <= int(window) <= MAX_WINDOW:
+            return jsonify({"error": f"window must be an integer between 2 and {MAX_WINDOW}"}), 400
+        window = int(window)
+        try:
+            span = float(span)
+        except ValueError:
+            span = float("nan")
+        if not 0 < span <= MAX_WINDOW:
+            return jsonify({"error": f"span must be a number in (0, {MAX_WINDOW}]"}), 400
+        unknown = [name for name in names if name not in FEATURES]
+        if unknown or not names:
+            return jsonify({"error": f"Invalid features {unknown}, expected some of {list(FEATURES)}"}), 400
+
+        # Parsed and sorted once per file version; never mutate the shared frame
+        if asset is None:
+            prices = loader.get_prices()["price"]
+        else:
+            prices = select_assets(loader.get_panel(), [asset])[asset].dropna()
+        features = compute_features(prices.to_numpy(), window=window, span=span, annualize=annualize)
+
+        lo, hi = loader.date_bounds(prices.index.values, start_date, end_date)
+        columns = {"date": prices.index.values[lo:hi], "price": prices.to_numpy()[lo:hi]}
+        columns.update((name, features[name][lo:hi]) for name in names)
+        return serialization.respond(columns)
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("Error in /api/features:", e)
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,73 @@
+import threading
+
+from flask import Blueprint, jsonify, request
+
+from modules.fit_jobs import FitManager
+from modules.time_series_utils import log_returns
+from utils import loader
+
+fits_bp = Blueprint("fits", __name__)
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    """The process-wide fit manager; jobs interrupted by a restart are resubmitted on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = FitManager()
+            _manager.recover()
+        return _manager
+
+
+@fits_bp.route("/api/fits", methods=["POST"])
+def create_fit():
+    """
+    Queue a change point fit of the Brent log returns over a date range.
+
+    JSON body: model_type ('mean', 'trend' or 'var'), start_date, end_date,
+    inference ('nuts', or 'advi' / 'map' for trend and var), random_seed, and the model options
+    max_cp / min_dist / likelihood (mean) or marginalized (trend, var).
+    Identical requests return the same job: 202 while it is queued or
+    running, 200 once it is done.
+    """
+    try:
+        body = request.get_json(silent=True) or {}
+        body = dict(body) if isinstance(body, dict) else {}
+        model_type = body.pop("model_type", None)
+        start_date = body.pop("start_date", None)
+        end_date = body.pop("end_date", None)
+        if model_type is None:
+            return jsonify({"error": "model_type is required"}), 400
+
+        df = loader.slice_dates(loader.get_prices(), start_date, end_date)
+        # Returns are dated by the later of their two prices
+        returns = log_returns(df["price"].to_numpy())[1:]
+        dates = df.index.values[1:]
+
+        job, _ = get_manager().submit(model_type, returns, dates, body)
+        status = 200 if job["status"] == "done" else 202
+        response = jsonify(job)
+        response.headers["Location"] = f"/api/fits/{job['id']}"
+        return response, status
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("Error in /api/fits:", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@fits_bp.route("/api/fits/<string:job_id>", methods=["GET"])
+def get_fit(job_id):
+    try:
+        job = get_manager().get(job_id)
+        if job is None:
+            return jsonify({"error": f"No fit job '{job_id}'"}), 404
+        return jsonify(job)
+
+    except Exception as e:
+        print("Error in /api/fits:", e)
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,93 @@
+from flask import Blueprint, jsonify, request
+
+from modules.panel import OUTLIER_THRESHOLD, align_calendar, fill_gaps, preprocess_panel, select_assets
+from utils import http_cache, loader, serialization
+
+panel_bp = Blueprint("panel", __name__)
+
+FIELDS = ("price", "log_return")
+FREQUENCIES = ("B", "D")
+DEFAULT_FILL_LIMIT = 5
+
+
+def _optional_arg(name, default, type):
+    """Query arg `name` converted with `type`; 'none' gives None (no limit)."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return None if value.lower() == "none" else type(value)
+
+
+@panel_bp.route("/api/panel/assets", methods=["GET"])
+@http_cache.cacheable(lambda: loader.panel_sources())
+def get_panel_assets():
+    """Assets in the price panel with their first and last priced date."""
+    try:
+        panel = loader.get_panel()
+        assets = []
+        for asset in panel.columns:
+            dates = panel.index[panel[asset].notna().to_numpy()]
+            assets.append({
+                "asset": asset,
+                "start_date": dates[0].strftime("%Y-%m-%d") if len(dates) else None,
+                "end_date": dates[-1].strftime("%Y-%m-%d") if len(dates) else None,
+                "observations": int(len(dates)),
+            })
+        return jsonify(assets)
+
+    except Exception as e:
+        print("Error in /api/panel/assets:", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@panel_bp.route("/api/panel", methods=["GET"])
+@http_cache.cacheable(lambda: loader.panel_sources())
+def get_panel():
+    """
+    Prices or log returns of several assets on one shared date index.
+
+    Query args: assets (comma separated, default all), start_date, end_date,
+    field ('price' or 'log_return'), freq ('B', 'D' or 'none' for the assets'
+    own dates), fill_limit (longest gap forward-filled, 'none' for all) and,
+    for log returns, outlier_threshold (robust z-score, 'none' to keep all).
+    Each asset is a column named after it; dates an asset has no value for
+    are null. Preprocessing runs on the full history before slicing.
+    """
+    try:
+        start_date = request.args.get("start_date")
+        end_date = request.args.get("end_date")
+        field = request.args.get("field", "price")
+        freq = request.args.get("freq", "B")
+        fill_limit = _optional_arg("fill_limit", DEFAULT_FILL_LIMIT, int)
+        outlier_threshold = _optional_arg("outlier_threshold", OUTLIER_THRESHOLD, float)
+        assets = request.args.get("assets")
+        assets = None if assets is None else [asset.strip() for asset in assets.split(",") if asset.strip()]
+
+        if field not in FIELDS:
+            return jsonify({"error": f"field must be one of {list(FIELDS)}"}), 400
+        freq = None if freq.lower() == "none" else freq
+        if freq is not None and freq not in FREQUENCIES:
+            return jsonify({"error": f"freq must be one of {list(FREQUENCIES)} or 'none'"}), 400
+        if fill_limit is not None and fill_limit < 0:
+            return jsonify({"error": "fill_limit must be a non-negative integer or 'none'"}), 400
+
+        # Built once per version of the source files; never mutate the shared frame
+        panel = select_assets(loader.get_panel(), assets)
+        if field == "log_return":
+            panel = preprocess_panel(panel, freq=freq, fill_limit=fill_limit, outlier_threshold=outlier_threshold)
+            values = panel.to_numpy()
+        else:
+            panel = align_calendar(panel, freq)
+            values = fill_gaps(panel.to_numpy(), limit=fill_limit)
+
+        lo, hi = loader.date_bounds(panel.index.values, start_date, end_date)
+        columns = {"date": panel.index.values[lo:hi]}
+        columns.update((asset, values[lo:hi, i]) for i, asset in enumerate(panel.columns))
+        return serialization.respond(columns)
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("Error in /api/panel:", e)
+        return jsonify({"error": str(e)}), 500
+
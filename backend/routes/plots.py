@@ -0,0 +1,133 @@
+import os
+from pathlib import Path
+
+from flask import Blueprint, Response, jsonify, request
+
+from modules.change_point_summary import TRACE_FILES
+from modules.rendering import DEFAULT_DPI, FORMATS, render
+from modules.time_series_utils import log_returns
+from routes.change_points import MODEL_DIR, change_point_sources, load_change_point_summary
+from utils import http_cache, loader
+
+plots_bp = Blueprint("plots", __name__)
+
+PLOTS = ("prices", "change_points", "trace")
+MIN_DPI, MAX_DPI = 50, 300
+
+
+def _trace_path(type):
+    return os.path.join(MODEL_DIR, TRACE_FILES[type])
+
+
+def plot_sources(name):
+    if name not in PLOTS:
+        return None
+    if name == "prices":
+        return [loader.PRICES_FILE]
+    type = request.args.get("type", "mean")
+    if type not in TRACE_FILES:
+        return None
+    if name == "change_points":
+        # Drawn from the compiled summary
+        return change_point_sources(type)
+    return [loader.PRICES_FILE, _trace_path(type)]
+
+
+def _draw_prices(fig, lo, hi):
+    from modules.visualization import draw_price_and_log_returns
+
+    df = loader.get_prices()
+    # Returns over the full history, so the first date in range has one
+    returns = log_returns(df["price"].to_numpy())
+    draw_price_and_log_returns(fig, df.index[lo:hi], df["price"].to_numpy()[lo:hi], returns[lo:hi])
+
+
+def _draw_change_points(fig, type):
+    from modules.visualization import draw_change_point_histograms
+
+    # The compiled sidecar already holds the posterior index counts
+    summary = load_change_point_summary(type)
+    histogram = summary["histogram"]
+    draw_change_point_histograms(
+        fig,
+        [(f"{type} model", histogram["index"], histogram["count"])],
+        loader.get_prices().index,
+        title=f"Posterior Distribution of Change Points ({type} model)",
+        modes=[cp["mode_index"] for cp in summary["change_points"]],
+    )
+
+
+def _draw_trace(fig, type, var_names):
+    from modules.trace_store import load_posterior, open_posterior
+    from modules.visualization import draw_trace, trace_statistics
+
+    # Only the metadata is read to check the names
+    with open_posterior(_trace_path(type)) as dataset:
+        available = list(dataset.data_vars)
+    missing = [name for name in var_names or [] if name not in available]
+    if missing:
+        raise ValueError(f"Unknown variables {missing}. Available: {available}")
+    posterior = load_posterior(_trace_path(type), var_names)
+    draw_trace(fig, trace_statistics(posterior, list(posterior.data_vars)))
+
+
+@plots_bp.route("/api/plots/<string:name>", methods=["GET"])
+@http_cache.cacheable(plot_sources)
+def get_plot(name):
+    """
+    Render a plot as PNG or SVG, drawn once per version of its source files.
+
+    Plots: 'prices' (price and log returns; start_date, end_date),
+    'change_points' (posterior of a model's change points from its compiled
+    summary; type) and 'trace' (histogram and draws of the posterior
+    variables of a model; type, vars as a comma-separated list). Query args
+    common to all: format ('png' or 'svg') and dpi.
+    """
+    if name not in PLOTS:
+        return jsonify({"error": f"Unknown plot '{name}'. Expected one of {list(PLOTS)}"}), 404
+
+    try:
+        fmt = request.args.get("format", "png")
+        dpi = request.args.get("dpi", str(DEFAULT_DPI))
+        type = request.args.get("type", "mean")
+        if fmt not in FORMATS:
+            return jsonify({"error": f"format must be one of {list(FORMATS)}"}), 400
+        if not dpi.isdigit() or not MIN_DPI <= int(dpi) <= MAX_DPI:
+            return jsonify({"error": f"dpi must be an integer between {MIN_DPI} and {MAX_DPI}"}), 400
+        if name != "prices" and type not in TRACE_FILES:
+            return jsonify({"error": f"type must be one of {list(TRACE_FILES)}"}), 400
+
+        dpi = int(dpi)
+
+        # Renders are keyed by the source file versions, so no trace is read on a cache hit
+        sources = [Path(path) for path in plot_sources(name)]
+        if name == "prices":
+            # Keyed by the resolved positions, so equivalent date strings share a render
+            lo, hi = loader.date_bounds(
+                loader.get_prices().index.values, request.args.get("start_date"), request.args.get("end_date"),
+            )
+            body = render(
+                name, lambda fig: _draw_prices(fig, lo, hi),
+                key=(sources, lo, hi), fmt=fmt, figsize=(14, 6), dpi=dpi,
+            )
+        elif name == "change_points":
+            body = render(
+                f"{name}_{type}", lambda fig: _draw_change_points(fig, type),
+                key=sources, fmt=fmt, figsize=(12, 6), dpi=dpi,
+            )
+        else:
+            var_names = request.args.get("vars")
+            var_names = None if var_names is None else [v.strip() for v in var_names.split(",") if v.strip()]
+            body = render(
+                f"{name}_{type}", lambda fig: _draw_trace(fig, type, var_names),
+                key=(sources, var_names), fmt=fmt, dpi=dpi,
+            )
+        return Response(body, mimetype=FORMATS[fmt])
+
+    except FileNotFoundError as e:
+        return jsonify({"error": f"No data available for plot '{name}': {e}"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("Error in /api/plots:", e)
+        return jsonify({"error": str(e)}), 500
@@ -1,37 +1,73 @@
 from flask import Blueprint, jsonify, request
-import pandas as pd
-import os
+
+from modules.data_loader import PYRAMID_LEVELS
+from utils import downsampling, http_cache, loader, serialization
 
 prices_bp = Blueprint("prices", __name__)
-DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data"))
+RESOLUTIONS = ("daily",) + tuple(PYRAMID_LEVELS) + ("auto",)
+
 
 @prices_bp.route("/api/prices", methods=["GET"])
+@http_cache.cacheable(lambda: [loader.PRICES_FILE])
 def get_prices():
     try:
         start_date = request.args.get("start_date")
         end_date = request.args.get("end_date")
+        max_points = request.args.get("max_points")
+        method = request.args.get("method", "lttb")
+        resolution = request.args.get("resolution", "daily")
 
-        file_path = os.path.join(DATA_DIR, "brent_prices.csv")
-        df = pd.read_csv(file_path)
+        if method not in downsampling.METHODS:
+            return jsonify({"error": f"Invalid method, expected one of {list(downsampling.METHODS)}"}), 400
+        if max_points is not None:
+            # Parsed here rather than with type=int, which drops malformed values silently
+            if not max_points.isdigit() or int(max_points) < 3:
+                return jsonify({"error": "max_points must be an integer >= 3"}), 400
+            max_points = int(max_points)
+        if resolution not in RESOLUTIONS:
+            return jsonify({"error": f"Invalid resolution, expected one of {list(RESOLUTIONS)}"}), 400
+        if resolution == "auto" and max_points is None:
+            return jsonify({"error": "resolution=auto requires max_points"}), 400
 
-        # Rename columns to lowercase for consistency if needed
-        df.columns = [col.lower() for col in df.columns]
+        if resolution == "auto":
+            # A line of period closes drops the spikes and troughs inside each
+            # period; downsampling the daily series keeps them
+            resolution = "daily"
+        elif resolution != "daily":
+            # An explicit level is served in full for the range
+            max_points = None
 
-        df["date"] = pd.to_datetime(df["date"], format="%d-%b-%y", errors="coerce")
+        if resolution != "daily":
+            df = loader.slice_periods(loader.get_price_pyramid()[resolution], start_date, end_date)
+            # OHLC bars, not a price line: draw the high / low envelope
+            columns = {
+                "date": df.index.to_numpy(),
+                "open": df["open"].to_numpy(),
+                "high": df["high"].to_numpy(),
+                "low": df["low"].to_numpy(),
+                "close": df["close"].to_numpy(),
+                "mean": df["mean"].to_numpy(),
+                "volatility": df["volatility"].to_numpy(),
+            }
+        else:
+            # Parsed and sorted once per file version; never mutate the shared frame
+            df = loader.get_prices()
 
-        df["price"] = pd.to_numeric(df["price"], errors="coerce")
-        df = df.dropna(subset=["date", "price"])
+            df = loader.slice_dates(df, start_date, end_date)
 
-        if start_date:
-            df = df[df["date"] >= pd.to_datetime(start_date)]
-        if end_date:
-            df = df[df["date"] <= pd.to_datetime(end_date)]
+            dates = df.index.values
+            prices = df["price"].to_numpy()
+            if max_points is not None:
+                dates, prices = downsampling.downsample(dates, prices, max_points, method)
 
-        df = df.sort_values("date")
-        df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+            columns = {"date": dates, "price": prices}
 
-        return jsonify(df[["date", "price"]].to_dict(orient="records"))
+        response = serialization.respond(columns)
+        response.headers["X-Resolution"] = resolution
+        return response
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print("Error in /api/prices:", e)
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,169 @@
+import threading
+
+import numpy as np
+from flask import Blueprint, jsonify, request
+
+from modules.online_change_point import OnlineChangePointDetector
+from utils import http_cache, loader
+
+regime_bp = Blueprint("regime", __name__)
+
+# Hazards a client may request, one detector each. A detector replays the whole
+# price history when it is first built, so the set is fixed rather than keyed
+# on arbitrary floats.
+HAZARDS = (1 / 50, 1 / 100, 1 / 250, 1 / 500, 1 / 1000)
+DEFAULT_HAZARD = 1 / 250
+# Seconds a client is asked to wait while a detector is being built
+RETRY_AFTER = 5
+
+
+class RegimeSession:
+    """
+    Online change point detector fed from the price dataset.
+
+    Each request only pushes the prices appended since the previous one. A
+    full replay (first use, or earlier history changed) runs on a background
+    thread into a fresh detector, which replaces the current one when done, so
+    requests never wait on it.
+    """
+
+    def __init__(self, hazard):
+        self.hazard = hazard
+        self.lock = threading.Lock()
+        # None until the first replay finishes
+        self.detector = None
+        self.first_date = None
+        self.n_prices = 0
+        self.change_points = []
+        self._builder = None
+
+    def _new_detector(self):
+        return OnlineChangePointDetector(hazard=self.hazard, log_returns=True)
+
+    @staticmethod
+    def _push(detector, prices, change_points):
+        for date, value in zip(prices.index, prices.to_numpy()):
+            state = detector.push(value, date)
+            if state is not None and state["change_point"]:
+                change_points.append(_serialize(state))
+
+    def _seen(self, prices):
+        """Number of leading prices the detector has seen, or None if it must replay them all."""
+        if self.detector is None:
+            return None
+        dates = prices.index.values
+        if not len(dates):
+            return 0 if self.n_prices == 0 else None
+
+        seen = 0
+        if self.detector.last_date is not None:
+            seen = int(np.searchsorted(dates, self.detector.last_date.to_datetime64(), side="right"))
+        if dates[0] != self.first_date or seen != self.n_prices:
+            return None
+        return seen
+
+    def update(self, prices):
+        """
+        Advance the detector to the end of `prices`. Call with `lock` held.
+
+        Args:
+            prices (pd.Series): Price series with a sorted DatetimeIndex.
+
+        Returns:
+            bool: False if the detector needs a full replay, which is then
+                started in the background; the state is unchanged meanwhile.
+        """
+        seen = self._seen(prices)
+        if seen is None:
+            self.rebuild()
+            return False
+
+        self._push(self.detector, prices.iloc[seen:], self.change_points)
+        self.n_prices = len(prices)
+        return True
+
+    def rebuild(self):
+        """Replay the price history into a fresh detector on a background thread, unless one is running."""
+        if self._builder is not None and self._builder.is_alive():
+            return
+        self._builder = threading.Thread(target=self._replay, name=f"regime-{self.hazard:g}", daemon=True)
+        self._builder.start()
+
+    def _replay(self):
+        try:
+            prices = loader.get_prices()["price"]
+            detector, change_points = self._new_detector(), []
+            self._push(detector, prices, change_points)
+        except Exception as e:
+            print("Error building the regime detector:", e)
+            return
+
+        with self.lock:
+            self.detector, self.change_points = detector, change_points
+            self.first_date = prices.index.values[0] if len(prices) else None
+            self.n_prices = len(prices)
+
+
+_sessions = {hazard: RegimeSession(hazard) for hazard in HAZARDS}
+
+
+def get_session(hazard):
+    """
+    The session of one of HAZARDS.
+
+    Raises:
+        ValueError: If `hazard` is not (up to float rounding) one of HAZARDS.
+    """
+    for allowed, session in _sessions.items():
+        if np.isclose(hazard, allowed, rtol=1e-6, atol=0):
+            return session
+    raise ValueError(f"hazard must be one of {', '.join(f'{h:g}' for h in HAZARDS)}")
+
+
+def warm_up():
+    """Start building the default detector, so the first request finds it ready."""
+    get_session(DEFAULT_HAZARD).rebuild()
+
+
+def _serialize(state):
+    state = dict(state)
+    for key in ("date", "regime_start"):
+        if state[key] is not None:
+            state[key] = state[key].strftime("%Y-%m-%d")
+    return state
+
+
+@regime_bp.route("/api/regime", methods=["GET"])
+@http_cache.cacheable(lambda: [loader.PRICES_FILE])
+def get_regime():
+    try:
+        hazard = float(request.args.get("hazard", DEFAULT_HAZARD))
+        limit = request.args.get("limit", "20")
+
+        # Parsed here rather than with type=int, which drops malformed values silently
+        if not limit.isdigit():
+            return jsonify({"error": "limit must be an integer >= 0"}), 400
+        limit = int(limit)
+
+        session = get_session(hazard)
+        with session.lock:
+            if not session.update(loader.get_prices()["price"]):
+                response = jsonify({"error": "The regime detector is being built; retry shortly"})
+                response.headers["Retry-After"] = str(RETRY_AFTER)
+                return response, 503
+
+            state = session.detector.state
+            change_points = session.change_points[-limit:] if limit else []
+
+            return jsonify({
+                "hazard": session.hazard,
+                "n_observations": session.detector.n_observations,
+                "state": None if state is None else _serialize(state),
+                "change_points": change_points,
+            })
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("Error in /api/regime:", e)
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,151 @@
+import numpy as np
+
+METHODS = ("lttb", "minmax", "mean")
+
+
+def _bucket_edges(start, stop, n_buckets):
+    # Contiguous, non-empty buckets covering [start, stop)
+    return np.linspace(start, stop, n_buckets + 1).astype(np.int64)
+
+
+def lttb_indices(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets point selection.
+
+    The first and last points are always kept. Every bucket in between keeps
+    the point forming the largest triangle with the previously selected point
+    and the mean of the next bucket, which preserves visual peaks and troughs.
+    Each bucket is scored with a single vectorized expression, so the Python
+    loop runs once per output point rather than once per input point.
+
+    Args:
+        x (np.ndarray): Monotonic x coordinates (float64).
+        y (np.ndarray): Values (float64).
+        max_points (int): Number of points to keep (>= 3).
+
+    Returns:
+        np.ndarray: Sorted indices of the selected points.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    edges = _bucket_edges(1, n - 1, max_points - 2)
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+
+    avg_x = np.add.reduceat(x[1:n - 1], starts - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], starts - 1) / counts
+    # The bucket after the last one is the final point itself
+    avg_x = np.append(avg_x[1:], x[-1])
+    avg_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(len(starts)):
+        lo, hi = starts[i], ends[i]
+        area = np.abs(
+            (x[a] - avg_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(y, max_points):
+    """
+    Keep the minimum and maximum of each bucket, plus both end points.
+
+    Guarantees that every local extreme at bucket resolution survives, so the
+    envelope of the series is exact. Fully vectorized with ufunc.reduceat.
+
+    Args:
+        y (np.ndarray): Values (float64).
+        max_points (int): Upper bound on the number of points kept (>= 2).
+
+    Returns:
+        np.ndarray: Sorted, unique indices of the selected points.
+    """
+    n = len(y)
+    n_buckets = (max_points - 2) // 2
+    if max_points >= n:
+        return np.arange(n)
+    if n_buckets < 1:
+        return np.array([0, n - 1])
+
+    edges = _bucket_edges(0, n, n_buckets)
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+
+    mins = np.minimum.reduceat(y, starts)
+    maxs = np.maximum.reduceat(y, starts)
+
+    # First position in each bucket that attains the bucket min / max
+    at_min = np.flatnonzero(y == mins[bucket])
+    at_max = np.flatnonzero(y == maxs[bucket])
+    _, first_min = np.unique(bucket[at_min], return_index=True)
+    _, first_max = np.unique(bucket[at_max], return_index=True)
+
+    return np.unique(np.concatenate(([0, n - 1], at_min[first_min], at_max[first_max])))
+
+
+def mean_buckets(y, max_points):
+    """
+    Average each bucket.
+
+    Smooths the series; unlike `lttb` and `minmax` it does not preserve
+    extremes, so it is only suitable for overview charts.
+
+    Args:
+        y (np.ndarray): Values (float64).
+        max_points (int): Number of buckets.
+
+    Returns:
+        tuple: (bucket start indices, bucket means).
+    """
+    n = len(y)
+    if max_points >= n or max_points < 1:
+        return np.arange(n), y
+
+    edges = _bucket_edges(0, n, max_points)
+    starts = edges[:-1]
+    means = np.add.reduceat(y, starts) / np.diff(edges)
+    return starts, means
+
+
+def downsample(dates, values, max_points, method="lttb"):
+    """
+    Reduce a date-indexed series to at most `max_points` points.
+
+    Args:
+        dates (np.ndarray): Sorted datetime64 array.
+        values (np.ndarray): Values aligned with `dates`.
+        max_points (int): Maximum number of points to return.
+        method (str): One of 'lttb', 'minmax' or 'mean'. 'mean' buckets are
+            labelled with the first date of each bucket.
+
+    Returns:
+        tuple: (datetime64 array, float64 array) of the reduced series.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'. Expected one of {METHODS}.")
+
+    values = np.asarray(values, dtype=np.float64)
+    if max_points >= len(values):
+        return dates, values
+
+    if method == "mean":
+        idx, reduced = mean_buckets(values, max_points)
+        return dates[idx], reduced
+
+    if method == "minmax":
+        idx = minmax_indices(values, max_points)
+    else:
+        ticks = dates.astype("datetime64[s]").astype(np.int64)
+        idx = lttb_indices((ticks - ticks[0]).astype(np.float64), values, max_points)
+
+    return dates[idx], values[idx]
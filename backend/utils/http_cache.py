@@ -0,0 +1,152 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import Response, current_app, g, request
+
+from utils.loader import file_signature
+
+# Browsers may keep the body but must revalidate it; revalidation is a 304
+CACHE_CONTROL = "public, no-cache"
+
+# Request headers that change the response body (see utils.serialization)
+VARY_HEADERS = ("Accept", "Accept-Encoding")
+
+
+def cacheable(sources):
+    """
+    Mark a read-only view as cacheable.
+
+    Args:
+        sources (callable): Called with the view's URL arguments; returns the
+            list of files the response is derived from, or None if the request
+            should not be cached (e.g. an unknown resource).
+    """
+    def decorator(view):
+        view.cache_sources = sources
+        return view
+    return decorator
+
+
+def version_token(paths):
+    """
+    Version token for a response derived from `paths`.
+
+    Combines the stat signature of every source file with the endpoint, path
+    (URL arguments included), query string and the request headers the body
+    varies on. Costs one os.stat per
+    source file; nothing is parsed.
+
+    Returns:
+        str or None: Hex digest, or None if a source file is missing.
+    """
+    digest = hashlib.sha1(f"{request.endpoint}|{request.path}".encode("utf-8"))
+    try:
+        for path in paths:
+            mtime_ns, size = file_signature(path)
+            digest.update(f"|{path}:{mtime_ns}:{size}".encode("utf-8"))
+    except OSError:
+        return None
+
+    for key, value in sorted(request.args.items(multi=True)):
+        digest.update(f"|{key}={value}".encode("utf-8"))
+    for header in VARY_HEADERS:
+        digest.update(f"|{header}:{request.headers.get(header, '')}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of serialized response bodies keyed by version token.
+
+    Bounded both by number of entries and by total body size.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self._bytes = 0
+
+    def get(self, token):
+        with self._lock:
+            item = self._items.get(token)
+            if item is not None:
+                self._items.move_to_end(token)
+            return item
+
+    def put(self, token, body, status, headers):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(token, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._items[token] = (body, status, headers)
+            self._bytes += len(body)
+            while len(self._items) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _, _) = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+def _before_request():
+    if request.method not in ("GET", "HEAD"):
+        return None
+
+    view = current_app.view_functions.get(request.endpoint)
+    sources = getattr(view, "cache_sources", None)
+    if sources is None:
+        return None
+
+    paths = sources(**(request.view_args or {}))
+    token = version_token(paths) if paths is not None else None
+    if token is None:
+        return None
+    g.cache_token = token
+
+    if request.if_none_match.contains(token):
+        g.cache_hit = True
+        response = Response(status=304)
+        response.set_etag(token)
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        response.vary.update(VARY_HEADERS)
+        return response
+
+    cached = current_app.extensions["http_cache"].get(token)
+    if cached is not None:
+        g.cache_hit = True
+        body, status, headers = cached
+        return Response(body, status=status, headers=headers)
+    return None
+
+
+def _after_request(response):
+    token = g.get("cache_token")
+    if token is None or g.get("cache_hit") or response.status_code != 200 or response.is_streamed:
+        return response
+
+    response.set_etag(token)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.vary.update(VARY_HEADERS)
+    # CORS and other hooks registered on the app run on cached responses again
+    current_app.extensions["http_cache"].put(
+        token, response.get_data(), response.status_code, list(response.headers.items())
+    )
+    return response
+
+
+def init_app(app, max_entries=256, max_bytes=64 * 1024 * 1024):
+    """
+    Install ETag / If-None-Match handling and the response body cache.
+
+    Only views decorated with `cacheable` are affected.
+    """
+    app.extensions["http_cache"] = ResponseCache(max_entries, max_bytes)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
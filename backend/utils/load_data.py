@@ -1,15 +1,37 @@
-import pandas as pd
-import xarray as xr
 import os
 
+from utils import loader
+
+MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../models"))
+
+# Posterior variables the routes read from a trace
+TRACE_VARS = ("tau_pos", "cp", "mu")
+
 def load_prices():
-    return pd.read_csv("../data/brent_prices.csv", parse_dates=["date"])
+    """Prices as 'date' and 'price' columns, from the shared parsed dataset."""
+    return loader.get_prices().reset_index()
 
 def load_events():
-    return pd.read_csv("../data/key_events.csv", parse_dates=["date"])
+    """Events with a 'date' column (the start date), from the shared parsed dataset."""
+    return loader.get_events().reset_index()
+
+def load_trace(trace_type, var_names=TRACE_VARS):
+    """
+    Read posterior variables of a change point trace.
+
+    Only the posterior group is opened and only `var_names` are read, so the
+    log_likelihood / posterior_predictive groups never reach memory.
+
+    Args:
+        trace_type (str): 'mean', 'trend' or 'var'.
+        var_names (list): Posterior variables to read; missing ones are skipped.
+
+    Returns:
+        xr.Dataset: The requested posterior variables.
+    """
+    from modules.trace_store import load_posterior
 
-def load_trace(trace_type):
-    trace_path = f"models/trace_{trace_type}.nc"
+    trace_path = os.path.join(MODEL_DIR, f"trace_{trace_type}.nc")
     if not os.path.exists(trace_path):
         raise FileNotFoundError(f"{trace_path} not found.")
-    return xr.load_dataset(trace_path)
+    return load_posterior(trace_path, var_names)
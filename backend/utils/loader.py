@@ -0,0 +1,276 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import build_price_pyramid
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data"))
+PRICES_FILE = os.path.join(DATA_DIR, "brent_prices.csv")
+EVENTS_FILE = os.path.join(DATA_DIR, "key_events.csv")
+# Optional long-format (date, asset, price) prices of further assets
+PANEL_FILE = os.path.join(DATA_DIR, "price_panel.csv")
+
+
+def file_signature(path):
+    """
+    Cheap change detector for a file on disk.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        tuple: (mtime in nanoseconds, size in bytes).
+    """
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def parse_prices(path):
+    """
+    Read the Brent prices through their validated columnar cache (modules.ingest).
+
+    Args:
+        path (str): Path to brent_prices.csv.
+
+    Returns:
+        pd.DataFrame: Frame with a datetime64 'date' index and a float64 'price' column.
+    """
+    from modules.ingest import load_dataset
+
+    return load_dataset("prices", path).set_index("date")
+
+
+def parse_events(path):
+    """
+    Read the key events through their validated columnar cache (modules.ingest).
+
+    Args:
+        path (str): Path to key_events.csv.
+
+    Returns:
+        pd.DataFrame: Frame with a datetime64 'date' index (the event start date)
+            and the remaining event columns in lowercase.
+    """
+    from modules.ingest import load_dataset
+
+    return load_dataset("events", path).rename(columns={"start_date": "date"}).set_index("date")
+
+
+def parse_panel(path):
+    """
+    Read the asset price panel file through its columnar cache (modules.ingest).
+
+    Args:
+        path (str): Path to price_panel.csv.
+
+    Returns:
+        pd.DataFrame: Panel with a 'date' index and one float64 column per asset
+            (see modules.panel).
+    """
+    from modules.ingest import load_dataset
+    from modules.panel import panel_from_long
+
+    return panel_from_long(load_dataset("asset_prices", path))
+
+
+def date_bounds(dates, start_date=None, end_date=None):
+    """
+    Locate an inclusive date range in a sorted datetime64 array by binary search.
+
+    Args:
+        dates (np.ndarray): Sorted datetime64 array.
+        start_date (str, optional): Lower bound (inclusive); open if None.
+        end_date (str, optional): Upper bound (inclusive); open if None.
+
+    Returns:
+        tuple: (lo, hi) positions such that dates[lo:hi] lies in the range.
+    """
+    lo, hi = 0, len(dates)
+    if start_date:
+        lo = int(np.searchsorted(dates, pd.Timestamp(start_date).to_datetime64(), side="left"))
+    if end_date:
+        hi = int(np.searchsorted(dates, pd.Timestamp(end_date).to_datetime64(), side="right"))
+    return lo, max(lo, hi)
+
+
+def slice_dates(df, start_date=None, end_date=None):
+    """
+    Slice a frame with a sorted datetime index to an inclusive date range.
+
+    Costs O(log n) for the bounds plus O(k) for the k rows returned, and
+    returns a positional slice of `df` rather than a filtered copy.
+
+    Args:
+        df (pd.DataFrame): Frame with a sorted DatetimeIndex.
+        start_date (str, optional): Lower bound (inclusive).
+        end_date (str, optional): Upper bound (inclusive).
+
+    Returns:
+        pd.DataFrame: Rows of `df` within the range, in date order.
+    """
+    lo, hi = date_bounds(df.index.values, start_date, end_date)
+    return df.iloc[lo:hi]
+
+
+def slice_periods(df, start_date=None, end_date=None):
+    """
+    Slice an aggregate level (indexed by period start) to the periods that
+    overlap an inclusive date range.
+
+    Args:
+        df (pd.DataFrame): Pyramid level with a sorted DatetimeIndex of period starts.
+        start_date (str, optional): Lower bound (inclusive).
+        end_date (str, optional): Upper bound (inclusive).
+
+    Returns:
+        pd.DataFrame: Rows of `df` whose period overlaps the range.
+    """
+    starts = df.index.values
+    lo, hi = date_bounds(starts, None, end_date)
+    if start_date:
+        # The period containing start_date began on or before it
+        lo = max(0, int(np.searchsorted(starts, pd.Timestamp(start_date).to_datetime64(), side="right")) - 1)
+    return df.iloc[lo:max(lo, hi)]
+
+
+class DatasetRegistry:
+    """
+    Process-wide registry of parsed datasets.
+
+    Each dataset is parsed once and kept in memory. A request only pays for an
+    os.stat of the source file; the file is parsed again when its mtime or size
+    changes. Reloads are serialized with a lock so that concurrent requests in a
+    threaded server never parse the same file twice.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources = {}
+        self._entries = {}
+
+    def register(self, name, path, parser):
+        """
+        Register a dataset.
+
+        Args:
+            name (str): Dataset name used by `get`.
+            path (str): Source file on disk.
+            parser (callable): Function mapping the path to a parsed object.
+        """
+        with self._lock:
+            self._sources[name] = (path, parser)
+            self._entries.pop(name, None)
+
+    def path(self, name):
+        return self._sources[name][0]
+
+    def _entry(self, name):
+        path, parser = self._sources[name]
+        signature = file_signature(path)
+
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == signature:
+            return entry
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            entry = self._entries.get(name)
+            signature = file_signature(path)
+            if entry is not None and entry[0] == signature:
+                return entry
+
+            entry = (signature, parser(path), {})
+            self._entries[name] = entry
+            return entry
+
+    def get(self, name):
+        """
+        Return the parsed dataset, reloading it if the source file changed.
+
+        Args:
+            name (str): Registered dataset name.
+
+        Returns:
+            object: Whatever the registered parser returned.
+        """
+        return self._entry(name)[1]
+
+    def get_derived(self, name, key, builder):
+        """
+        Return an object computed from a dataset, cached per dataset version.
+
+        The derived object is built at most once per version of the source file
+        and is dropped together with the dataset when the file changes.
+
+        Args:
+            name (str): Registered dataset name.
+            key (str): Name of the derived object.
+            builder (callable): Function mapping the parsed dataset to the object.
+
+        Returns:
+            object: Whatever `builder` returned.
+        """
+        _, data, derived = self._entry(name)
+        if key in derived:
+            return derived[key]
+
+        with self._lock:
+            if key not in derived:
+                derived[key] = builder(data)
+            return derived[key]
+
+
+registry = DatasetRegistry()
+registry.register("prices", PRICES_FILE, parse_prices)
+registry.register("events", EVENTS_FILE, parse_events)
+registry.register("panel", PANEL_FILE, parse_panel)
+
+
+def get_prices():
+    return registry.get("prices")
+
+
+def get_events():
+    return registry.get("events")
+
+
+def get_price_pyramid():
+    """
+    Weekly, monthly, quarterly and yearly aggregates of the price series.
+
+    Built once per version of the price file; see
+    modules.data_loader.build_price_pyramid.
+    """
+    return registry.get_derived("prices", "pyramid", lambda df: build_price_pyramid(df["price"]))
+
+
+def panel_sources():
+    """Files the price panel is built from (for utils.http_cache)."""
+    return [PRICES_FILE] + ([PANEL_FILE] if os.path.exists(PANEL_FILE) else [])
+
+
+def get_panel():
+    """
+    Price panel of Brent plus every asset in the optional panel file.
+
+    Brent comes from the price file unless the panel file has a 'brent'
+    asset. Without a panel file the panel holds Brent alone. Built once per
+    version of both files.
+
+    Returns:
+        pd.DataFrame: Panel with a 'date' index and one column per asset.
+    """
+    from modules.panel import build_panel
+
+    def with_brent(assets):
+        series = {} if "brent" in assets.columns else {"brent": get_prices()["price"]}
+        series.update(assets.items())
+        return build_panel(series)
+
+    if not os.path.exists(PANEL_FILE):
+        return registry.get_derived("prices", "panel", lambda df: with_brent(pd.DataFrame()))
+    # Keyed by the price file version as well, since Brent comes from there
+    key = ("panel", file_signature(PRICES_FILE))
+    return registry.get_derived("panel", key, with_brent)
@@ -0,0 +1,156 @@
+import gzip
+import json
+
+import numpy as np
+from flask import Response, request
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow responses are optional
+    pa = None
+
+try:
+    import brotli
+except ImportError:  # Fall back to gzip only
+    brotli = None
+
+FORMATS = ("records", "columnar", "arrow")
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def frame_columns(df, index_name=None):
+    """
+    Turn a DataFrame into a dict of column arrays without copying row-wise.
+
+    Args:
+        df (pd.DataFrame): Source frame.
+        index_name (str, optional): If given, the index is emitted first under this name.
+
+    Returns:
+        dict: Column name -> np.ndarray.
+    """
+    columns = {}
+    if index_name is not None:
+        columns[index_name] = df.index.to_numpy()
+    for col in df.columns:
+        columns[col] = df[col].to_numpy()
+    return columns
+
+
+def _json_values(values):
+    """Convert a column to a JSON-ready list (ISO dates, NaN -> null)."""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return np.datetime_as_string(values, unit="D").tolist()
+    if np.issubdtype(values.dtype, np.floating):
+        if np.isnan(values).any():
+            return np.where(np.isnan(values), None, values).tolist()
+        return values.tolist()
+    if values.dtype == object:
+        return [None if v is None or v != v else v for v in values.tolist()]
+    return values.tolist()
+
+
+def to_columnar_json(columns):
+    """
+    Serialize columns as {"col": [...], ...}.
+
+    Each column is converted with one vectorized tolist() call, so no
+    per-row Python objects are created.
+    """
+    payload = {name: _json_values(values) for name, values in columns.items()}
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def to_records_json(columns):
+    """Serialize columns as [{"col": value, ...}, ...] (the original API shape)."""
+    names = list(columns)
+    lists = [_json_values(columns[name]) for name in names]
+    payload = [dict(zip(names, row)) for row in zip(*lists)]
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def to_arrow_ipc(columns):
+    """
+    Serialize columns as an Apache Arrow IPC stream.
+
+    Numeric columns are handed to Arrow as NumPy buffers; dates become date32.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+
+    arrays = {}
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if np.issubdtype(values.dtype, np.datetime64):
+            values = values.astype("datetime64[D]")
+        arrays[name] = pa.array(values, from_pandas=True)
+    table = pa.table(arrays)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def negotiate_format():
+    """Pick the body format from ?format= or the Accept header (default: records)."""
+    fmt = request.args.get("format")
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"Invalid format, expected one of {list(FORMATS)}")
+        if fmt == "arrow" and pa is None:
+            raise ValueError("format=arrow is unavailable: pyarrow is not installed")
+        return fmt
+    if pa is not None and request.accept_mimetypes.best_match([ARROW_MIMETYPE, "application/json"]) == ARROW_MIMETYPE:
+        return "arrow"
+    return "records"
+
+
+def negotiate_encoding():
+    """Pick a content encoding from Accept-Encoding (br > gzip > identity)."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=5)
+    return body
+
+
+def respond(columns, status=200):
+    """
+    Build a Flask response for tabular data using content negotiation.
+
+    Args:
+        columns (dict): Column name -> np.ndarray, all of the same length.
+        status (int): HTTP status code.
+
+    Returns:
+        flask.Response: Records or columnar JSON, or Arrow IPC, optionally
+            compressed with brotli or gzip.
+    """
+    fmt = negotiate_format()
+    if fmt == "arrow":
+        body, mimetype = to_arrow_ipc(columns), ARROW_MIMETYPE
+    elif fmt == "columnar":
+        body, mimetype = to_columnar_json(columns), "application/json"
+    else:
+        body, mimetype = to_records_json(columns), "application/json"
+
+    encoding = negotiate_encoding() if len(body) >= MIN_COMPRESS_BYTES else None
+    response = Response(compress(body, encoding), status=status, mimetype=mimetype)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.update(("Accept", "Accept-Encoding"))
+    return response
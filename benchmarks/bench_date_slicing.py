@@ -0,0 +1,67 @@
+"""
+Benchmark date-range queries on the price series.
+
+Compares the previous mask-and-sort filtering in /api/prices against the
+searchsorted slicing in backend/utils/loader.py for narrow and wide windows.
+
+Usage:
+    python benchmarks/bench_date_slicing.py [--rows 9000] [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+from utils.loader import slice_dates  # noqa: E402
+
+
+def make_prices(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("1987-05-20", periods=rows)
+    prices = np.exp(3 + np.cumsum(rng.normal(0, 0.02, rows)))
+    return pd.DataFrame({"price": prices}, index=pd.DatetimeIndex(dates, name="date"))
+
+
+def mask_query(df, start_date, end_date):
+    # The pre-registry implementation: boolean masks, then a full sort
+    df = df.reset_index()
+    df = df[df["date"] >= pd.to_datetime(start_date)]
+    df = df[df["date"] <= pd.to_datetime(end_date)]
+    return df.sort_values("date")
+
+
+def searchsorted_query(df, start_date, end_date):
+    return slice_dates(df, start_date, end_date)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=9000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    df = make_prices(args.rows)
+    first, last = df.index[0], df.index[-1]
+    windows = {
+        "narrow (1 month)": (first + (last - first) / 2, first + (last - first) / 2 + pd.Timedelta(days=30)),
+        "wide (full history)": (first, last),
+    }
+
+    print(f"rows={args.rows} repeat={args.repeat}")
+    print(f"{'window':<22}{'mask+sort ms':>14}{'searchsorted ms':>17}{'speedup':>10}")
+    for label, (start, end) in windows.items():
+        start, end = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+        assert len(mask_query(df, start, end)) == len(searchsorted_query(df, start, end))
+
+        t_mask = timeit.timeit(lambda: mask_query(df, start, end), number=args.repeat) / args.repeat
+        t_fast = timeit.timeit(lambda: searchsorted_query(df, start, end), number=args.repeat) / args.repeat
+        print(f"{label:<22}{t_mask * 1e3:>14.3f}{t_fast * 1e3:>17.3f}{t_mask / t_fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark cold-start import time and check it for regressions.
+
+Imports each entry point in a fresh interpreter under `python -X importtime`
+and reports the cumulative import time of the entry module plus any heavy
+package it pulled in. The serving path (the Flask app) and the EDA path
+(main.py) must import only numpy, pandas and Flask: PyMC, pytensor, ArviZ,
+xarray, SciPy, statsmodels and matplotlib are loaded inside the functions
+that use them. The change point model module, which needs the full stack, is
+reported for reference.
+
+Exits with status 1 when a checked entry point imports a heavy package or
+takes longer than its budget. tests/test_import_time.py runs the same check
+under pytest (scale the budgets with IMPORT_BUDGET_SCALE on slow runners).
+
+Usage:
+    python benchmarks/bench_import_time.py [--repeat 3] [--budget-scale 1.0]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Packages the serving and EDA paths must not import at start-up
+HEAVY = ("pymc", "pytensor", "aesara", "arviz", "xarray", "h5netcdf", "netCDF4", "scipy", "statsmodels", "matplotlib")
+
+# name: (working directory, module to import, budget in seconds or None to only report)
+ENTRY_POINTS = {
+    "backend app": (os.path.join(ROOT, "backend"), "app", 1.5),
+    "main.py": (ROOT, "main", 1.0),
+    "time_series_utils": (ROOT, "modules.time_series_utils", 0.5),
+    "online_change_point": (ROOT, "modules.online_change_point", 0.5),
+    "change_point_summary": (ROOT, "modules.change_point_summary", 1.0),
+    "visualization": (ROOT, "modules.visualization", 1.0),
+    "change_point_model": (ROOT, "modules.change_point_model", None),
+}
+
+LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(cwd, module):
+    """
+    Import `module` in a fresh interpreter under -X importtime.
+
+    Returns:
+        tuple: (cumulative seconds of `module`, set of imported module names).
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (ROOT, os.environ.get("PYTHONPATH")))))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    seconds, imported = None, set()
+    for match in LINE.finditer(result.stderr):
+        cumulative, indent, name = match.groups()
+        imported.add(name)
+        if name == module and len(indent) == 1:
+            seconds = int(cumulative) / 1e6
+    return seconds, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per entry point; the fastest is kept")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every budget (slow machines)")
+    parser.add_argument("--entry-points", nargs="+", default=list(ENTRY_POINTS), choices=list(ENTRY_POINTS))
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'entry point':<22}{'import':>9}{'budget':>9}  heavy packages")
+    for name in args.entry_points:
+        cwd, module, budget = ENTRY_POINTS[name]
+        # The first import also writes .pyc files; keep the fastest run
+        runs = [import_profile(cwd, module) for _ in range(max(1, args.repeat))]
+        seconds = min(run[0] for run in runs)
+        heavy = sorted({m.split(".")[0] for m in runs[0][1]} & set(HEAVY))
+
+        budget_text = "-" if budget is None else f"{budget * args.budget_scale:.2f}s"
+        print(f"{name:<22}{seconds:>8.3f}s{budget_text:>9}  {', '.join(heavy) or '-'}")
+
+        if budget is None:
+            continue
+        if heavy:
+            failures.append(f"{name} imports {', '.join(heavy)} at start-up")
+        if seconds > budget * args.budget_scale:
+            failures.append(f"{name} took {seconds:.3f}s, over its {budget * args.budget_scale:.2f}s budget")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark and accuracy report of the approximate inference modes.
+
+Fits each change point model in modules/change_point_model.py to the Brent log
+returns with inference='nuts', 'advi' and 'map', and reports the wall time of
+every fit together with the posterior mean / sd of each parameter. NUTS is the
+reference: for the approximate methods the report adds the error of the
+posterior mean in NUTS standard deviations (z) and the ratio of the posterior
+sds (sd ratio < 1 means the approximation is overconfident).
+
+The trend and variance models are fitted marginalized under every method so
+the NUTS reference is pure NUTS as well.
+
+Usage:
+    python benchmarks/bench_inference.py [--models mean trend var] [--methods nuts advi map] [--last 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from modules.batch_fitting import MODEL_INFERENCE  # noqa: E402
+from modules.change_point_model import (  # noqa: E402
+    INFERENCE_METHODS,
+    bayesian_mean_shift_flexible,
+    bayesian_trend_change_model,
+    bayesian_variance_shift_model,
+)
+from modules.config import PRICE_FILE  # noqa: E402
+from modules.data_loader import load_brent_data  # noqa: E402
+from modules.time_series_utils import compute_log_returns  # noqa: E402
+
+MODELS = {
+    "mean": (
+        lambda y, inference, seed: bayesian_mean_shift_flexible(y, inference=inference, random_seed=seed),
+        ["mu", "sigma", "tau_pos"],
+    ),
+    "trend": (
+        lambda y, inference, seed: bayesian_trend_change_model(y, marginalized=True, inference=inference, random_seed=seed),
+        ["a1", "b1", "a2", "b2", "sigma", "cp"],
+    ),
+    "var": (
+        lambda y, inference, seed: bayesian_variance_shift_model(y, marginalized=True, inference=inference, random_seed=seed),
+        ["mu", "sigma1", "sigma2", "cp"],
+    ),
+}
+
+
+def posterior_moments(trace, var_names):
+    """Posterior mean and sd of every scalar element, keyed like 'mu[2]'."""
+    moments = {}
+    for name in var_names:
+        values = trace.posterior[name].values
+        values = values.reshape(values.shape[0] * values.shape[1], -1)
+        for i in range(values.shape[1]):
+            key = name if values.shape[1] == 1 else f"{name}[{i}]"
+            moments[key] = (values[:, i].mean(), values[:, i].std())
+    return moments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=list(MODELS))
+    parser.add_argument("--methods", nargs="+", default=list(INFERENCE_METHODS), choices=list(INFERENCE_METHODS))
+    parser.add_argument("--last", type=int, default=None, help="Only fit the last N log returns")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    y = compute_log_returns(load_brent_data(PRICE_FILE))["Log_Return"].values
+    if args.last:
+        y = y[-args.last:]
+    print(f"Brent log returns: n={len(y)}")
+
+    for model_name in args.models:
+        fit, var_names = MODELS[model_name]
+        results = {}
+        for method in args.methods:
+            if method not in MODEL_INFERENCE[model_name]:
+                continue
+            start = time.perf_counter()
+            trace, _ = fit(y, method, args.seed)
+            elapsed = time.perf_counter() - start
+            results[method] = (elapsed, posterior_moments(trace, var_names))
+
+        print(f"\n== {model_name} ==")
+        print("  " + "  ".join(f"{method}: {elapsed:.1f} s" for method, (elapsed, _) in results.items()))
+        reference = results.get("nuts", (None, None))[1]
+
+        header = f"  {'param':<10}" + "".join(f"{method + ' mean':>14}{method + ' sd':>12}" for method in results)
+        if reference is not None:
+            header += "".join(f"{method + ' z':>10}{method + ' sd/':>10}" for method in results if method != "nuts")
+        print(header)
+
+        for key in next(iter(results.values()))[1]:
+            row = f"  {key:<10}"
+            for _, moments in results.values():
+                mean, sd = moments[key]
+                row += f"{mean:>14.5g}{sd:>12.4g}"
+            if reference is not None:
+                ref_mean, ref_sd = reference[key]
+                for method, (_, moments) in results.items():
+                    if method == "nuts":
+                        continue
+                    mean, sd = moments[key]
+                    scale = ref_sd if ref_sd > 0 else np.nan
+                    row += f"{abs(mean - ref_mean) / scale:>10.2f}{sd / scale:>10.2f}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark the mean-shift likelihood formulations.
+
+Compares the previous chain of `max_cp` pt.switch calls over the full series
+with the binary-search segment lookup ('indexed') and the prefix-sum segment
+statistics ('sufficient') in modules/change_point_model.py. Reports the time
+of one gradient evaluation and, with --sample, the wall time of a short
+pm.sample run.
+
+Usage:
+    python benchmarks/bench_mean_shift.py [--n 1000 10000 20000] [--max-cp 5 20] [--sample]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pymc as pm
+import pytensor.tensor as pt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from modules.change_point_model import build_mean_shift_model  # noqa: E402
+
+
+def build_switch_chain_model(data, max_cp=5, min_dist=5):
+    # The original formulation: O(max_cp * n) nested switches
+    n = len(data)
+    x = np.arange(n)
+    with pm.Model() as model:
+        delta_tau = pm.Exponential("delta_tau", lam=1.0, shape=max_cp)
+        tau_unscaled = pt.cumsum(delta_tau)
+        scale_factor = (n - max_cp * min_dist) / tau_unscaled[-1]
+        tau_pos = pm.Deterministic(
+            "tau_pos",
+            pt.clip(pt.round(tau_unscaled * scale_factor + pt.arange(max_cp) * min_dist), 0, n - 1),
+        )
+        mu = pm.Normal("mu", mu=0, sigma=10, shape=max_cp + 1)
+        sigma = pm.HalfNormal("sigma", sigma=5)
+        mu_obs = pt.alloc(mu[0], n)
+        for i in range(max_cp):
+            mu_obs = pt.switch(x > tau_pos[i], mu[i + 1], mu_obs)
+        pm.Normal("y_obs", mu=mu_obs, sigma=sigma, observed=data)
+    return model
+
+
+def time_gradient(model, repeat):
+    dlogp = model.compile_dlogp()
+    point = model.initial_point()
+    dlogp(point)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        dlogp(point)
+    return (time.perf_counter() - start) / repeat
+
+
+def time_sampling(model, draws, tune):
+    start = time.perf_counter()
+    with model:
+        pm.sample(draws=draws, tune=tune, chains=2, cores=1, progressbar=False, random_seed=0)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, nargs="+", default=[1000, 10000, 20000])
+    parser.add_argument("--max-cp", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--sample", action="store_true", help="also time a short pm.sample run")
+    parser.add_argument("--draws", type=int, default=200)
+    parser.add_argument("--tune", type=int, default=200)
+    args = parser.parse_args()
+
+    builders = {
+        "switch-chain": build_switch_chain_model,
+        "indexed": lambda y, k: build_mean_shift_model(y, max_cp=k, likelihood="indexed"),
+        "sufficient": lambda y, k: build_mean_shift_model(y, max_cp=k, likelihood="sufficient"),
+    }
+
+    rng = np.random.default_rng(0)
+    header = f"{'n':>7}{'max_cp':>8} {'likelihood':<14}{'grad us':>10}"
+    print(header + (f"{'sample s':>10}" if args.sample else ""))
+    for n in args.n:
+        data = np.repeat(rng.normal(0, 2, 10), n // 10 + 1)[:n] + rng.normal(0, 1, n)
+        for max_cp in args.max_cp:
+            for name, build in builders.items():
+                model = build(data, max_cp)
+                line = f"{n:>7}{max_cp:>8} {name:<14}{time_gradient(model, args.repeat) * 1e6:>10.1f}"
+                if args.sample:
+                    line += f"{time_sampling(model, args.draws, args.tune):>10.1f}"
+                print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark cold vs. warm fits with the compiled-model cache.
+
+Fits each change point model to consecutive windows of the Brent log returns,
+once rebuilding and recompiling the model for every window (cache=False) and
+once through the model cache (cache=True), where the first window builds the
+model and later windows only swap data. Window lengths vary so the warm fits
+also exercise the symbolic shapes.
+
+Run it twice to see the persistent compile directory (modules.config.PYTENSOR_COMPILEDIR)
+at work: the first cold fit of a fresh process is much faster once the C
+modules are on disk.
+
+Usage:
+    python benchmarks/bench_model_cache.py [--models mean trend var] [--inference map] [--windows 4] [--window 750]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from modules.batch_fitting import MODEL_INFERENCE  # noqa: E402
+from modules.change_point_model import (  # noqa: E402
+    INFERENCE_METHODS,
+    bayesian_mean_shift_flexible,
+    bayesian_trend_change_model,
+    bayesian_variance_shift_model,
+    clear_model_cache,
+)
+from modules.config import PRICE_FILE  # noqa: E402
+from modules.data_loader import load_brent_data  # noqa: E402
+from modules.time_series_utils import compute_log_returns  # noqa: E402
+
+MODELS = {
+    "mean": lambda y, inference, cache: bayesian_mean_shift_flexible(y, inference=inference, random_seed=0, cache=cache),
+    "trend": lambda y, inference, cache: bayesian_trend_change_model(y, inference=inference, random_seed=0, cache=cache),
+    "var": lambda y, inference, cache: bayesian_variance_shift_model(y, inference=inference, random_seed=0, cache=cache),
+}
+
+
+def time_fits(fit, windows, inference, cache):
+    timings = []
+    for window in windows:
+        start = time.perf_counter()
+        fit(window, inference, cache)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=list(MODELS))
+    parser.add_argument("--inference", default="map", choices=INFERENCE_METHODS)
+    parser.add_argument("--windows", type=int, default=4)
+    parser.add_argument("--window", type=int, default=750, help="Length of the first window")
+    args = parser.parse_args()
+
+    y = compute_log_returns(load_brent_data(PRICE_FILE))["Log_Return"].values
+    # Consecutive windows growing by 10% each, to vary the series length
+    windows, start = [], 0
+    for i in range(args.windows):
+        length = int(args.window * 1.1 ** i)
+        windows.append(y[start:start + length])
+        start += length
+
+    print(f"inference={args.inference}, window lengths={[len(w) for w in windows]}")
+    print(f"{'model':<8}{'uncached first':>16}{'uncached rest':>15}{'cached first':>14}{'cached rest':>13}{'speedup':>9}")
+    for name in args.models:
+        if args.inference not in MODEL_INFERENCE[name]:
+            print(f"{name:<8}skipped: inference={args.inference} is not supported")
+            continue
+        uncached = time_fits(MODELS[name], windows, args.inference, cache=False)
+        clear_model_cache()
+        cached = time_fits(MODELS[name], windows, args.inference, cache=True)
+
+        rest_uncached = np.mean(uncached[1:]) if len(uncached) > 1 else np.nan
+        rest_cached = np.mean(cached[1:]) if len(cached) > 1 else np.nan
+        print(
+            f"{name:<8}{uncached[0]:>15.2f}s{rest_uncached:>14.2f}s"
+            f"{cached[0]:>13.2f}s{rest_cached:>12.2f}s{rest_uncached / rest_cached:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark change point posterior handling.
+
+Compares the per-index Python loops previously used in the change point route
+and in insight_generation.extract_multiple_change_points against the
+vectorized modules/posterior_utils.py on a (chains, draws, max_cp) sample
+array shaped like the mean-shift trace.
+
+Usage:
+    python benchmarks/bench_posterior.py [--chains 4] [--draws 2000] [--max-cp 5] [--n 9000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from modules.posterior_utils import summarize_posterior  # noqa: E402
+
+
+def legacy_route(samples, df_prices):
+    unique_idxs = np.unique(samples.flatten()).astype(int)
+    dates = []
+    for idx in unique_idxs:
+        if 0 <= idx < len(df_prices):
+            dates.append(df_prices.iloc[idx]["date"].strftime("%Y-%m-%d"))
+    return dates
+
+
+def legacy_extract(samples, date_index):
+    tau_means = samples.mean(axis=(0, 1))
+    tau_indices = sorted(set([int(round(t)) for t in tau_means if 0 <= int(round(t)) < len(date_index)]))
+    return [date_index.iloc[i] for i in tau_indices]
+
+
+def vectorized_extract(samples, date_index):
+    tau_indices = np.unique(np.rint(samples.mean(axis=(0, 1))).astype(np.int64))
+    tau_indices = tau_indices[(tau_indices >= 0) & (tau_indices < len(date_index))]
+    return list(date_index.iloc[tau_indices])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chains", type=int, default=4)
+    parser.add_argument("--draws", type=int, default=2000)
+    parser.add_argument("--max-cp", type=int, default=5)
+    parser.add_argument("--n", type=int, default=9000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = np.sort(rng.integers(0, args.n, args.max_cp))
+    samples = np.clip(
+        np.rint(centers + rng.normal(0, 200, (args.chains, args.draws, args.max_cp))), 0, args.n - 1
+    )
+    dates = pd.bdate_range("1987-05-20", periods=args.n)
+    df_prices = pd.DataFrame({"date": dates})
+
+    assert legacy_route(samples, df_prices) == summarize_posterior(samples, dates)["index_dates"].tolist()
+    assert legacy_extract(samples, df_prices["date"]) == vectorized_extract(samples, df_prices["date"])
+
+    cases = [
+        ("route: unique dates", lambda: legacy_route(samples, df_prices),
+         lambda: summarize_posterior(samples, dates)),
+        ("extract_multiple_change_points", lambda: legacy_extract(samples, df_prices["date"]),
+         lambda: vectorized_extract(samples, df_prices["date"])),
+    ]
+
+    print(f"samples={samples.shape} n={args.n}")
+    print(f"{'case':<32}{'loop ms':>12}{'vectorized ms':>16}{'speedup':>10}")
+    for label, slow, fast in cases:
+        t_slow = timeit.timeit(slow, number=args.repeat) / args.repeat
+        t_fast = timeit.timeit(fast, number=args.repeat) / args.repeat
+        print(f"{label:<32}{t_slow * 1e3:>12.2f}{t_fast * 1e3:>16.2f}{t_slow / t_fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark response serialization for the price endpoint.
+
+Measures bytes on the wire and milliseconds per request for the previous
+jsonify(to_dict(orient="records")) path and for each format and encoding
+offered by backend/utils/serialization.py.
+
+Usage:
+    python benchmarks/bench_serialization.py [--rows 1000 10000 100000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+from utils import serialization  # noqa: E402
+
+app = Flask(__name__)
+
+
+def make_columns(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("1987-05-20", periods=rows).to_numpy()
+    prices = np.exp(3 + np.cumsum(rng.normal(0, 0.02, rows)))
+    return {"date": dates, "price": prices}
+
+
+def legacy(columns):
+    df = pd.DataFrame({"date": pd.DatetimeIndex(columns["date"]).strftime("%Y-%m-%d"), "price": columns["price"]})
+    return jsonify(df.to_dict(orient="records")).get_data()
+
+
+def timed(fn, repeat):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = fn()
+    return (time.perf_counter() - start) / repeat * 1e3, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    encoders = {
+        "records": serialization.to_records_json,
+        "columnar": serialization.to_columnar_json,
+    }
+    if serialization.pa is not None:
+        encoders["arrow"] = serialization.to_arrow_ipc
+    encodings = [None, "gzip"] + (["br"] if serialization.brotli is not None else [])
+
+    print(f"{'rows':>8} {'format':<10}{'encoding':<10}{'bytes':>12}{'ms':>10}")
+    for rows in args.rows:
+        columns = make_columns(rows)
+        with app.app_context():
+            ms, size = timed(lambda: legacy(columns), args.repeat)
+        print(f"{rows:>8} {'legacy':<10}{'identity':<10}{size:>12}{ms:>10.2f}")
+
+        for name, encode in encoders.items():
+            for encoding in encodings:
+                ms, size = timed(lambda: serialization.compress(encode(columns), encoding), args.repeat)
+                print(f"{rows:>8} {name:<10}{encoding or 'identity':<10}{size:>12}{ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark batched rolling ADF / KPSS tests against a loop of statsmodels calls.
+
+Runs `adfuller` (autolag='AIC') and `kpss` (nlags='auto') on every rolling
+window of the Brent log returns, then the same windows through
+modules.stationarity.stationarity_table serially and on a process pool, and
+reports the wall times and the largest statistic difference.
+
+Usage:
+    python benchmarks/bench_stationarity.py [--window 252] [--step 1 5 21] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from modules.config import PRICE_FILE  # noqa: E402
+from modules.stationarity import rolling_windows, stationarity_table  # noqa: E402
+
+
+def naive_loop(x, windows, regression="c"):
+    from statsmodels.tsa.stattools import adfuller, kpss
+
+    adf, kps = [], []
+    with warnings.catch_warnings():
+        # Return-format FutureWarnings and KPSS p-values outside the table
+        warnings.simplefilter("ignore")
+        for start, end in windows:
+            adf.append(adfuller(x[start:end], regression=regression, autolag="AIC")[0])
+            kps.append(kpss(x[start:end], regression=regression, nlags="auto")[0])
+    return np.array(adf), np.array(kps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prices", default=str(PRICE_FILE))
+    parser.add_argument("--window", type=int, default=252)
+    parser.add_argument("--step", type=int, nargs="+", default=[21, 5, 1])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--naive-limit", type=int, default=2000, help="Skip the naive loop above this many windows")
+    args = parser.parse_args()
+
+    from modules.data_loader import load_brent_data
+    from modules.time_series_utils import log_returns
+
+    x = log_returns(load_brent_data(args.prices)["Price"].to_numpy())[1:]
+    print(f"{len(x)} log returns, window {args.window}, {args.workers} workers")
+    print(f"{'step':>5}{'windows':>9}{'naive':>10}{'batched':>10}{'pool':>10}{'speed-up':>10}{'max |diff|':>12}")
+
+    # Import statsmodels / SciPy outside the timings
+    stationarity_table(x, [[0, args.window]], workers=1)
+    naive_loop(x, [[0, args.window]])
+
+    for step in args.step:
+        windows = rolling_windows(len(x), args.window, step)
+
+        start = time.perf_counter()
+        table = stationarity_table(x, windows, workers=1)
+        batched = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stationarity_table(x, windows, workers=args.workers)
+        pooled = time.perf_counter() - start
+
+        naive, diff = np.nan, np.nan
+        if len(windows) <= args.naive_limit:
+            start = time.perf_counter()
+            adf, kps = naive_loop(x, windows)
+            naive = time.perf_counter() - start
+            ours = table.set_index("test")["statistic"]
+            diff = max(np.nanmax(np.abs(ours["adf"].to_numpy() - adf)), np.nanmax(np.abs(ours["kpss"].to_numpy() - kps)))
+
+        best = min(batched, pooled)
+        naive_text = "-" if np.isnan(naive) else f"{naive:.2f}s"
+        speedup = "-" if np.isnan(naive) else f"{naive / best:.1f}x"
+        diff_text = "-" if np.isnan(diff) else f"{diff:.2e}"
+        print(
+            f"{step:>5}{len(windows):>9}{naive_text:>10}{batched:>9.2f}s{pooled:>9.2f}s"
+            f"{speedup:>10}{diff_text:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
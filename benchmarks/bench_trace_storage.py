@@ -0,0 +1,105 @@
+"""
+Benchmark trace file size, read time and reader memory by storage layout.
+
+Writes a synthetic mean-shift trace (posterior plus a y_obs-sized
+log_likelihood group, as pm.sample produces) with az.to_netcdf and with
+modules.trace_store.save_trace (full and stripped), then reads each one in a
+fresh process: eagerly, every group into memory as xr.load_dataset did, and
+lazily with load_posterior for the variables a route needs. Memory is the
+growth of the reader's resident set over its size after the imports (Linux).
+
+Usage:
+    python benchmarks/bench_trace_storage.py [--n 9000] [--draws 2000] [--chains 4]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+from modules.trace_store import save_trace  # noqa: E402
+
+READERS = {
+    # What load_trace did with xr.load_dataset: every group read into memory
+    "eager": "import arviz as az\naz.rcParams['data.load'] = 'eager'\ntrace = az.from_netcdf(path)",
+    "load_posterior": "from modules.trace_store import load_posterior\n"
+                      "posterior = load_posterior(path, ['tau_pos', 'cp', 'mu'])",
+}
+
+# Resident memory from /proc (Linux), measured while the result is still referenced
+READ_SCRIPT = """
+import os, sys, time
+sys.path.insert(0, {root!r})
+import arviz, xarray, modules.trace_store
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+path = {path!r}
+base = rss_mb()
+start = time.perf_counter()
+{reader}
+elapsed = time.perf_counter() - start
+print(elapsed, rss_mb() - base)
+"""
+
+
+def synthetic_trace(n, draws, chains, max_cp=5, seed=0):
+    import arviz as az
+
+    rng = np.random.default_rng(seed)
+    return az.from_dict(
+        posterior={
+            "delta_tau": rng.exponential(size=(chains, draws, max_cp)),
+            "tau_pos": np.sort(rng.integers(0, n, (chains, draws, max_cp)), axis=-1).astype(np.float64),
+            "mu": rng.normal(0, 0.01, (chains, draws, max_cp + 1)),
+            "sigma": rng.gamma(50, 0.0005, (chains, draws)),
+        },
+        log_likelihood={"y_obs": rng.normal(2, 0.5, (chains, draws, n))},
+        observed_data={"y_obs": rng.normal(0, 0.02, n)},
+    )
+
+
+def read_in_subprocess(path, reader):
+    script = READ_SCRIPT.format(root=os.path.abspath(ROOT), path=str(path), reader=READERS[reader])
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    elapsed, rss_mb = map(float, out.split()[-2:])
+    return elapsed, rss_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=9000, help="Observations (log_likelihood size per draw)")
+    parser.add_argument("--draws", type=int, default=2000)
+    parser.add_argument("--chains", type=int, default=4)
+    args = parser.parse_args()
+
+    trace = synthetic_trace(args.n, args.draws, args.chains)
+    with tempfile.TemporaryDirectory() as tmp:
+        layouts = {}
+        start = time.perf_counter()
+        layouts["az.to_netcdf"] = trace.to_netcdf(os.path.join(tmp, "az.nc"))
+        write_times = {"az.to_netcdf": time.perf_counter() - start}
+        for name, kwargs in (("save_trace", {}), ("save_trace strip", {"strip": True})):
+            start = time.perf_counter()
+            layouts[name] = save_trace(trace, os.path.join(tmp, f"{name.replace(' ', '_')}.nc"), **kwargs)
+            write_times[name] = time.perf_counter() - start
+
+        print(f"n={args.n}, chains={args.chains}, draws={args.draws}")
+        print(f"{'layout':<18}{'size':>10}{'write':>9}  {'reader':<16}{'read':>9}{'RSS':>11}")
+        for name, path in layouts.items():
+            size_mb = os.path.getsize(path) / 2 ** 20
+            for reader in READERS:
+                elapsed, rss_mb = read_in_subprocess(path, reader)
+                print(
+                    f"{name:<18}{size_mb:>8.1f}MB{write_times[name]:>8.2f}s  "
+                    f"{reader:<16}{elapsed:>8.3f}s{rss_mb:>9.1f}MB"
+                )
+
+
+if __name__ == "__main__":
+    main()
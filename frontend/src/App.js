@@ -7,6 +7,13 @@ import DateFilter from "./components/DateFilter";
 
 import "./styles.css";
 
+// Expand a columnar payload ({ column: [...] }) into row objects for the charts
+const fromColumns = (columns) => {
+  const names = Object.keys(columns);
+  const length = names.length ? columns[names[0]].length : 0;
+  return Array.from({ length }, (_, i) => Object.fromEntries(names.map(name => [name, columns[name][i]])));
+};
+
 function App() {
   const [prices, setPrices] = useState([]);
   const [events, setEvents] = useState([]);
@@ -16,12 +23,20 @@ function App() {
   const [windowSize, setWindowSize] = useState(30);
 
   const fetchData = () => {
-    const params = {};
+    const params = { format: "columnar" };
     if (startDate) params.start_date = startDate;
     if (endDate) params.end_date = endDate;
 
-    axios.get("http://localhost:5000/api/prices", { params }).then(res => setPrices(res.data));
-    axios.get("http://localhost:5000/api/events", { params }).then(res => setEvents(res.data));
+    // The chart cannot show more points than it has pixels; the server
+    // downsamples the daily series to fit, keeping its peaks and troughs
+    const priceParams = {
+      ...params,
+      max_points: Math.max(300, Math.round(window.innerWidth)),
+      method: "lttb",
+    };
+
+    axios.get("http://localhost:5000/api/prices", { params: priceParams }).then(res => setPrices(fromColumns(res.data)));
+    axios.get("http://localhost:5000/api/events", { params }).then(res => setEvents(fromColumns(res.data)));
 
     ["mean", "trend", "var"].forEach(type =>
       axios.get(`http://localhost:5000/api/change_points/${type}`).then(res =>
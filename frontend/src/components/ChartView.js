@@ -15,6 +15,22 @@ function getNearbyDates(dateStr, windowSize) {
   return dates;
 }
 
+// Snap a date to the nearest date present in the (possibly downsampled) series
+function nearestDataDate(dateStr, dataDates) {
+  if (!dataDates.length || dateStr < dataDates[0] || dateStr > dataDates[dataDates.length - 1]) return null;
+  let lo = 0;
+  let hi = dataDates.length - 1;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (dataDates[mid] < dateStr) lo = mid + 1;
+    else hi = mid;
+  }
+  if (lo > 0 && new Date(dateStr) - new Date(dataDates[lo - 1]) < new Date(dataDates[lo]) - new Date(dateStr)) {
+    return dataDates[lo - 1];
+  }
+  return dataDates[lo];
+}
+
 export default function ChartView({ data, changePoints, events = [], windowSize = 30 }) {
   if (!data.length) return <p>Loading price data...</p>;
 
@@ -25,6 +41,7 @@ export default function ChartView({ data, changePoints, events = [], windowSize
   };
 
   const changePointLines = [];
+  const dataDates = data.map(d => d.date);
   const cpDatesByType = {
     mean: new Set(changePoints.mean?.map(d => d) || []),
     trend: new Set(changePoints.trend?.map(d => d) || []),
@@ -34,11 +51,12 @@ export default function ChartView({ data, changePoints, events = [], windowSize
   // Draw change point lines
   Object.keys(cpDatesByType).forEach(type => {
     cpDatesByType[type].forEach(cpDate => {
-      if (data.some(d => d.date === cpDate)) {
+      const chartDate = nearestDataDate(cpDate, dataDates);
+      if (chartDate) {
         changePointLines.push(
           <ReferenceLine
             key={`${type}-${cpDate}`}
-            x={cpDate}
+            x={chartDate}
             stroke={cpStyles[type].stroke}
             strokeDasharray="3 3"
             label={{
@@ -56,7 +74,6 @@ export default function ChartView({ data, changePoints, events = [], windowSize
   });
 
   // Tag events with CP type if nearby
-    const dataDates = data.map(d => d.date);
 
   const highlightedEvents = events.map(event => {
     const tags = [];
@@ -82,7 +99,7 @@ export default function ChartView({ data, changePoints, events = [], windowSize
       });
     });
 
-    return tags.length > 0 ? { ...event, tags, chartDate: closestDate || event.date } : null;
+    return tags.length > 0 ? { ...event, tags, chartDate: closestDate || nearestDataDate(event.date, dataDates) || event.date } : null;
   }).filter(Boolean);
 
   // Render event lines based on first tag
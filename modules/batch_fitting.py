@@ -0,0 +1,343 @@
+"""
+Fit the change point models over many series and rolling windows in parallel.
+
+Jobs are spread over a process pool whose size is budgeted against the NUTS
+chains each fit runs itself, so workers x chains never exceeds the core
+budget. Every worker reuses compiled models across its jobs (cache=True),
+writes each trace to the output directory as soon as it finishes and appends
+one line per job to a JSONL report. Traces are written chunked and compressed
+(modules.trace_store); --strip drops their per-observation groups. Re-running the same batch skips the jobs
+whose trace is already on disk, so an interrupted run resumes where it stopped.
+
+Usage:
+    python -m modules.batch_fitting [--models mean trend var] [--window 2520 --step 252] [--inference map]
+    python -m modules.batch_fitting --panel [--assets brent wti]
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modules.config import BASE_DIR, PRICE_FILE
+from modules.logger import get_logger
+
+logger = get_logger()
+
+BATCH_DIR = BASE_DIR / "models" / "batch"
+REPORT_FILE = "batch_report.jsonl"
+
+# Chains pm.sample runs per fit of each model type
+MODEL_CHAINS = {"mean": 4, "trend": 2, "var": 2}
+
+# Inference methods of each model type: the mean-shift change points pass no
+# gradient, so only NUTS can move them
+MODEL_INFERENCE = {"mean": ("nuts",), "trend": ("nuts", "advi", "map"), "var": ("nuts", "advi", "map")}
+
+# Thread counts of the BLAS / OpenMP pools, read once when numpy is imported
+BLAS_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def make_jobs(series, model_types, window=None, step=None, **fit_options):
+    """
+    Expand series and window specs into fit jobs.
+
+    Args:
+        series (dict): Name -> values (array-like, or a date-indexed pd.Series
+            whose window dates are recorded in the report and the trace attributes).
+            NaNs in a pd.Series (e.g. a panel column before the asset's history
+            starts) are dropped.
+        model_types (list): Any of 'mean', 'trend' and 'var'.
+        window (int, optional): Window length; None fits each series whole.
+        step (int, optional): Offset between window starts; defaults to `window`.
+        **fit_options: Passed to the model's bayesian_* function (e.g.
+            inference='map', marginalized=True, max_cp=3).
+
+    Returns:
+        list: Job dicts with 'job_id', 'series', 'model_type', 'start', 'end',
+            'values', 'dates' and 'options'.
+    """
+    inference = fit_options.get("inference", "nuts")
+    for model_type in model_types:
+        if model_type not in MODEL_CHAINS:
+            raise ValueError(f"Unknown model type '{model_type}'. Expected one of {tuple(MODEL_CHAINS)}.")
+        if inference not in MODEL_INFERENCE[model_type]:
+            raise ValueError(f"Model '{model_type}' supports inference {MODEL_INFERENCE[model_type]}, not '{inference}'.")
+
+    jobs = []
+    for name, values in series.items():
+        if isinstance(values, pd.Series):
+            values = values.dropna()
+        dates = values.index if isinstance(getattr(values, "index", None), pd.DatetimeIndex) else None
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+
+        if window is None:
+            spans = [(0, n)]
+        else:
+            spans = [(start, start + window) for start in range(0, n - window + 1, step or window)]
+
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "-", str(name))
+        # Different fit options must not resume from each other's traces
+        suffix = f"__{hashlib.sha1(json.dumps(fit_options, sort_keys=True).encode()).hexdigest()[:8]}" if fit_options else ""
+        for start, end in spans:
+            for model_type in model_types:
+                jobs.append({
+                    "job_id": f"{slug}__{model_type}__{start}-{end}{suffix}",
+                    "series": str(name),
+                    "model_type": model_type,
+                    "start": start,
+                    "end": end,
+                    "values": values[start:end],
+                    "dates": None if dates is None else (str(dates[start].date()), str(dates[end - 1].date())),
+                    "options": dict(fit_options),
+                })
+    return jobs
+
+
+def plan_workers(jobs, total_cores=None, workers=None):
+    """
+    Split the core budget between pool workers and per-fit chain processes.
+
+    Args:
+        jobs (list): Jobs from `make_jobs`.
+        total_cores (int, optional): Core budget; defaults to os.cpu_count().
+        workers (int, optional): Force the number of pool workers.
+
+    Returns:
+        tuple: (workers, cores per fit).
+    """
+    total_cores = max(1, total_cores or os.cpu_count() or 1)
+    nuts_jobs = [job for job in jobs if job["options"].get("inference", "nuts") == "nuts"]
+    chains = max((MODEL_CHAINS[job["model_type"]] for job in nuts_jobs), default=1)
+
+    if workers is None:
+        cores_per_fit = min(chains, total_cores)
+        workers = max(1, total_cores // cores_per_fit)
+    else:
+        workers = max(1, min(workers, total_cores))
+        cores_per_fit = max(1, min(chains, total_cores // workers))
+    return min(workers, max(1, len(jobs))), cores_per_fit
+
+
+@contextmanager
+def _worker_pool(workers):
+    """
+    A process pool whose workers run BLAS single-threaded.
+
+    Each fit already runs its own chain processes, so BLAS threads would only
+    oversubscribe the cores. The pools read BLAS_THREAD_VARS once, when numpy
+    is imported, so setting them inside a worker comes too late: they are set
+    in this process's environment while the pool runs, and the workers are
+    spawned (not forked from a process whose numpy is already loaded) so they
+    and their chain processes import numpy with them.
+    """
+    saved = {var: os.environ.get(var) for var in BLAS_THREAD_VARS}
+    os.environ.update(dict.fromkeys(BLAS_THREAD_VARS, "1"))
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            yield pool
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def _run_job(job, out_dir, cores, strip=False, progress=None):
+    """
+    Fit one job in a worker process and write its trace atomically.
+
+    `progress`, if given, is called with the fraction of the fit done.
+    """
+    from modules.change_point_model import (
+        bayesian_mean_shift_flexible,
+        bayesian_trend_change_model,
+        bayesian_variance_shift_model,
+    )
+    from modules.trace_store import save_trace
+
+    fit = {
+        "mean": bayesian_mean_shift_flexible,
+        "trend": bayesian_trend_change_model,
+        "var": bayesian_variance_shift_model,
+    }[job["model_type"]]
+
+    options = dict(job["options"])
+    options.setdefault("random_seed", zlib.crc32(job["job_id"].encode()))
+
+    record = {
+        "job_id": job["job_id"],
+        "series": job["series"],
+        "model_type": job["model_type"],
+        "start": job["start"],
+        "end": job["end"],
+        "dates": job["dates"],
+        "pid": os.getpid(),
+    }
+    started = time.perf_counter()
+    try:
+        trace, _ = fit(job["values"], cache=True, cores=cores, progress=progress, **options)
+
+        attrs = {k: v for k, v in record.items() if k not in ("pid", "dates")}
+        if job["dates"]:
+            attrs["start_date"], attrs["end_date"] = job["dates"]
+        trace.posterior.attrs.update(attrs)
+
+        path = save_trace(trace, Path(out_dir) / f"{job['job_id']}.nc", strip=strip)
+
+        record.update(status="done", path=path.name)
+    except Exception as e:
+        record.update(status="failed", error=f"{type(e).__name__}: {e}")
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def load_report(out_dir=BATCH_DIR):
+    """
+    Read the per-job report of a batch directory.
+
+    Returns:
+        pd.DataFrame: One row per finished attempt, in completion order.
+    """
+    path = Path(out_dir) / REPORT_FILE
+    if not path.exists():
+        return pd.DataFrame()
+    with open(path) as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def run_batch(jobs, out_dir=BATCH_DIR, total_cores=None, workers=None, resume=True, strip=False):
+    """
+    Run fit jobs over a process pool, writing each trace as it completes.
+
+    Args:
+        jobs (list): Jobs from `make_jobs`.
+        out_dir (str or Path): Directory for the traces and the report.
+        total_cores (int, optional): Core budget; defaults to os.cpu_count().
+        workers (int, optional): Force the number of pool workers.
+        resume (bool): Skip jobs whose trace already exists.
+        strip (bool): Save traces without their per-observation groups
+            (log_likelihood, posterior_predictive).
+
+    Returns:
+        pd.DataFrame: Report rows of the jobs run in this call.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    pending = [job for job in jobs if not (resume and (out_dir / f"{job['job_id']}.nc").exists())]
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        logger.info(f"Resuming: {skipped} of {len(jobs)} jobs already have a trace")
+    if not pending:
+        return pd.DataFrame()
+
+    workers, cores = plan_workers(pending, total_cores=total_cores, workers=workers)
+    logger.info(f"Fitting {len(pending)} jobs on {workers} workers x {cores} chain processes")
+
+    records = []
+    started = time.perf_counter()
+    with _worker_pool(workers) as pool, \
+            open(out_dir / REPORT_FILE, "a") as report:
+        futures = [pool.submit(_run_job, job, str(out_dir), cores, strip) for job in pending]
+        for done, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            record["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            report.write(json.dumps(record) + "\n")
+            report.flush()
+            records.append(record)
+
+            elapsed = time.perf_counter() - started
+            eta = elapsed / done * (len(pending) - done)
+            message = f"[{done}/{len(pending)}] {record['job_id']} {record['status']} in {record['seconds']:.1f}s (eta {eta:.0f}s)"
+            if record["status"] == "failed":
+                logger.error(f"{message}: {record['error']}")
+            else:
+                logger.info(message)
+
+    result = pd.DataFrame(records)
+    wall = time.perf_counter() - started
+    logger.info(
+        f"Batch finished in {wall:.1f}s: {int((result['status'] == 'done').sum())} done, "
+        f"{int((result['status'] == 'failed').sum())} failed, "
+        f"{result['seconds'].sum() / max(wall, 1e-9):.1f}x parallel speedup"
+    )
+    return result
+
+
+def timing_report(report):
+    """
+    Per model type job counts and fit times.
+
+    Args:
+        report (pd.DataFrame): From `run_batch` or `load_report`.
+
+    Returns:
+        pd.DataFrame: count, failed, mean / max / total seconds per model type.
+    """
+    if report.empty:
+        return report
+    return report.groupby("model_type").agg(
+        count=("job_id", "size"),
+        failed=("status", lambda s: int((s == "failed").sum())),
+        mean_seconds=("seconds", "mean"),
+        max_seconds=("seconds", "max"),
+        total_seconds=("seconds", "sum"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit change point models over rolling windows of the Brent log returns.")
+    parser.add_argument("--prices", default=str(PRICE_FILE))
+    parser.add_argument(
+        "--panel", action="store_true",
+        help="Fit every asset of the price panel (config.PANEL_FILE plus Brent) instead of Brent alone",
+    )
+    parser.add_argument("--assets", nargs="+", default=None, help="Panel assets to fit (default: all)")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_CHAINS), choices=list(MODEL_CHAINS))
+    parser.add_argument("--window", type=int, default=None, help="Window length in trading days (2520 ~ a decade)")
+    parser.add_argument("--step", type=int, default=None)
+    parser.add_argument("--inference", default="nuts", choices=("nuts", "advi", "map"))
+    parser.add_argument("--out-dir", default=str(BATCH_DIR))
+    parser.add_argument("--cores", type=int, default=None, help="Core budget (default: all)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-resume", action="store_true")
+    parser.add_argument(
+        "--strip", action="store_true",
+        help="Drop the per-observation groups (log_likelihood, posterior_predictive) from the saved traces",
+    )
+    args = parser.parse_args()
+
+    if args.panel:
+        from modules.panel import load_panel, panel_series, preprocess_panel
+
+        panel = load_panel(brent_file=args.prices, assets=args.assets)
+        series = panel_series(preprocess_panel(panel))
+    else:
+        from modules.data_loader import load_brent_data
+        from modules.time_series_utils import compute_log_returns
+
+        log_df = compute_log_returns(load_brent_data(args.prices))
+        series = {"brent": log_df.set_index("Date")["Log_Return"]}
+
+    jobs = make_jobs(series, args.models, window=args.window, step=args.step, inference=args.inference)
+    run_batch(
+        jobs, out_dir=args.out_dir, total_cores=args.cores, workers=args.workers,
+        resume=not args.no_resume, strip=args.strip,
+    )
+    print(timing_report(load_report(args.out_dir)).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,374 @@
-import numpy as np
-import pymc as pm
-import pytensor.tensor as pt
-from aesara.tensor import alloc
+import hashlib
+import json
+import os
+import threading
+
+from modules.config import PYTENSOR_COMPILEDIR
+
+# pytensor reads its compile directory once, at import: point it at the shared
+# cache unless PYTENSOR_FLAGS already chooses one
+if "base_compiledir" not in os.environ.get("PYTENSOR_FLAGS", ""):
+    os.environ["PYTENSOR_FLAGS"] = ",".join(
+        flag for flag in (os.environ.get("PYTENSOR_FLAGS"), f"base_compiledir={PYTENSOR_COMPILEDIR}") if flag
+    )
+
 import arviz as az
-import pytensor.tensor as pt
-import pymc as pm
-import numpy as np
-import aesara.tensor as at
 import numpy as np
 import pymc as pm
-import aesara.tensor as at
-from aesara.tensor import alloc
-import arviz as az
+import pytensor.tensor as pt
+from pytensor.gradient import zero_grad
+from pytensor.tensor.extra_ops import searchsorted
+
+INFERENCE_METHODS = ("nuts", "advi", "map")
+
+# ADVI steps after the Laplace warm start
+ADVI_ITERATIONS = 3000
+
+# Largest posterior sd the Laplace approximation allows in the unconstrained
+# space. Directions the likelihood does not inform (e.g. `delta_tau`, whose
+# rounded positions pass no gradient) are otherwise only bounded by the
+# optimizer's tolerance, and draws or ADVI steps that wide overflow the
+# inverse transforms.
+LAPLACE_MAX_SCALE = 2.0
 
-def bayesian_mean_shift_flexible(data, max_cp=5, min_dist=5):
+
+class CachedModel:
     """
-    Bayesian model to detect up to `max_cp` mean change points in a time series.
+    A built model plus the compiled functions that repeated fits reuse.
+
+    The builders keep the series in pm.Data containers (mutable by default)
+    with symbolic shapes, so one compiled model serves series of any length: a
+    refit swaps the data with `set_model_data` and reuses the NUTS step (with
+    its compiled logp / gradient) and the compiled MAP objective instead of
+    recompiling.
+    Hold `lock` while swapping data and fitting.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+        self._functions = {}
+
+    def function(self, name, factory):
+        """The compiled object `name`, built with `factory()` on first use."""
+        if name not in self._functions:
+            self._functions[name] = factory()
+        return self._functions[name]
+
+
+def _laplace_fit(cached, random_seed=None, start=None):
+    """
+    MAP estimate and a Gaussian (Laplace) approximation of the posterior around it.
+
+    Everything lives in the unconstrained space the samplers work in, so draws
+    respect each variable's support once mapped back through the transforms.
+    The mode is found with L-BFGS on the same objective as pm.find_MAP (no
+    Jacobian terms), but through compiled functions kept on `cached`. The
+    Hessian comes from central differences of the compiled gradient: a
+    symbolic Hessian over thousands of observations takes far longer to
+    compile than the few gradient calls cost.
+
+    Args:
+        cached (CachedModel): Model to fit.
+        random_seed (int, optional): Seed of the initial point.
+        start (dict, optional): Point in the unconstrained space to start the
+            optimizer from instead of the model's initial point.
+
+    Returns:
+        tuple: (mode as RaveledVars, precision matrix (negative Hessian of logp)
+            of the flattened mode).
+    """
+    from pymc.blocking import DictToArrayBijection, RaveledVars
+    from pymc.initial_point import make_initial_point_fn
+    from scipy.optimize import minimize
+
+    model = cached.model
+    value_vars = model.continuous_value_vars
+    rvs = [model.values_to_rvs[v] for v in value_vars]
+    logp = cached.function("map_logp", lambda: model.compile_logp(jacobian=False))
+    dlogp = cached.function("map_dlogp", lambda: model.compile_dlogp(rvs, jacobian=False))
+    initial_point = cached.function("initial_point", lambda: make_initial_point_fn(model=model))
+
+    start = start or initial_point(random_seed)
+    start = DictToArrayBijection.map({v.name: start[v.name] for v in value_vars})
+
+    def point(flat):
+        return DictToArrayBijection.rmap(RaveledVars(flat, start.point_map_info))
+
+    result = minimize(
+        lambda flat: -logp(point(flat)),
+        start.data,
+        jac=lambda flat: -dlogp(point(flat)),
+        method="L-BFGS-B",
+        options={"maxiter": 5000},
+    )
+    mode = RaveledVars(result.x, start.point_map_info)
+
+    k = mode.data.size
+    hessian = np.empty((k, k))
+    for i in range(k):
+        step = np.zeros(k)
+        step[i] = 1e-5 * max(1.0, abs(mode.data[i]))
+        hessian[i] = -(dlogp(point(mode.data + step)) - dlogp(point(mode.data - step))) / (2 * step[i])
+
+    # Flat or non-convex directions are floored instead of failing, and never
+    # wider than LAPLACE_MAX_SCALE
+    eigval, eigvec = np.linalg.eigh(0.5 * (hessian + hessian.T))
+    eigval = np.maximum(eigval, max(1e-8 * eigval.max(), LAPLACE_MAX_SCALE ** -2))
+    return mode, (eigvec * eigval) @ eigvec.T
+
+
+def _evaluate_draws(cached, points):
+    """
+    Free variables and deterministics, in the constrained space, of points in the unconstrained space.
+
+    Args:
+        cached (CachedModel): Model the points belong to.
+        points (list): Dicts of value variable name -> value.
+
+    Returns:
+        dict: Variable name -> array with one row per point.
+    """
+    model = cached.model
+    names = {rv.name for rv in model.unobserved_RVs}
+    outputs = [v for v in model.unobserved_value_vars if v.name in names]
+    point_fn = cached.function(
+        "point_outputs",
+        lambda: model.compile_fn(outputs, inputs=model.value_vars, on_unused_input="ignore"),
+    )
+
+    values = [point_fn(point) for point in points]
+    return {v.name: np.stack([draw[i] for draw in values]) for i, v in enumerate(outputs)}
+
+
+def _laplace_sample(cached, draws, random_seed=None, start=None, progress=None):
+    """Draw from the Laplace approximation; deterministics are evaluated per draw."""
+    from pymc.blocking import DictToArrayBijection, RaveledVars
+
+    mode, precision = _laplace_fit(cached, random_seed=random_seed, start=start)
+    if progress is not None:
+        progress(0.5)
+    rng = np.random.default_rng(random_seed)
+    flat_draws = rng.multivariate_normal(mode.data, np.linalg.inv(precision), size=draws, method="eigh")
+
+    points = [DictToArrayBijection.rmap(RaveledVars(row, mode.point_map_info)) for row in flat_draws]
+    posterior = {name: values[np.newaxis] for name, values in _evaluate_draws(cached, points).items()}
+    if progress is not None:
+        progress(1.0)
+    return az.from_dict(posterior=posterior, attrs={"inference": "map"})
+
+
+def _advi_sample(cached, draws, random_seed=None, start=None, progress=None):
+    """
+    Mean-field ADVI warm-started from the Laplace approximation.
+
+    Starting at the MAP with the Laplace scales keeps the badly scaled
+    directions (e.g. slopes over thousands of time steps) from blowing up the
+    stochastic gradients, so a short run refines rather than searches. The
+    scales are the conditional ones, 1 / sqrt(diag(precision)), which is the
+    mean-field optimum for a Gaussian posterior; the marginal sds would be far
+    too wide for strongly correlated pairs such as slope and intercept.
+
+    Raises:
+        RuntimeError: If the optimization diverges anyway.
+    """
+    from pymc.blocking import DictToArrayBijection, RaveledVars
+
+    mode, precision = _laplace_fit(cached, random_seed=random_seed, start=start)
+    scales = 1 / np.sqrt(np.diag(precision))
+    callbacks = []
+    if progress is not None:
+        callbacks.append(lambda approx, losses, i: progress((i + 1) / ADVI_ITERATIONS))
+    with cached.model:
+        try:
+            approx = pm.fit(
+                n=ADVI_ITERATIONS,
+                method="advi",
+                start=DictToArrayBijection.rmap(mode),
+                start_sigma=DictToArrayBijection.rmap(RaveledVars(scales, mode.point_map_info)),
+                # Adagrad moves every coordinate by about the learning rate per step,
+                # so it is bounded by the narrowest posterior scale
+                obj_optimizer=pm.adagrad_window(learning_rate=0.1 * scales.min()),
+                callbacks=callbacks,
+                random_seed=random_seed,
+                progressbar=False,
+            )
+        except FloatingPointError as e:
+            raise RuntimeError(f"ADVI diverged ({e}); fit with inference='map' or 'nuts' instead.") from e
+        trace = approx.sample(draws, random_seed=random_seed)
+    trace.posterior.attrs["inference"] = "advi"
+    return trace
+
+
+def _build_step(model, target_accept):
+    """
+    NUTS over the continuous variables and Metropolis over a discrete `cp`, as
+    pm.sample would assign them.
+
+    Returns:
+        pm.NUTS or pm.CompoundStep: The step method(s) to pass to pm.sample.
+    """
+    continuous = model.continuous_value_vars
+    discrete = [v for v in model.value_vars if v not in continuous]
+    with model:
+        steps = [pm.NUTS(vars=continuous, target_accept=target_accept)]
+        if discrete:
+            steps.append(pm.Metropolis(vars=discrete))
+    return steps[0] if len(steps) == 1 else pm.CompoundStep(steps)
+
+
+def _nuts_sample(cached, draws, tune, chains, target_accept, random_seed=None, cores=None, progress=None, initvals=None):
+    """
+    pm.sample with the step methods kept on `cached`.
+
+    pm.sample resets the tuning of a step it is handed, so a reused step adapts
+    from scratch on the new data; only the compilation is skipped. Chains start
+    from jittered initial points, as with the default 'jitter+adapt_diag' init,
+    except for the variables in `initvals`, which every chain starts at.
+    """
+    from pymc.initial_point import make_initial_point_fn
+
+    model = cached.model
+    step = cached.function(f"step_{target_accept}", lambda: _build_step(model, target_accept))
+    jitter_rvs = {model.values_to_rvs[v] for v in model.continuous_value_vars}
+    jittered_point = cached.function(
+        "jittered_point",
+        lambda: make_initial_point_fn(model=model, jitter_rvs=jitter_rvs, return_transformed=False),
+    )
+    seeds = np.random.default_rng(random_seed).integers(2 ** 30, size=chains)
+
+    with model:
+        return pm.sample(
+            draws=draws,
+            tune=tune,
+            chains=chains,
+            cores=cores,
+            step=step,
+            initvals=[{**jittered_point(seed), **(initvals or {})} for seed in seeds],
+            random_seed=random_seed,
+            callback=_sample_callback(progress, chains * (tune + draws)),
+            return_inferencedata=True
+        )
+
+
+def _sample_callback(progress, total):
+    """pm.sample callback reporting the fraction of the `total` draws done to `progress`, or None."""
+    if progress is None:
+        return None
+    done = iter(range(1, total + 1))
+
+    # Called in this process for the draws of every chain, tuning included
+    def callback(trace, draw):
+        progress(next(done) / total)
+
+    return callback
+
+
+def _run_inference(cached, inference="nuts", draws=1000, tune=1000, chains=2, target_accept=0.95, random_seed=None, cores=None, start=None,
+                   progress=None, initvals=None):
+    """
+    Fit a built model and return its posterior as az.InferenceData.
+
+    Args:
+        cached (CachedModel): Model to fit, with its reusable compiled functions.
+        inference (str): 'nuts' samples with pm.sample; 'advi' fits mean-field
+            ADVI and draws from the approximation; 'map' draws from a Laplace
+            approximation at the MAP. The approximate methods return one chain
+            of `draws` draws and need a fully continuous model.
+        draws (int): Draws per chain.
+        tune (int): NUTS tuning steps.
+        chains (int): NUTS chains.
+        target_accept (float): NUTS target acceptance rate.
+        random_seed (int, optional): Seed.
+        cores (int, optional): Processes running the NUTS chains; defaults to
+            pm.sample's choice.
+        start (dict, optional): Unconstrained point the 'map' / 'advi' optimizer
+            starts from.
+        progress (callable, optional): Called with the fraction of the fit done
+            (0 to 1) as it runs: per NUTS draw, per ADVI step, and after the
+            mode and the draws for 'map'.
+        initvals (dict, optional): Initial values (constrained space) of some
+            free variables, e.g. from `change_point_initvals`. NUTS chains all
+            start there; 'map' / 'advi' start there unless `start` is given.
+
+    Returns:
+        az.InferenceData: Posterior trace.
+    """
+    if inference not in INFERENCE_METHODS:
+        raise ValueError(f"Unknown inference '{inference}'. Expected one of {INFERENCE_METHODS}.")
+
+    if initvals and inference != "nuts" and start is None:
+        from pymc.initial_point import make_initial_point_fn
+
+        start = make_initial_point_fn(model=cached.model, overrides=initvals)(random_seed)
+
+    if inference == "map":
+        return _laplace_sample(cached, draws, random_seed=random_seed, start=start, progress=progress)
+    if inference == "advi":
+        return _advi_sample(cached, draws, random_seed=random_seed, start=start, progress=progress)
+    return _nuts_sample(
+        cached, draws, tune, chains, target_accept, random_seed=random_seed, cores=cores, progress=progress, initvals=initvals,
+    )
+
+
+def _prefix_sums(y):
+    """Prefix sums of y and y**2 with a leading zero, as used by the sufficient likelihood."""
+    return {
+        "y_cumsum": np.concatenate(([0.0], np.cumsum(y))),
+        "y2_cumsum": np.concatenate(([0.0], np.cumsum(y * y))),
+    }
+
+
+def _segment_loglik_sufficient(c1, c2, tau_pos, mu, sigma):
+    """
+    Normal log-likelihood of a piecewise-constant mean from per-segment sufficient statistics.
+
+    Segment j holds the observations with tau_pos[j-1] < x <= tau_pos[j]. Its
+    sum and sum of squares are differences of the prefix sums `c1` / `c2`
+    (see `_prefix_sums`) gathered at the boundaries, so each evaluation costs
+    O(max_cp) instead of O(n).
+    """
+    n = pt.cast(c1.shape[0] - 1, "int64")
+
+    bounds = pt.concatenate([
+        pt.zeros(1, dtype="int64"),
+        pt.cast(tau_pos, "int64") + 1,
+        pt.stack([n]),
+    ])
+    count = pt.cast(bounds[1:] - bounds[:-1], "float64")
+    s1 = c1[bounds[1:]] - c1[bounds[:-1]]
+    s2 = c2[bounds[1:]] - c2[bounds[:-1]]
+
+    sse = pt.sum(s2 - 2 * mu * s1 + count * mu ** 2)
+    return -0.5 * n * np.log(2 * np.pi) - n * pt.log(sigma) - 0.5 * sse / sigma ** 2
+
+
+def build_mean_shift_model(data, max_cp=5, min_dist=5, likelihood="indexed"):
+    """
+    Build (without sampling) the multiple mean change point model.
 
     Args:
         data (np.ndarray or pd.Series): The input time series.
         max_cp (int): Maximum number of change points to allow.
         min_dist (int): Minimum distance between consecutive change points (in time index).
+        likelihood (str): 'indexed' looks up each observation's segment with one
+            binary search over the sorted change points and observes `y_obs`;
+            'sufficient' scores whole segments from prefix sums (O(max_cp) per
+            gradient step, no `y_obs` / log_likelihood group in the trace).
 
     Returns:
-        trace (az.InferenceData): Posterior trace.
-        model (pm.Model): PyMC model.
+        pm.Model: PyMC model.
     """
-    n = len(data)
-    x = np.arange(n)
+    if likelihood not in ("indexed", "sufficient"):
+        raise ValueError("likelihood must be 'indexed' or 'sufficient'")
+
+    y = np.asarray(data, dtype=np.float64)
 
     with pm.Model() as model:
+        y_data = pm.Data("y", y)
+        n = y_data.shape[0]
+        x = pt.arange(n)
+
         delta_tau = pm.Exponential("delta_tau", lam=1.0, shape=max_cp)
         tau_unscaled = pt.cumsum(delta_tau)
 
@@ -49,80 +388,713 @@ def bayesian_mean_shift_flexible(data, max_cp=5, min_dist=5):
         mu = pm.Normal("mu", mu=0, sigma=10, shape=max_cp + 1)
         sigma = pm.HalfNormal("sigma", sigma=5)
 
-        mu_obs = pt.alloc(mu[0], n)
-        for i in range(max_cp):
-            mu_obs = pt.switch(x > tau_pos[i], mu[i + 1], mu_obs)
+        if likelihood == "sufficient":
+            sums = {name: pm.Data(name, values) for name, values in _prefix_sums(y).items()}
+            pm.Potential("y_loglik", _segment_loglik_sufficient(sums["y_cumsum"], sums["y2_cumsum"], tau_pos, mu, sigma))
+        else:
+            # tau_pos is non-decreasing, so the segment of x is the number of
+            # change points strictly before it
+            segment = searchsorted(tau_pos, x, side="left")
+            y_obs = pm.Normal("y_obs", mu=mu[segment], sigma=sigma, observed=y_data)
 
-        y_obs = pm.Normal("y_obs", mu=mu_obs, sigma=sigma, observed=data)
+    return model
 
-        trace = pm.sample(
-            draws=2000,
-            tune=2000,
-            chains=4,
-            target_accept=0.95,
-            return_inferencedata=True
+
+def bayesian_mean_shift_flexible(data, max_cp=5, min_dist=5, likelihood="indexed", inference="nuts", random_seed=None, cache=False, cores=None,
+                                 progress=None, initvals=None):
+    """
+    Bayesian model to detect up to `max_cp` mean change points in a time series.
+
+    Args:
+        data (np.ndarray or pd.Series): The input time series.
+        max_cp (int): Maximum number of change points to allow.
+        min_dist (int): Minimum distance between consecutive change points (in time index).
+        likelihood (str): 'indexed' or 'sufficient'; see `build_mean_shift_model`.
+        inference (str): Only 'nuts': the rounded `tau_pos` passes no
+            gradient to `delta_tau`, so 'map' and 'advi' would return the
+            change points they start from.
+        random_seed (int, optional): Seed.
+        cache (bool): Reuse the compiled model for these settings across calls;
+            see `get_cached_model`.
+        cores (int, optional): Processes running the NUTS chains.
+        progress (callable, optional): Called with the fraction of the fit done;
+            see `_run_inference`.
+        initvals (dict, optional): Initial values of free variables; by default
+            `delta_tau` starts at the PELT segmentation (see `change_point_initvals`).
+
+    Returns:
+        trace (az.InferenceData): Posterior trace.
+        model (pm.Model): PyMC model.
+    """
+    if inference in ("map", "advi"):
+        raise ValueError(
+            f"inference='{inference}' cannot locate the mean-shift change points, whose rounded positions pass "
+            "no gradient; use inference='nuts', or exact_change_point.detect_change_points for a point estimate."
         )
+    if initvals is None:
+        initvals = change_point_initvals("mean", data, max_cp=max_cp, min_dist=min_dist)
+    return _fit(
+        "mean", data, dict(max_cp=max_cp, min_dist=min_dist, likelihood=likelihood),
+        inference=inference, cache=cache, random_seed=random_seed, cores=cores, progress=progress, initvals=initvals,
+        draws=2000, tune=2000, chains=4,
+    )
+
+
+# Single change point models place `cp` uniformly on [CP_MARGIN, n - CP_MARGIN]
+CP_MARGIN = 10
+
+
+def _normal_logpdf(y, mu, sigma):
+    return -0.5 * np.log(2 * np.pi) - np.log(sigma) - 0.5 * ((y - mu) / sigma) ** 2
 
-    return trace, model
 
-def bayesian_trend_change_model(data):
+def _logsumexp(x):
     """
-    Detect a single trend (slope) change point using Bayesian piecewise linear regression.
+    Stable logsumexp of a pytensor vector.
+
+    pm.math.logsumexp gets rewritten into an unshifted log(sum(exp(x))) whose
+    gradient overflows on cumulative log-likelihoods; shifting by a
+    gradient-free max keeps both the value and the gradient finite.
+    """
+    x_max = zero_grad(pt.max(x))
+    return x_max + pt.log(pt.sum(pt.exp(x - x_max)))
+
+
+def _split_loglik(cs1, cs2, candidates):
+    """
+    Log-likelihood of every split position from cumulative pointwise log-likelihoods.
+
+    With cs1 / cs2 the running sums of the before / after log-likelihoods, a
+    split at c scores sum_{t<c} l1_t + sum_{t>=c} l2_t = cs1[c-1] + cs2[-1] - cs2[c-1].
+    Works on pytensor vectors and on NumPy arrays of shape (draws, n).
+    """
+    before = candidates - 1
+    total = cs2.take([cs2.shape[-1] - 1], axis=-1)
+    return cs1.take(before, axis=-1) + total - cs2.take(before, axis=-1)
+
+
+def _trend_pointwise_loglik(x, y, post):
+    l1 = _normal_logpdf(y, post["a1"][:, None] * x + post["b1"][:, None], post["sigma"][:, None])
+    l2 = _normal_logpdf(y, post["a2"][:, None] * x + post["b2"][:, None], post["sigma"][:, None])
+    return l1, l2
+
+
+def _variance_pointwise_loglik(x, y, post):
+    l1 = _normal_logpdf(y, post["mu"][:, None], post["sigma1"][:, None])
+    l2 = _normal_logpdf(y, post["mu"][:, None], post["sigma2"][:, None])
+    return l1, l2
+
+
+def recover_change_point(trace, data, pointwise_loglik, random_seed=None, chunk_size=256):
+    """
+    Recover the posterior of a marginalized discrete change point.
+
+    For every posterior draw of the continuous parameters, p(cp | params, y) is
+    computed exactly over all candidate positions and one `cp` is drawn from
+    it, so (params, cp) are exact joint posterior draws. The Rao-Blackwellized
+    marginal p(cp | y), the average of those conditionals, is stored in the
+    'cp_posterior' group.
+
+    Args:
+        trace (az.InferenceData): Trace of a marginalized model.
+        data (array-like): The observed series.
+        pointwise_loglik (callable): (x, y, dict of flat posterior arrays) ->
+            before / after log-likelihoods of shape (draws, n).
+        random_seed (int, optional): Seed for drawing cp.
+        chunk_size (int): Draws processed at a time, bounding memory to chunk_size x n.
+
+    Returns:
+        az.InferenceData: The same trace with `cp` added to the posterior.
+    """
+    import xarray as xr
+
+    y = np.asarray(data, dtype=np.float64)
+    n = len(y)
+    x = np.arange(n)
+    candidates = np.arange(CP_MARGIN, n - CP_MARGIN + 1)
+    rng = np.random.default_rng(random_seed)
+
+    posterior = trace.posterior
+    n_chains, n_draws = posterior.sizes["chain"], posterior.sizes["draw"]
+    flat = {
+        name: posterior[name].values.reshape(n_chains * n_draws)
+        for name in posterior.data_vars
+        if posterior[name].ndim == 2
+    }
+
+    cp = np.empty(n_chains * n_draws, dtype=np.int64)
+    marginal = np.zeros(len(candidates))
+    for lo in range(0, len(cp), chunk_size):
+        chunk = {name: values[lo:lo + chunk_size] for name, values in flat.items()}
+        l1, l2 = pointwise_loglik(x, y, chunk)
+        ll = _split_loglik(np.cumsum(l1, axis=1), np.cumsum(l2, axis=1), candidates)
+
+        prob = np.exp(ll - ll.max(axis=1, keepdims=True))
+        prob /= prob.sum(axis=1, keepdims=True)
+        marginal += prob.sum(axis=0)
+
+        # Inverse-CDF draw of one cp per row
+        u = rng.random((len(prob), 1))
+        picks = (np.cumsum(prob, axis=1) < u).sum(axis=1)
+        cp[lo:lo + len(prob)] = candidates[np.minimum(picks, len(candidates) - 1)]
+
+    posterior["cp"] = (("chain", "draw"), cp.reshape(n_chains, n_draws))
+    trace.add_groups(
+        cp_posterior=xr.Dataset(
+            {"probability": (("cp_index",), marginal / len(cp))},
+            coords={"cp_index": candidates},
+        )
+    )
+    return trace
+
+
+def build_trend_change_model(data, marginalized=False):
+    """
+    Build (without sampling) the single trend change point model.
 
     Args:
         data (array-like): 1D time series data.
+        marginalized (bool): If True, `cp` is summed out analytically over all
+            candidate positions (O(n) per gradient step via cumulative sums), so
+            the model is fully continuous and runs under pure NUTS. Recover `cp`
+            afterwards with `recover_change_point`.
 
     Returns:
-        trace: Posterior samples.
         model: The PyMC model.
     """
-    x = np.arange(len(data))
-    y = np.array(data)
-
     with pm.Model() as model:
-        cp = pm.DiscreteUniform("cp", lower=10, upper=len(data) - 10)
+        y = pm.Data("y", np.asarray(data, dtype=np.float64))
+        n = y.shape[0]
+        x = pt.arange(n)
+
+        if not marginalized:
+            cp = pm.DiscreteUniform("cp", lower=CP_MARGIN, upper=n - CP_MARGIN)
 
         a1 = pm.Normal("a1", mu=0, sigma=1)
         b1 = pm.Normal("b1", mu=0, sigma=1)
         a2 = pm.Normal("a2", mu=0, sigma=1)
         b2 = pm.Normal("b2", mu=0, sigma=1)
 
-        mu = pm.math.switch(x < cp, a1 * x + b1, a2 * x + b2)
-
         sigma = pm.HalfNormal("sigma", sigma=1)
-        y_obs = pm.Normal("y_obs", mu=mu, sigma=sigma, observed=y)
 
-        trace = pm.sample(1000, tune=1000, chains=2, target_accept=0.95)
+        if marginalized:
+            l1 = pm.logp(pm.Normal.dist(mu=a1 * x + b1, sigma=sigma), y)
+            l2 = pm.logp(pm.Normal.dist(mu=a2 * x + b2, sigma=sigma), y)
+            candidates = pt.arange(CP_MARGIN, n - CP_MARGIN + 1)
+            ll = _split_loglik(pt.cumsum(l1), pt.cumsum(l2), candidates)
+            pm.Potential("y_marginal", _logsumexp(ll) - pt.log(ll.shape[0]))
+        else:
+            mu = pm.math.switch(x < cp, a1 * x + b1, a2 * x + b2)
+            y_obs = pm.Normal("y_obs", mu=mu, sigma=sigma, observed=y)
 
-    return trace, model
+    return model
 
 
-def bayesian_variance_shift_model(data):
+def bayesian_trend_change_model(data, marginalized=False, inference="nuts", random_seed=None, cache=False, cores=None, progress=None,
+                                initvals=None):
     """
-    Detect a single variance change point using a Bayesian model.
+    Detect a single trend (slope) change point using Bayesian piecewise linear regression.
 
     Args:
         data (array-like): 1D time series data.
+        marginalized (bool): Sum `cp` out of the likelihood and sample with pure
+            NUTS; `cp` is then recovered exactly from the posterior draws.
+        inference (str): 'nuts', 'advi' or 'map'; see `_run_inference`. The
+            approximate methods always use the marginalized model.
+        random_seed (int, optional): Seed.
+        cache (bool): Reuse the compiled model for these settings across calls;
+            see `get_cached_model`.
+        cores (int, optional): Processes running the NUTS chains.
+        progress (callable, optional): Called with the fraction of the fit done;
+            see `_run_inference`.
+        initvals (dict, optional): Initial values of free variables; by default
+            the discrete `cp` starts at the best single split (see
+            `change_point_initvals`).
 
     Returns:
         trace: Posterior samples.
         model: The PyMC model.
     """
-    x = np.arange(len(data))
-    y = np.array(data)
+    # ADVI and the Laplace approximation need a fully continuous model
+    marginalized = marginalized or inference != "nuts"
+    if initvals is None and not marginalized:
+        initvals = change_point_initvals("trend", data)
+    trace, model = _fit(
+        "trend", data, dict(marginalized=marginalized),
+        inference=inference, cache=cache, random_seed=random_seed, cores=cores, progress=progress, initvals=initvals,
+        draws=1000, tune=1000, chains=2,
+    )
+
+    if marginalized:
+        trace = recover_change_point(trace, data, _trend_pointwise_loglik, random_seed=random_seed)
+
+    return trace, model
+
+
+def build_variance_shift_model(data, marginalized=False):
+    """
+    Build (without sampling) the single variance change point model.
 
+    Args:
+        data (array-like): 1D time series data.
+        marginalized (bool): Sum `cp` out analytically; see `build_trend_change_model`.
+
+    Returns:
+        model: The PyMC model.
+    """
     with pm.Model() as model:
-        cp = pm.DiscreteUniform("cp", lower=10, upper=len(data) - 10)
+        y = pm.Data("y", np.asarray(data, dtype=np.float64))
+        n = y.shape[0]
+        x = pt.arange(n)
+
+        if not marginalized:
+            cp = pm.DiscreteUniform("cp", lower=CP_MARGIN, upper=n - CP_MARGIN)
 
         mu = pm.Normal("mu", mu=0, sigma=10)
         sigma1 = pm.HalfNormal("sigma1", sigma=5)
         sigma2 = pm.HalfNormal("sigma2", sigma=5)
 
-        sigma = pm.math.switch(x < cp, sigma1, sigma2)
+        if marginalized:
+            l1 = pm.logp(pm.Normal.dist(mu=mu, sigma=sigma1), y)
+            l2 = pm.logp(pm.Normal.dist(mu=mu, sigma=sigma2), y)
+            candidates = pt.arange(CP_MARGIN, n - CP_MARGIN + 1)
+            ll = _split_loglik(pt.cumsum(l1), pt.cumsum(l2), candidates)
+            pm.Potential("y_marginal", _logsumexp(ll) - pt.log(ll.shape[0]))
+        else:
+            sigma = pm.math.switch(x < cp, sigma1, sigma2)
+            y_obs = pm.Normal("y_obs", mu=mu, sigma=sigma, observed=y)
+
+    return model
+
+
+def bayesian_variance_shift_model(data, marginalized=False, inference="nuts", random_seed=None, cache=False, cores=None, progress=None,
+                                  initvals=None):
+    """
+    Detect a single variance change point using a Bayesian model.
+
+    Args:
+        data (array-like): 1D time series data.
+        marginalized (bool): Sum `cp` out of the likelihood and sample with pure
+            NUTS; `cp` is then recovered exactly from the posterior draws.
+        inference (str): 'nuts', 'advi' or 'map'; see `_run_inference`. The
+            approximate methods always use the marginalized model.
+        random_seed (int, optional): Seed.
+        cache (bool): Reuse the compiled model for these settings across calls;
+            see `get_cached_model`.
+        cores (int, optional): Processes running the NUTS chains.
+        progress (callable, optional): Called with the fraction of the fit done;
+            see `_run_inference`.
+        initvals (dict, optional): Initial values of free variables; by default
+            the discrete `cp` starts at the best single split (see
+            `change_point_initvals`).
 
-        y_obs = pm.Normal("y_obs", mu=mu, sigma=sigma, observed=y)
+    Returns:
+        trace: Posterior samples.
+        model: The PyMC model.
+    """
+    # ADVI and the Laplace approximation need a fully continuous model
+    marginalized = marginalized or inference != "nuts"
+    if initvals is None and not marginalized:
+        initvals = change_point_initvals("var", data)
+    trace, model = _fit(
+        "var", data, dict(marginalized=marginalized),
+        inference=inference, cache=cache, random_seed=random_seed, cores=cores, progress=progress, initvals=initvals,
+        draws=1000, tune=1000, chains=2,
+    )
 
-        trace = pm.sample(1000, tune=1000, chains=2, target_accept=0.95)
+    if marginalized:
+        trace = recover_change_point(trace, data, _variance_pointwise_loglik, random_seed=random_seed)
 
     return trace, model
 
+
+# Segment cost of modules.exact_change_point matching each model's likelihood
+EXACT_COST_MODELS = {"mean": "mean", "trend": "linear", "var": "var"}
+
+
+def change_point_initvals(model_type, data, change_points=None, max_cp=5, min_dist=5):
+    """
+    Initial values that start a model's change points at an exact segmentation.
+
+    Without `change_points`, the segmentation comes from
+    modules.exact_change_point: PELT for the mean-shift model (binary
+    segmentation if PELT finds more than it can place), and the single best
+    split for the trend and variance models.
+
+    Args:
+        model_type (str): 'mean', 'trend' or 'var'.
+        data (array-like): 1D time series data.
+        change_points (array-like, optional): Change point indices (first index
+            of each new segment), e.g. from `detect_change_points`.
+        max_cp (int): Change points of the mean-shift model.
+        min_dist (int): Minimum distance of the mean-shift model.
+
+    Returns:
+        dict: 'delta_tau' for the mean-shift model, whose last change point is
+            fixed at n - min_dist, so at most max_cp - 1 are placed (the rest
+            are spread after the last one); 'cp' for the trend and variance
+            models, which have no `cp` to start when marginalized.
+    """
+    from modules.exact_change_point import SegmentCost, binary_segmentation, detect_change_points
+
+    if model_type not in EXACT_COST_MODELS:
+        raise ValueError(f"Unknown model type '{model_type}'. Expected one of {tuple(EXACT_COST_MODELS)}.")
+    y = np.asarray(data, dtype=np.float64)
+    n = len(y)
+    cost_model = EXACT_COST_MODELS[model_type]
+
+    if model_type != "mean":
+        if change_points is None:
+            change_points = binary_segmentation(SegmentCost(y, cost_model), n_bkps=1, min_dist=CP_MARGIN)
+        cp = int(change_points[0]) if len(change_points) else n // 2
+        return {"cp": int(np.clip(cp, CP_MARGIN, n - CP_MARGIN))}
+
+    if change_points is None:
+        change_points = detect_change_points(y, cost_model, min_dist=min_dist)
+        if len(change_points) > max_cp - 1:
+            change_points = detect_change_points(y, cost_model, method="binseg", n_bkps=max_cp - 1, min_dist=min_dist)
+    change_points = np.sort(np.asarray(change_points, dtype=np.int64))[:max_cp - 1]
+
+    # tau_pos[j] = round(span * c_j + j * min_dist), with c_j the normalized
+    # cumulative sum of delta_tau (c = 1 for the last), is the last index of
+    # segment j, i.e. one before the change point
+    span = n - max_cp * min_dist
+    eps = 1e-6
+    c = (change_points - 1 - np.arange(len(change_points)) * min_dist) / span
+    c = np.clip(c, eps, 1 - eps)
+    last = c[-1] if len(c) else 0.0
+    c = np.concatenate([c, np.linspace(last, 1.0, max_cp - len(c) + 1)[1:-1]])
+    delta = np.maximum(np.diff(np.concatenate([[0.0], c, [1.0]])), eps)
+    # Positions only depend on the proportions; scale to the prior mean of 1
+    return {"delta_tau": delta * max_cp / delta.sum()}
+
+
+MODEL_BUILDERS = {
+    "mean": build_mean_shift_model,
+    "trend": build_trend_change_model,
+    "var": build_variance_shift_model,
+}
+
+_model_cache = {}
+_model_cache_lock = threading.Lock()
+
+
+def set_model_data(model, data):
+    """
+    Swap a new series into a model built by one of the builders.
+
+    Shapes are symbolic, so the series may have any length.
+
+    Args:
+        model (pm.Model): Model from build_mean_shift_model, build_trend_change_model
+            or build_variance_shift_model.
+        data (array-like): 1D time series data.
+    """
+    y = np.asarray(data, dtype=np.float64)
+    values = {"y": y}
+    if "y_cumsum" in model.named_vars:
+        values.update(_prefix_sums(y))
+    pm.set_data(values, model=model)
+
+
+def get_cached_model(model_type, data, **options):
+    """
+    Return the cached model for `model_type` and builder options, building it on first use.
+
+    The cache is keyed on the model type and the options (e.g. max_cp, min_dist,
+    likelihood, marginalized) but not on the series length, since one compiled
+    model serves any length. Call `set_model_data` under `cached.lock` before
+    fitting.
+
+    Args:
+        model_type (str): 'mean', 'trend' or 'var'.
+        data (array-like): Series used to build the model on a cache miss.
+        **options: Keyword arguments of the builder.
+
+    Returns:
+        CachedModel: The shared model and its compiled functions.
+    """
+    if model_type not in MODEL_BUILDERS:
+        raise ValueError(f"Unknown model type '{model_type}'. Expected one of {tuple(MODEL_BUILDERS)}.")
+
+    key = (model_type,) + tuple(sorted(options.items()))
+    with _model_cache_lock:
+        cached = _model_cache.get(key)
+        if cached is None:
+            cached = _model_cache[key] = CachedModel(MODEL_BUILDERS[model_type](data, **options))
+    return cached
+
+
+def clear_model_cache():
+    """Drop every cached model."""
+    with _model_cache_lock:
+        _model_cache.clear()
+
+
+def _fit(model_type, data, options, inference, cache, random_seed, **sample_kwargs):
+    if cache:
+        cached = get_cached_model(model_type, data, **options)
+    else:
+        cached = CachedModel(MODEL_BUILDERS[model_type](data, **options))
+
+    with cached.lock:
+        set_model_data(cached.model, data)
+        trace = _run_inference(cached, inference, random_seed=random_seed, **sample_kwargs)
+    _record_fit(trace, model_type, data, options, inference)
+    return trace, cached.model
+
+
+def _data_hash(y):
+    return hashlib.sha1(np.ascontiguousarray(y, dtype=np.float64).tobytes()).hexdigest()
+
+
+def _record_fit(trace, model_type, data, options, inference):
+    """Store what `update_fit` needs to extend the fit in the posterior attributes."""
+    y = np.asarray(data, dtype=np.float64)
+    trace.posterior.attrs.update(
+        model_type=model_type,
+        fit_options=json.dumps(options, sort_keys=True),
+        inference=inference,
+        n_observations=len(y),
+        data_hash=_data_hash(y),
+    )
+    if "sample_stats" in trace and "step_size" in trace.sample_stats:
+        trace.posterior.attrs["step_size"] = float(trace.sample_stats["step_size"].mean())
+
+
+# Tuning steps of a warm-started NUTS update, against 1000-2000 for a full fit
+UPDATE_TUNE = 200
+
+# Weight of the previous posterior variance in the updated mass matrix, in draws
+UPDATE_MASS_WEIGHT = 50
+
+# Pareto k above which importance weights are unreliable (Vehtari et al., 2015)
+PARETO_K_THRESHOLD = 0.7
+
+POINTWISE_LOGLIK = {
+    "trend": _trend_pointwise_loglik,
+    "var": _variance_pointwise_loglik,
+}
+
+
+def _unconstrained_draws(cached, posterior):
+    """
+    Posterior draws of every value variable, mapped to the unconstrained space.
+
+    Returns:
+        dict: Value variable name -> array of shape (chains * draws, ...).
+    """
+    model = cached.model
+    n_draws = posterior.sizes["chain"] * posterior.sizes["draw"]
+    draws = {}
+    for value_var in model.value_vars:
+        rv = model.values_to_rvs[value_var]
+        values = posterior[rv.name].values.reshape((n_draws,) + posterior[rv.name].shape[2:])
+        transform = model.rvs_to_transforms.get(rv)
+        if transform is not None:
+            forward = cached.function(
+                f"forward_{rv.name}",
+                lambda: _compile_forward(transform, rv, values.ndim),
+            )
+            values = forward(values)
+        draws[value_var.name] = np.asarray(values, dtype=value_var.dtype)
+    return draws
+
+
+def _compile_forward(transform, rv, ndim):
+    import pytensor
+
+    # The models only use elementwise transforms (log), which broadcast over draws
+    x = pt.tensor(dtype=rv.dtype, shape=(None,) * ndim)
+    return pytensor.function([x], transform.forward(x, *rv.owner.inputs))
+
+
+def _importance_weights(cached, draws, y_previous, y):
+    """
+    Pareto-smoothed log importance weights of previous posterior draws under the extended series.
+
+    The weight of a draw is the ratio of the model's log density on the new and
+    on the previous series; priors and Jacobians cancel.
+
+    Returns:
+        tuple: (normalized log weights, Pareto k diagnostic).
+    """
+    logp = cached.function("logp", lambda: cached.model.compile_logp())
+    n_draws = len(next(iter(draws.values())))
+    points = [{name: values[i] for name, values in draws.items()} for i in range(n_draws)]
+
+    set_model_data(cached.model, y_previous)
+    logp_previous = np.array([logp(point) for point in points])
+    set_model_data(cached.model, y)
+    logp_new = np.array([logp(point) for point in points])
+
+    log_weights, pareto_k = az.psislw(logp_new - logp_previous)
+    return log_weights, float(pareto_k)
+
+
+def _warm_nuts_sample(cached, draws, weights, step_size, n_draws, chains, tune, target_accept, random_seed=None, cores=None,
+                      progress=None):
+    """
+    pm.sample started from the previous posterior.
+
+    Chains start at previous draws picked by importance weight, the diagonal
+    mass matrix starts from the previous posterior variance (weighted as
+    UPDATE_MASS_WEIGHT draws) and the step size from the previous run's, so a
+    short tuning phase suffices. The variance is not importance-weighted: the
+    scales barely move when a few observations are appended, while the weights
+    collapse onto a handful of draws exactly when a refit is needed. The step
+    is cached apart from `_nuts_sample`'s, whose tuning must start cold.
+    """
+    from pymc.step_methods.hmc.integration import CpuLeapfrogIntegrator
+    from pymc.step_methods.hmc.quadpotential import QuadPotentialDiagAdapt
+    from pymc.step_methods.step_sizes import DualAverageAdaptation
+
+    model = cached.model
+    step = cached.function(f"update_step_{target_accept}", lambda: _build_step(model, target_accept))
+    rng = np.random.default_rng(random_seed)
+
+    for nuts in getattr(step, "methods", [step]):
+        if not isinstance(nuts, pm.NUTS):
+            continue
+        flat = np.concatenate([draws[v.name].reshape(len(weights), -1) for v in nuts.vars], axis=1)
+        var = np.maximum(flat.var(axis=0), 1e-10)
+        nuts.potential = QuadPotentialDiagAdapt(len(var), flat.mean(axis=0), var, UPDATE_MASS_WEIGHT)
+        # The integrator holds its own reference to the potential; the compiled
+        # logp / gradient are reused
+        nuts.integrator = CpuLeapfrogIntegrator(nuts.potential, nuts._logp_dlogp_func)
+        if step_size:
+            # pymc's default dual averaging constants, from the previous step size
+            nuts.step_size = step_size
+            nuts.step_adapt = DualAverageAdaptation(step_size, target_accept, 0.05, 0.75, 10)
+
+    # Initial values are given in the constrained space, like the jittered ones.
+    # Collapsed weights (large Pareto k) may leave fewer distinct draws than
+    # chains; those chains then share a start
+    replace = np.count_nonzero(weights) < chains
+    starts = rng.choice(len(weights), size=chains, replace=replace, p=weights)
+    values = _evaluate_draws(cached, [{name: v[i] for name, v in draws.items()} for i in starts])
+    free = {rv.name for rv in model.free_RVs}
+    initvals = [{name: v[c] for name, v in values.items() if name in free} for c in range(chains)]
+
+    with model:
+        return pm.sample(
+            draws=n_draws,
+            tune=tune,
+            chains=chains,
+            cores=cores,
+            step=step,
+            initvals=initvals,
+            random_seed=random_seed,
+            callback=_sample_callback(progress, chains * (tune + n_draws)),
+            return_inferencedata=True
+        )
+
+
+def update_fit(trace, data, tune=UPDATE_TUNE, target_accept=0.95, pareto_k_threshold=PARETO_K_THRESHOLD,
+               force=False, random_seed=None, cache=True, cores=None, progress=None):
+    """
+    Extend a fit to a series that grew at the end, without refitting from scratch.
+
+    The previous posterior draws are importance-weighted by the likelihood of
+    the extended series. When the weights are reliable (Pareto k below the
+    threshold) the new data cannot have moved the posterior, including the
+    earlier change points, beyond what reweighting captures: the draws are
+    resampled by weight, deterministics are recomputed on the new series and no
+    sampler runs. Otherwise the model is refit warm: NUTS starts from the
+    reweighted draws with their mass matrix and step size and tunes for only
+    `tune` steps, and 'map' / 'advi' fits start at the previous posterior mean.
+
+    For the marginalized trend and variance models, the change point grid only
+    grows at the tail: `cp` is recovered over all candidates of the new series,
+    so the appended positions become candidates whichever path is taken. Models
+    with a discrete `cp` are always refit, since reweighting cannot reach the
+    new tail candidates.
+
+    The mean-shift model places its change points at fractions of the series
+    length, so appending data moves every `tau_pos` of a draw, not only the
+    tail. The weights score each draw at its moved positions on the new
+    series (the prior on `delta_tau` does not depend on the length), so they
+    remain valid importance weights, and a draw whose moved change points no
+    longer fit the data gets a negligible weight. When too many do, the
+    Pareto k exceeds the threshold and the model is refit.
+
+    Args:
+        trace (az.InferenceData): Fit returned by one of the bayesian_* functions
+            (or a previous update); its posterior attributes identify the model.
+        data (array-like): The previous series with new observations appended.
+        tune (int): NUTS tuning steps of a warm refit.
+        target_accept (float): NUTS target acceptance rate.
+        pareto_k_threshold (float): Refit when the weights' Pareto k exceeds this.
+        force (bool): Always refit.
+        random_seed (int, optional): Seed.
+        cache (bool): Reuse the compiled model; see `get_cached_model`.
+        cores (int, optional): Processes running the NUTS chains.
+        progress (callable, optional): Called with the fraction of the fit done;
+            see `_run_inference`.
+
+    Returns:
+        trace (az.InferenceData): Posterior on the extended series, with the
+            attributes 'update' ('reweighted' or 'refit') and 'pareto_k'.
+        model (pm.Model): PyMC model.
+    """
+    attrs = dict(trace.posterior.attrs)
+    if "data_hash" not in attrs:
+        raise ValueError("The trace carries no fit metadata; fit it again before updating.")
+
+    y = np.asarray(data, dtype=np.float64)
+    n_previous = int(attrs["n_observations"])
+    if len(y) < n_previous or _data_hash(y[:n_previous]) != attrs["data_hash"]:
+        raise ValueError("The data does not extend the series the trace was fitted on.")
+
+    model_type, inference = attrs["model_type"], attrs["inference"]
+    options = json.loads(attrs["fit_options"])
+    if cache:
+        cached = get_cached_model(model_type, y, **options)
+    else:
+        cached = CachedModel(MODEL_BUILDERS[model_type](y, **options))
+    if len(y) == n_previous:
+        return trace, cached.model
+
+    posterior = trace.posterior
+    n_chains, n_draws = posterior.sizes["chain"], posterior.sizes["draw"]
+    marginalized = options.get("marginalized", False)
+    discrete = any(rv.name == "cp" for rv in cached.model.free_RVs)
+
+    with cached.lock:
+        draws = _unconstrained_draws(cached, posterior)
+        log_weights, pareto_k = _importance_weights(cached, draws, y[:n_previous], y)
+        weights = np.exp(log_weights)
+        weights /= weights.sum()
+
+        if pareto_k < pareto_k_threshold and not (force or discrete):
+            # Systematic resampling keeps the number of draws and the chain layout
+            rng = np.random.default_rng(random_seed)
+            positions = (rng.random() + np.arange(n_chains * n_draws)) / (n_chains * n_draws)
+            picks = np.minimum(np.searchsorted(np.cumsum(weights), positions), len(weights) - 1)
+            values = _evaluate_draws(cached, [{name: v[i] for name, v in draws.items()} for i in picks])
+            new_trace = az.from_dict(posterior={
+                name: v.reshape((n_chains, n_draws) + v.shape[1:]) for name, v in values.items()
+            })
+            update = "reweighted"
+        elif inference == "nuts":
+            new_trace = _warm_nuts_sample(
+                cached, draws, weights, attrs.get("step_size"), n_draws, n_chains, tune, target_accept,
+                random_seed=random_seed, cores=cores, progress=progress,
+            )
+            update = "refit"
+        else:
+            start = {name: weights @ v.reshape(len(weights), -1) for name, v in draws.items()}
+            start = {name: v.reshape(draws[name].shape[1:]) for name, v in start.items()}
+            new_trace = _run_inference(
+                cached, inference, draws=n_chains * n_draws, random_seed=random_seed, start=start, progress=progress,
+            )
+            update = "refit"
+
+    _record_fit(new_trace, model_type, y, options, inference)
+    if update == "reweighted" and "step_size" in attrs:
+        new_trace.posterior.attrs["step_size"] = attrs["step_size"]
+    new_trace.posterior.attrs.update(update=update, pareto_k=pareto_k)
+
+    if marginalized:
+        new_trace = recover_change_point(new_trace, y, POINTWISE_LOGLIK[model_type], random_seed=random_seed)
+    return new_trace, cached.model
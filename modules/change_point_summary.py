@@ -0,0 +1,161 @@
+"""
+Compile posterior change point traces into small JSON sidecar summaries.
+
+Serving change points from a full NetCDF posterior means loading every sample
+of every variable on each cold request. The summary keeps only what the
+dashboard needs: the posterior histogram over change point indices, per change
+point mode / mean / HDI, and the dates already mapped. Summaries are compiled
+by this script, by modules.trace_update when it rewrites a trace, or by the
+API on the first request after a trace or the price file changed.
+
+Usage:
+    python -m modules.change_point_summary [--models-dir models] [--prices data/brent_prices.csv]
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+
+from modules.config import BASE_DIR, PRICE_FILE
+from modules.logger import get_logger
+from modules.posterior_utils import CP_KEYS, change_point_samples, summarize_posterior
+
+logger = get_logger()
+
+MODEL_DIR = BASE_DIR / "models"
+TRACE_FILES = {
+    "mean": "trace_mean.nc",
+    "trend": "trace_trend.nc",
+    "var": "trace_var.nc",
+}
+SUMMARY_SUFFIX = ".summary.json"
+
+
+def summary_path(trace_path):
+    """Sidecar path for a trace, e.g. models/trace_mean.nc -> models/trace_mean.summary.json."""
+    trace_path = Path(trace_path)
+    return trace_path.with_name(trace_path.stem + SUMMARY_SUFFIX)
+
+
+def summarize_change_points(samples, dates, hdi_prob=0.94):
+    """
+    Summarize posterior change point samples.
+
+    Args:
+        samples (np.ndarray): Change point index samples, shape (chains, draws)
+            or (chains, draws, max_cp).
+        dates (array-like): Dates of the series the indices refer to.
+        hdi_prob (float): Probability mass of the highest density intervals.
+
+    Returns:
+        dict: JSON-serializable summary.
+    """
+    post = summarize_posterior(samples, dates, hdi_prob=hdi_prob)
+    pooled = post["counts"].sum(axis=0)
+
+    change_points = [
+        {
+            "mode_index": int(post["mode"][i]),
+            "mode_date": str(post["mode_dates"][i]),
+            "mode_probability": float(post["mode_probability"][i]),
+            "mean_index": float(post["mean"][i]),
+            "hdi_index": post["hdi"][i].tolist(),
+            "hdi_dates": post["hdi_dates"][i].tolist(),
+        }
+        for i in range(len(post["mode"]))
+    ]
+
+    return {
+        "n_samples": int(post["counts"][0].sum()),
+        "n_dates": int(len(dates)),
+        "hdi_prob": hdi_prob,
+        "histogram": {
+            "index": post["indices"].tolist(),
+            "count": pooled[post["indices"]].tolist(),
+        },
+        "dates": post["index_dates"].tolist(),
+        "change_points": change_points,
+    }
+
+
+def compile_trace_summary(trace_path, dates, out_path=None, hdi_prob=0.94):
+    """
+    Load a trace once and write its change point summary next to it.
+
+    Args:
+        trace_path (str or Path): NetCDF trace written by az.to_netcdf.
+        dates (array-like): Dates of the series the model was fitted on.
+        out_path (str or Path, optional): Destination; defaults to `summary_path(trace_path)`.
+        hdi_prob (float): Probability mass of the highest density intervals.
+
+    Returns:
+        dict: The summary that was written.
+    """
+    from modules.trace_store import load_posterior
+
+    trace_path = Path(trace_path)
+    out_path = Path(out_path) if out_path else summary_path(trace_path)
+
+    # Only the change point variable is read, not the whole trace
+    cp_key, samples = change_point_samples(load_posterior(trace_path, CP_KEYS))
+    summary = summarize_change_points(samples, dates, hdi_prob=hdi_prob)
+    stat = os.stat(trace_path)
+    summary["trace"] = trace_path.name
+    summary["variable"] = cp_key
+    summary["source_signature"] = [stat.st_mtime_ns, stat.st_size]
+
+    # Write atomically so concurrent readers never see a partial file
+    tmp_path = out_path.with_name(out_path.name + f".{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(summary, f, separators=(",", ":"))
+    os.replace(tmp_path, out_path)
+
+    logger.info(f"Compiled {trace_path.name} -> {out_path.name} ({len(summary['histogram']['index'])} distinct indices)")
+    return summary
+
+
+def price_dates(prices_path=PRICE_FILE):
+    """
+    Dates of the Brent price series that change point indices refer to.
+
+    Read through the same columnar cache (modules.ingest) as the backend's
+    shared price dataset, so summaries compiled here and by the API map
+    indices to the same dates.
+
+    Returns:
+        np.ndarray: Sorted datetime64 dates.
+    """
+    from modules.ingest import load_dataset
+
+    return load_dataset("prices", prices_path, columns=["date"])["date"].to_numpy()
+
+
+def is_stale(summary, trace_path, dates=None):
+    """
+    True if `summary` was compiled from a different version of `trace_path`,
+    or (when `dates` is given) against a price series of another length.
+    """
+    stat = os.stat(trace_path)
+    if summary.get("source_signature") != [stat.st_mtime_ns, stat.st_size]:
+        return True
+    return dates is not None and summary.get("n_dates") != len(dates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile change point traces into JSON summaries.")
+    parser.add_argument("--models-dir", default=str(MODEL_DIR))
+    parser.add_argument("--prices", default=str(PRICE_FILE))
+    parser.add_argument("--hdi-prob", type=float, default=0.94)
+    args = parser.parse_args()
+
+    dates = price_dates(args.prices)
+    for filename in TRACE_FILES.values():
+        trace_path = Path(args.models_dir) / filename
+        if trace_path.exists():
+            compile_trace_summary(trace_path, dates, hdi_prob=args.hdi_prob)
+        else:
+            logger.info(f"Skipping missing trace {trace_path}")
+
+
+if __name__ == "__main__":
+    main()
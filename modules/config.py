@@ -1,6 +1,13 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 DATA_DIR = BASE_DIR / "data"
 EVENT_FILE = DATA_DIR / "key_events.csv"
 PRICE_FILE = DATA_DIR / "brent_prices.csv"
+# Optional long-format (date, asset, price) history of other assets, e.g. WTI and Dubai
+PANEL_FILE = DATA_DIR / "price_panel.csv"
+
+# Persistent pytensor compile cache; point every worker at the same directory to
+# share compiled C modules across processes
+PYTENSOR_COMPILEDIR = Path(os.environ.get("BRENT_PYTENSOR_COMPILEDIR", BASE_DIR / ".pytensor"))
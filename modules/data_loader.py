@@ -1,16 +1,130 @@
+import csv
+import time
+
+import numpy as np
 import pandas as pd
 from modules.logger import get_logger
 logger = get_logger()
 
 def load_brent_data(filepath):
+    """
+    Load the Brent prices, validated and typed through their columnar cache (modules.ingest).
+
+    Args:
+        filepath (str or Path): CSV with 'Date' (e.g. 20-May-87) and 'Price' columns.
+
+    Returns:
+        pd.DataFrame: 'Date' (datetime64) and 'Price' (float64) columns, sorted by date.
+    """
+    from modules.ingest import load_dataset
+
     try:
-        df = pd.read_csv(filepath)
-        assert "Date" in df.columns and "Price" in df.columns
-        df["Date"] = pd.to_datetime(df["Date"], format="%d-%b-%y", errors='coerce')
-        df.dropna(subset=["Date", "Price"], inplace=True)
-        df.sort_values("Date", inplace=True)
+        df = load_dataset("prices", filepath).rename(columns={"date": "Date", "price": "Price"})
         logger.info(f"Loaded Brent data: {df.shape[0]} rows.")
         return df
     except Exception as e:
         logger.error(f"Failed to load Brent data: {e}")
         raise
+
+
+
+def stream_brent_data(filepath, follow=False, poll_interval=1.0):
+    """
+    Yield the rows of a Brent price CSV one at a time, without loading the file.
+
+    Reads the same format as `load_brent_data`. Rows that fail to parse, or are
+    not newer than the previous row, are skipped with a warning (a stream cannot
+    be re-sorted).
+
+    Args:
+        filepath (str or Path): CSV with 'Date' (e.g. 20-May-87) and 'Price' columns.
+        follow (bool): Keep polling for appended rows after reaching the end,
+            like `tail -f`, instead of stopping.
+        poll_interval (float): Seconds between polls when following.
+
+    Yields:
+        tuple: (pd.Timestamp, float price).
+    """
+    last_date = None
+    with open(filepath, newline="") as f:
+        header = next(csv.reader([f.readline()]))
+        date_col, price_col = header.index("Date"), header.index("Price")
+
+        partial = ""
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    break
+                time.sleep(poll_interval)
+                continue
+            if follow and not line.endswith("\n"):
+                # The writer has not finished this row yet
+                partial += line
+                continue
+            line, partial = partial + line, ""
+            if not line.strip():
+                continue
+
+            row = next(csv.reader([line]))
+            try:
+                date = pd.to_datetime(row[date_col], format="%d-%b-%y")
+                price = float(row[price_col])
+            except (ValueError, IndexError):
+                logger.warning(f"Skipping unparseable row: {line.strip()!r}")
+                continue
+            if last_date is not None and date <= last_date:
+                logger.warning(f"Skipping out-of-order row: {line.strip()!r}")
+                continue
+
+            last_date = date
+            yield date, price
+
+# Aggregate levels of the price pyramid, finest first, with their pandas period codes
+PYRAMID_LEVELS = {
+    "weekly": "W",
+    "monthly": "M",
+    "quarterly": "Q",
+    "yearly": "Y",
+}
+
+
+def build_price_pyramid(prices):
+    """
+    Precompute multi-resolution aggregates of a daily price series.
+
+    Each level holds one row per calendar period with OHLC prices, the mean
+    price, the realized volatility of daily log returns (square root of the
+    sum of squared returns in the period) and the number of trading days.
+    Building all levels is a one-off O(n) pass per level, so it belongs at
+    load time; serving a zoomed-out view then reads a few hundred rows.
+
+    Args:
+        prices (pd.Series): Daily prices with a sorted DatetimeIndex.
+
+    Returns:
+        dict: Level name (see PYRAMID_LEVELS) -> pd.DataFrame indexed by the
+            period start date with columns open, high, low, close, mean,
+            volatility and count.
+    """
+    prices = prices.astype("float64")
+    log_returns = np.log(prices).diff()
+
+    pyramid = {}
+    for level, freq in PYRAMID_LEVELS.items():
+        periods = prices.index.to_period(freq)
+        grouped = prices.groupby(periods, sort=True)
+        agg = pd.DataFrame({
+            "open": grouped.first(),
+            "high": grouped.max(),
+            "low": grouped.min(),
+            "close": grouped.last(),
+            "mean": grouped.mean(),
+            "volatility": np.sqrt((log_returns ** 2).groupby(periods, sort=True).sum()),
+            "count": grouped.size(),
+        })
+        agg.index = agg.index.start_time.rename(prices.index.name)
+        pyramid[level] = agg
+
+    logger.info("Built price pyramid: " + ", ".join(f"{k}={len(v)}" for k, v in pyramid.items()))
+    return pyramid
@@ -1,27 +1,40 @@
 # modules/eda.py
 
-import matplotlib.pyplot as plt
-import numpy as np
+from modules.rendering import DEFAULT_DPI, output
+from modules.time_series_utils import log_returns
 
-def plot_price_trend(df):
-    plt.figure(figsize=(14, 5))
-    plt.plot(df["Date"], df["Price"], label="Brent Oil Price", color="darkblue")
-    plt.title("Brent Oil Price Over Time")
-    plt.xlabel("Date")
-    plt.ylabel("Price (USD)")
-    plt.grid(True)
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
+# Plots are shown with pyplot when `fmt` is None and rendered headless to
+# cached PNG / SVG bytes when `fmt` is 'png' or 'svg' (see modules.rendering).
 
-def plot_log_returns(df):
-    df = df.copy()
-    df["Log_Return"] = np.log(df["Price"]) - np.log(df["Price"].shift(1))
-    plt.figure(figsize=(14, 4))
-    plt.plot(df["Date"], df["Log_Return"], color="darkgreen")
-    plt.title("Log Returns of Brent Oil Price")
-    plt.xlabel("Date")
-    plt.ylabel("Log Return")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+def draw_price_trend(fig, dates, prices):
+    ax = fig.subplots()
+    ax.plot(dates, prices, label="Brent Oil Price", color="darkblue")
+    ax.set_title("Brent Oil Price Over Time")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Price (USD)")
+    ax.grid(True)
+    ax.legend()
+
+def draw_log_returns(fig, dates, returns):
+    ax = fig.subplots()
+    ax.plot(dates, returns, color="darkgreen")
+    ax.set_title("Log Returns of Brent Oil Price")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Log Return")
+    ax.grid(True)
+
+def plot_price_trend(df, fmt=None, dpi=DEFAULT_DPI):
+    columns = df[["Date", "Price"]]
+    return output(
+        "price_trend",
+        lambda fig: draw_price_trend(fig, columns["Date"], columns["Price"]),
+        key=(columns,), fmt=fmt, figsize=(14, 5), dpi=dpi,
+    )
+
+def plot_log_returns(df, fmt=None, dpi=DEFAULT_DPI):
+    columns = df[["Date", "Price"]]
+    return output(
+        "log_returns",
+        lambda fig: draw_log_returns(fig, columns["Date"], log_returns(columns["Price"].to_numpy())),
+        key=(columns,), fmt=fmt, figsize=(14, 4), dpi=dpi,
+    )
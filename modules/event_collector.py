@@ -1,5 +1,8 @@
 import pandas as pd
-import os
+
+# Typed event columns -> the CSV's column names
+EVENT_COLUMNS = {"event": "Event", "start_date": "Start_Date", "region": "Region", "type": "Type", "notes": "Notes"}
+
 
 def load_key_events(csv_path="data/key_events.csv") -> pd.DataFrame:
     """
@@ -11,22 +14,10 @@ def load_key_events(csv_path="data/key_events.csv") -> pd.DataFrame:
     Returns:
         pd.DataFrame: Cleaned and sorted events DataFrame with datetime columns.
     """
-    if not os.path.exists(csv_path):
-        raise FileNotFoundError(f"Key events file not found at path: {csv_path}")
-
-    df = pd.read_csv(csv_path)
-
-    # Basic cleanup
-    required_cols = {"Event", "Start_Date", "Region", "Type", "Notes"}
-    if not required_cols.issubset(df.columns):
-        raise ValueError(f"CSV is missing one or more required columns: {required_cols}")
-
-    # Convert date columns
-    df["Start_Date"] = pd.to_datetime(df["Start_Date"], errors="coerce")
-    df = df.dropna(subset=["Start_Date"])  # Remove rows with invalid dates
+    from modules.ingest import load_dataset
 
-    # Sort chronologically
-    df = df.sort_values("Start_Date").reset_index(drop=True)
+    # Validated, typed and sorted once by the ingestion layer
+    df = load_dataset("events", csv_path).rename(columns=EVENT_COLUMNS)
     # print the event is imported 
     print(f"Loaded {len(df)} key events from {csv_path}")
     
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+
+class EventIndex:
+    """
+    Sorted, datetime64-backed index over an events table.
+
+    Events are parsed and sorted once. Nearest-event and window queries for a
+    whole batch of change dates then cost one `np.searchsorted` call, i.e.
+    O(m log n) for m change dates over n events, instead of a full scan of the
+    events table per change date.
+    """
+
+    def __init__(self, events_df, date_col="Start_Date"):
+        """
+        Args:
+            events_df (pd.DataFrame): Events with a date column (see load_key_events).
+            date_col (str): Name of the event date column.
+        """
+        dates = pd.to_datetime(events_df[date_col], errors="coerce")
+        valid = dates.notna().to_numpy()
+        order = np.argsort(dates.to_numpy()[valid], kind="stable")
+
+        self.date_col = date_col
+        self.events = events_df.iloc[np.flatnonzero(valid)[order]].reset_index(drop=True)
+        self.events[date_col] = dates[valid].iloc[order].to_numpy()
+        self.dates = self.events[date_col].to_numpy(dtype="datetime64[ns]")
+
+    def __len__(self):
+        return len(self.dates)
+
+    def filter(self, types=None, regions=None):
+        """
+        Restrict the index to some event types and/or regions.
+
+        Args:
+            types (str or list, optional): Values of the 'Type' column to keep.
+            regions (str or list, optional): Values of the 'Region' column to keep.
+
+        Returns:
+            EventIndex: A new index over the matching events.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for col, values in (("Type", types), ("Region", regions)):
+            if values is None:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            mask &= self.events[col].isin(values).to_numpy()
+
+        subset = EventIndex.__new__(EventIndex)
+        subset.date_col = self.date_col
+        subset.events = self.events[mask].reset_index(drop=True)
+        subset.dates = self.dates[mask]
+        return subset
+
+    def nearest(self, change_dates):
+        """
+        Position of the closest event for each change date.
+
+        Ties go to the earlier event, and among events on the same date to the
+        first one, which matches an `idxmin` scan over the sorted table.
+
+        Args:
+            change_dates (array-like): Dates to match.
+
+        Returns:
+            np.ndarray: Row positions into `self.events`.
+        """
+        if len(self) == 0:
+            raise ValueError("EventIndex is empty")
+
+        query = pd.to_datetime(np.atleast_1d(change_dates)).to_numpy(dtype="datetime64[ns]")
+        right = np.clip(np.searchsorted(self.dates, query, side="left"), 0, len(self) - 1)
+        left = np.clip(right - 1, 0, len(self) - 1)
+
+        take_left = np.abs(query - self.dates[left]) <= np.abs(self.dates[right] - query)
+        pos = np.where(take_left, left, right)
+        # Snap to the first event of a run of equal dates
+        return np.searchsorted(self.dates, self.dates[pos], side="left")
+
+    def within(self, change_dates, days):
+        """
+        Events within +/- `days` of each change date.
+
+        Args:
+            change_dates (array-like): Dates to match.
+            days (int): Half-width of the window in days (inclusive).
+
+        Returns:
+            tuple: (lo, hi) arrays; events `self.events.iloc[lo[i]:hi[i]]` fall in
+                the window of change date i.
+        """
+        query = pd.to_datetime(np.atleast_1d(change_dates)).to_numpy(dtype="datetime64[ns]")
+        window = np.timedelta64(int(days), "D")
+        lo = np.searchsorted(self.dates, query - window, side="left")
+        hi = np.searchsorted(self.dates, query + window, side="right")
+        return lo, hi
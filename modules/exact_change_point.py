@@ -0,0 +1,274 @@
+"""
+Deterministic change point detection with exact segment costs.
+
+A fast companion to the PyMC models in modules/change_point_model.py: every
+segment cost is an O(1) lookup into prefix sums, PELT finds the penalized
+optimum in near-linear time and binary segmentation gives a quick greedy
+answer. Results plug into extract_multiple_change_points / generate_insights
+through `to_inference_data`, and can seed the Bayesian models.
+
+Change points are reported as the index of the first observation of each new
+segment (the convention of the 'cp' variable in the trend and variance models).
+"""
+import numpy as np
+
+MODELS = ("mean", "var", "meanvar", "linear")
+METHODS = ("pelt", "binseg")
+
+# Free parameters per segment, used by the BIC penalty
+_SEGMENT_PARAMS = {"mean": 1, "var": 1, "meanvar": 2, "linear": 2}
+_EPS = 1e-12
+
+
+def _noise_variance(x):
+    """Robust noise variance from first differences (insensitive to mean shifts)."""
+    if len(x) < 3:
+        return max(float(np.var(x)), _EPS)
+    mad = np.median(np.abs(np.diff(x) - np.median(np.diff(x))))
+    return max((1.4826 * mad) ** 2 / 2.0, _EPS)
+
+
+class SegmentCost:
+    """
+    Negative twice log-likelihood (up to constants) of Normal segments.
+
+    `cost(starts, ends)` is vectorized over arrays of half-open segments
+    [start, end) and costs O(1) per segment thanks to prefix sums.
+
+    Models:
+        'mean'    -- shifts in mean, common known variance
+        'var'     -- shifts in variance around the global mean
+        'meanvar' -- shifts in both mean and variance
+        'linear'  -- piecewise linear trend, common known variance
+    """
+
+    def __init__(self, data, model="mean"):
+        if model not in MODELS:
+            raise ValueError(f"Unknown model '{model}'. Expected one of {MODELS}.")
+
+        x = np.asarray(data, dtype=np.float64)
+        self.model = model
+        self.n = len(x)
+
+        def prefix(values):
+            out = np.zeros(self.n + 1)
+            np.cumsum(values, out=out[1:])
+            return out
+
+        self.s1 = prefix(x)
+        if model in ("mean", "meanvar", "linear"):
+            self.s2 = prefix(x * x)
+        if model == "var":
+            self.sq = prefix((x - x.mean()) ** 2)
+        if model == "linear":
+            t = np.arange(self.n, dtype=np.float64)
+            self.st = prefix(t)
+            self.stt = prefix(t * t)
+            self.stx = prefix(t * x)
+        if model in ("mean", "linear"):
+            self.sigma2 = _noise_variance(x)
+
+    def _sse(self, starts, ends):
+        length = ends - starts
+        sx = self.s1[ends] - self.s1[starts]
+        return (self.s2[ends] - self.s2[starts]) - sx * sx / length
+
+    def cost(self, starts, ends):
+        starts = np.asarray(starts)
+        ends = np.asarray(ends)
+        length = (ends - starts).astype(np.float64)
+
+        if self.model == "mean":
+            return self._sse(starts, ends) / self.sigma2
+
+        if self.model == "var":
+            ss = self.sq[ends] - self.sq[starts]
+            return length * np.log(np.maximum(ss / length, _EPS))
+
+        if self.model == "meanvar":
+            return length * np.log(np.maximum(self._sse(starts, ends) / length, _EPS))
+
+        # Piecewise linear: residual sum of squares of the per-segment OLS fit
+        sx = self.s1[ends] - self.s1[starts]
+        st = self.st[ends] - self.st[starts]
+        var_t = (self.stt[ends] - self.stt[starts]) - st * st / length
+        cov_tx = (self.stx[ends] - self.stx[starts]) - st * sx / length
+        sse = self._sse(starts, ends) - np.where(var_t > 0, cov_tx * cov_tx / np.where(var_t > 0, var_t, 1.0), 0.0)
+        return np.maximum(sse, 0.0) / self.sigma2
+
+
+def default_penalty(n, model):
+    """BIC penalty per change point: (segment parameters + location) * log(n)."""
+    return (_SEGMENT_PARAMS[model] + 1) * np.log(max(n, 2))
+
+
+def pelt(cost, penalty, min_dist=5):
+    """
+    Pruned Exact Linear Time search for the penalized optimal segmentation.
+
+    Args:
+        cost (SegmentCost): Segment cost over the series.
+        penalty (float): Cost added per change point.
+        min_dist (int): Minimum segment length.
+
+    Returns:
+        np.ndarray: Sorted change point indices.
+    """
+    n = cost.n
+    min_dist = max(int(min_dist), 1)
+    if n < 2 * min_dist:
+        return np.array([], dtype=np.int64)
+
+    best = np.full(n + 1, np.inf)
+    best[0] = -penalty
+    last = np.zeros(n + 1, dtype=np.int64)
+    candidates = np.array([0], dtype=np.int64)
+    # Position from which each candidate is pruned (n + 1: not yet)
+    drop_at = np.array([n + 1], dtype=np.int64)
+
+    for end in range(min_dist, n + 1):
+        keep = drop_at > end
+        candidates, drop_at = candidates[keep], drop_at[keep]
+
+        # The newest start allowed for a segment ending here
+        newest = end - min_dist
+        if newest >= min_dist and np.isfinite(best[newest]) and candidates[-1] != newest:
+            candidates = np.append(candidates, newest)
+            drop_at = np.append(drop_at, n + 1)
+
+        values = best[candidates] + cost.cost(candidates, end) + penalty
+        i = int(np.argmin(values))
+        best[end] = values[i]
+        last[end] = candidates[i]
+
+        # A start that cannot beat a change point at `end` is beaten for good,
+        # but only once a segment starting at `end` is long enough to exist
+        beaten = values - penalty > best[end]
+        drop_at[beaten] = np.minimum(drop_at[beaten], end + min_dist)
+
+    change_points = []
+    end = n
+    while end > 0:
+        end = int(last[end])
+        if end > 0:
+            change_points.append(end)
+    return np.array(change_points[::-1], dtype=np.int64)
+
+
+def binary_segmentation(cost, penalty=None, n_bkps=None, min_dist=5):
+    """
+    Greedy binary segmentation.
+
+    Repeatedly splits the segment whose best single split lowers the total cost
+    the most. Stops after `n_bkps` splits, or when no split gains more than
+    `penalty`.
+
+    Args:
+        cost (SegmentCost): Segment cost over the series.
+        penalty (float, optional): Minimum gain for a split.
+        n_bkps (int, optional): Exact number of change points to find.
+        min_dist (int): Minimum segment length.
+
+    Returns:
+        np.ndarray: Sorted change point indices.
+    """
+    if penalty is None and n_bkps is None:
+        raise ValueError("binary_segmentation needs a penalty or n_bkps")
+    min_dist = max(int(min_dist), 1)
+
+    def best_split(start, end):
+        splits = np.arange(start + min_dist, end - min_dist + 1)
+        if len(splits) == 0:
+            return -np.inf, None
+        total = cost.cost(splits * 0 + start, splits) + cost.cost(splits, splits * 0 + end)
+        i = int(np.argmin(total))
+        return float(cost.cost(start, end) - total[i]), int(splits[i])
+
+    segments = {(0, cost.n): best_split(0, cost.n)}
+    change_points = []
+    while n_bkps is None or len(change_points) < n_bkps:
+        (start, end), (gain, split) = max(segments.items(), key=lambda item: item[1][0])
+        if split is None or (n_bkps is None and gain <= penalty):
+            break
+        change_points.append(split)
+        del segments[(start, end)]
+        segments[(start, split)] = best_split(start, split)
+        segments[(split, end)] = best_split(split, end)
+
+    return np.array(sorted(change_points), dtype=np.int64)
+
+
+def detect_change_points(data, model="mean", method="pelt", penalty=None, n_bkps=None, min_dist=5):
+    """
+    Detect change points deterministically.
+
+    Args:
+        data (np.ndarray or pd.Series): The input time series.
+        model (str): Segment model: 'mean', 'var', 'meanvar' or 'linear'.
+        method (str): 'pelt' (exact, penalized) or 'binseg' (greedy).
+        penalty (float, optional): Cost per change point; defaults to BIC.
+        n_bkps (int, optional): Fixed number of change points (binseg only).
+        min_dist (int): Minimum distance between consecutive change points.
+
+    Returns:
+        np.ndarray: Sorted change point indices (first index of each new segment).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'. Expected one of {METHODS}.")
+
+    cost = SegmentCost(data, model)
+    if penalty is None:
+        penalty = default_penalty(cost.n, model)
+
+    if method == "pelt":
+        if n_bkps is not None:
+            raise ValueError("n_bkps is only supported with method='binseg'")
+        return pelt(cost, penalty, min_dist=min_dist)
+    return binary_segmentation(cost, penalty=penalty if n_bkps is None else None, n_bkps=n_bkps, min_dist=min_dist)
+
+
+def detect_panel_change_points(panel, assets=None, **kwargs):
+    """
+    Detect change points in every asset of a panel.
+
+    Each asset is segmented on its own observed dates (missing dates dropped),
+    so assets with different histories can share one panel.
+
+    Args:
+        panel (pd.DataFrame): Date-indexed panel, e.g. from modules.panel.preprocess_panel.
+        assets (list, optional): Assets to segment; all by default.
+        **kwargs: Passed to `detect_change_points` (model, method, penalty, ...).
+
+    Returns:
+        dict: Asset name -> list of change point dates (pd.Timestamp).
+    """
+    from modules.panel import panel_series
+
+    change_dates = {}
+    for asset, series in panel_series(panel, assets).items():
+        if len(series) < 2:
+            change_dates[asset] = []
+            continue
+        indices = detect_change_points(series.to_numpy(), **kwargs)
+        change_dates[asset] = list(series.index[indices])
+    return change_dates
+
+
+def to_inference_data(change_points, var_name="cp"):
+    """
+    Wrap point estimates as a one-chain, one-draw az.InferenceData.
+
+    This lets the deterministic results flow through
+    extract_multiple_change_points and generate_insights unchanged.
+
+    Args:
+        change_points (array-like): Change point indices.
+        var_name (str): Posterior variable name ('cp', 'tau' or 'tau_pos').
+
+    Returns:
+        az.InferenceData: Posterior with `var_name` of shape (1, 1, k).
+    """
+    import arviz as az
+
+    values = np.asarray(change_points, dtype=np.int64).reshape(1, 1, -1)
+    return az.from_dict(posterior={var_name: values})
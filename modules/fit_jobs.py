@@ -0,0 +1,480 @@
+"""
+Asynchronous change point fits with a persistent SQLite job store.
+
+A fit request (model type, options and the series to fit) becomes a job whose
+id is a content hash of all three, so identical requests share one job and
+one trace. Jobs run on a bounded process pool, off the thread that submitted
+them; each worker claims its job in the store, fits it with
+batch_fitting._run_job while recording the sampler's progress, writes the
+trace (modules.trace_store) and its JSON summary to the output directory and
+records the outcome. Job state lives in SQLite next to the traces, with the
+series itself, so jobs that were queued or running when the process stopped
+are picked up again on the next start.
+
+Usage:
+    manager = FitManager()
+    manager.recover()
+    job, created = manager.submit("var", returns, dates, {"inference": "map"})
+    manager.get(job["id"])
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+from modules.batch_fitting import MODEL_INFERENCE
+from modules.config import BASE_DIR
+from modules.logger import get_logger
+
+logger = get_logger()
+
+FITS_DIR = BASE_DIR / "models" / "fits"
+STORE_FILE = "jobs.sqlite"
+
+INFERENCE_METHODS = ("nuts", "advi", "map")
+
+# Options each model's bayesian_* function accepts besides inference and random_seed
+MODEL_OPTIONS = {
+    "mean": {"max_cp": int, "min_dist": int, "likelihood": str},
+    "trend": {"marginalized": bool},
+    "var": {"marginalized": bool},
+}
+
+# Shortest series worth fitting
+MIN_OBSERVATIONS = 30
+
+# Fits running at once in one process; each runs its own chain processes
+DEFAULT_WORKERS = int(os.environ.get("BRENT_FIT_WORKERS", 1))
+
+# Share of a job's progress taken by the fit itself; the rest is loading the
+# series and writing the trace and summary
+FIT_PROGRESS = (0.05, 0.9)
+# Seconds between progress writes to the store while a fit runs
+PROGRESS_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    model_type TEXT NOT NULL,
+    options TEXT NOT NULL,
+    start_date TEXT,
+    end_date TEXT,
+    n_observations INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    dates BLOB NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    pid INTEGER,
+    pid_start TEXT,
+    path TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+# Columns returned by JobStore.get (the series blobs are read with load_data)
+FIELDS = (
+    "id", "model_type", "options", "start_date", "end_date", "n_observations", "status", "stage",
+    "progress", "pid", "pid_start", "path", "error", "attempts", "created_at", "started_at", "finished_at",
+)
+
+
+def normalize_options(model_type, options):
+    """
+    Validate fit options and fill in their defaults.
+
+    Args:
+        model_type (str): 'mean', 'trend' or 'var'.
+        options (dict): 'inference', 'random_seed' and the options of the model
+            in MODEL_OPTIONS; None values are dropped.
+
+    Returns:
+        dict: Options to pass to the model's bayesian_* function.
+
+    Raises:
+        ValueError: On an unknown model type, option or inference method.
+    """
+    if model_type not in MODEL_OPTIONS:
+        raise ValueError(f"Unknown model type '{model_type}'. Expected one of {tuple(MODEL_OPTIONS)}.")
+
+    allowed = dict(MODEL_OPTIONS[model_type], inference=str, random_seed=int)
+    unknown = sorted(set(options) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown options {unknown} for model '{model_type}'. Expected some of {sorted(allowed)}.")
+
+    normalized = {"inference": "nuts"}
+    for name, value in options.items():
+        if value is None:
+            continue
+        kind = allowed[name]
+        if kind is bool and isinstance(value, str):
+            value = value.lower() in ("1", "true", "yes")
+        try:
+            normalized[name] = kind(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Option '{name}' must be of type {kind.__name__}") from None
+
+    if normalized["inference"] not in INFERENCE_METHODS:
+        raise ValueError(f"Unknown inference '{normalized['inference']}'. Expected one of {INFERENCE_METHODS}.")
+    if normalized["inference"] not in MODEL_INFERENCE[model_type]:
+        raise ValueError(
+            f"Model '{model_type}' supports inference {MODEL_INFERENCE[model_type]}, not '{normalized['inference']}'."
+        )
+    if "max_cp" in normalized and not 1 <= normalized["max_cp"] <= 20:
+        raise ValueError("max_cp must be between 1 and 20")
+    return normalized
+
+
+def job_key(model_type, options, values):
+    """Content hash of a fit request: identical model, options and data give the same id."""
+    spec = json.dumps({"model_type": model_type, "options": options}, sort_keys=True).encode()
+    data = np.ascontiguousarray(values, dtype=np.float64).tobytes()
+    return hashlib.sha1(spec + data).hexdigest()[:20]
+
+
+def _process_start(pid):
+    """
+    When process `pid` started, as '<boot id>:<clock ticks since boot>', or None
+    where /proc is not available.
+
+    Together with the pid this names one process: a pid reused after the
+    process exited, or after a reboot, has another start.
+    """
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+        with open(f"/proc/{pid}/stat") as f:
+            # The command name in parentheses may contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return f"{boot_id}:{fields[19]}"
+
+
+def _pid_alive(pid, pid_start=None):
+    """True if process `pid` exists and, when `pid_start` is known, is the process that started then."""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return pid_start is None or _process_start(pid) == pid_start
+
+
+def _isoformat(timestamp):
+    return None if timestamp is None else time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(timestamp))
+
+
+class JobStore:
+    """
+    Fit jobs in a local SQLite database, shared by the API and the workers.
+
+    Every call opens its own connection, so a store can be used from any
+    thread or process; WAL mode lets readers poll while a worker writes.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as con, con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(SCHEMA)
+            # Stores created before pid_start was recorded
+            if "pid_start" not in {row[1] for row in con.execute("PRAGMA table_info(jobs)")}:
+                con.execute("ALTER TABLE jobs ADD COLUMN pid_start TEXT")
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        con.row_factory = sqlite3.Row
+        return con
+
+    def add(self, job_id, model_type, options, values, dates):
+        """
+        Queue a job unless it exists; a failed job with the same id is queued again.
+
+        Args:
+            job_id (str): From `job_key`.
+            model_type (str): Model type.
+            options (dict): Normalized fit options.
+            values (np.ndarray): The series to fit.
+            dates (np.ndarray): Its datetime64 dates.
+
+        Returns:
+            tuple: (job dict, True if the job was queued by this call).
+        """
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        with closing(self._connect()) as con, con:
+            inserted = con.execute(
+                "INSERT OR IGNORE INTO jobs (id, model_type, options, start_date, end_date, n_observations, "
+                "data, dates, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?)",
+                (
+                    job_id, model_type, json.dumps(options, sort_keys=True),
+                    str(dates[0])[:10] if len(dates) else None, str(dates[-1])[:10] if len(dates) else None,
+                    len(values), values.tobytes(), dates.view(np.int64).tobytes(), time.time(),
+                ),
+            ).rowcount
+            retried = not inserted and con.execute(
+                "UPDATE jobs SET status = 'queued', stage = NULL, progress = 0, error = NULL, pid = NULL, "
+                "pid_start = NULL, started_at = NULL, finished_at = NULL WHERE id = ? AND status = 'failed'",
+                (job_id,),
+            ).rowcount
+        return self.get(job_id), bool(inserted or retried)
+
+    def get(self, job_id):
+        """The job's fields (see FIELDS), or None if there is no such job."""
+        with closing(self._connect()) as con:
+            row = con.execute(f"SELECT {', '.join(FIELDS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else dict(row)
+
+    def load_data(self, job_id):
+        """The job's series and dates as arrays."""
+        with closing(self._connect()) as con:
+            data, dates = con.execute("SELECT data, dates FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return np.frombuffer(data, dtype=np.float64), np.frombuffer(dates, dtype=np.int64).view("datetime64[ns]")
+
+    def claim(self, job_id, pid):
+        """Mark a queued job running in process `pid`; False if it is not queued (already taken)."""
+        with closing(self._connect()) as con, con:
+            return con.execute(
+                "UPDATE jobs SET status = 'running', stage = 'starting', pid = ?, pid_start = ?, started_at = ?, "
+                "attempts = attempts + 1 WHERE id = ? AND status = 'queued'",
+                (pid, _process_start(pid), time.time(), job_id),
+            ).rowcount == 1
+
+    def update(self, job_id, **fields):
+        """Set job fields, e.g. status, stage, progress, path, error, finished_at."""
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job fields {sorted(unknown)}")
+        with closing(self._connect()) as con, con:
+            con.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+
+    def queue_position(self, job_id):
+        """Number of queued jobs submitted before `job_id`."""
+        with closing(self._connect()) as con:
+            return con.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' "
+                "AND created_at < (SELECT created_at FROM jobs WHERE id = ?)",
+                (job_id,),
+            ).fetchone()[0]
+
+    def requeue_orphans(self):
+        """
+        Queue again the running jobs whose worker process is gone.
+
+        A worker is identified by its pid and start (see `_process_start`), so
+        a job is not left running because its pid was reused by another process.
+
+        Returns:
+            list: Ids of every queued job, oldest first.
+        """
+        with closing(self._connect()) as con, con:
+            running = con.execute("SELECT id, pid, pid_start FROM jobs WHERE status = 'running'").fetchall()
+            for job_id, pid, pid_start in running:
+                if not _pid_alive(pid, pid_start):
+                    con.execute(
+                        "UPDATE jobs SET status = 'queued', stage = NULL, progress = 0, pid = NULL, pid_start = NULL "
+                        "WHERE id = ? AND status = 'running'",
+                        (job_id,),
+                    )
+            return [row[0] for row in con.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at")]
+
+
+def _execute(store_path, job_id, out_dir, cores):
+    """Run one job in a pool worker: claim it, fit it, write the trace and summary."""
+    from modules.batch_fitting import _run_job
+    from modules.change_point_summary import compile_trace_summary
+
+    store = JobStore(store_path)
+    if not store.claim(job_id, os.getpid()):
+        return None
+
+    job = store.get(job_id)
+    values, dates = store.load_data(job_id)
+    low, high = FIT_PROGRESS
+    store.update(job_id, stage="fitting", progress=low)
+    last_write = time.monotonic()
+
+    def progress(fraction):
+        # Called per draw / step: write at most once per PROGRESS_INTERVAL
+        nonlocal last_write
+        now = time.monotonic()
+        if now - last_write >= PROGRESS_INTERVAL:
+            store.update(job_id, progress=round(low + (high - low) * fraction, 4))
+            last_write = now
+
+    record = _run_job(
+        {
+            "job_id": job_id,
+            "series": "api",
+            "model_type": job["model_type"],
+            "start": 0,
+            "end": len(values),
+            "values": values,
+            "dates": (job["start_date"], job["end_date"]),
+            "options": json.loads(job["options"]),
+        },
+        out_dir, cores, strip=True, progress=progress,
+    )
+    if record["status"] == "failed":
+        store.update(job_id, status="failed", stage=None, error=record["error"], finished_at=time.time())
+        return record
+
+    try:
+        store.update(job_id, stage="summarizing", progress=high)
+        compile_trace_summary(Path(out_dir) / record["path"], dates)
+    except Exception as e:
+        store.update(job_id, status="failed", stage=None, error=f"{type(e).__name__}: {e}", finished_at=time.time())
+        return record
+    store.update(job_id, status="done", stage=None, progress=1.0, path=record["path"], finished_at=time.time())
+    return record
+
+
+class FitManager:
+    """
+    Submits fit jobs to a bounded process pool and reports on them.
+
+    The pool is created on the first submission and uses 'spawn', so workers
+    never inherit the threads of a web server. Spawned workers re-run the main
+    script as __mp_main__, so a script that submits fits must not start work
+    at import (backend/app.py only builds the app outside the workers). Workers
+    claim jobs in the store, so a job is fitted once even when several
+    processes share it.
+    """
+
+    def __init__(self, out_dir=FITS_DIR, workers=DEFAULT_WORKERS):
+        self.out_dir = Path(out_dir)
+        self.store = JobStore(self.out_dir / STORE_FILE)
+        self.workers = max(1, workers)
+        # Chain processes per fit, so workers x chains stays within the cores
+        self.cores = max(1, (os.cpu_count() or 1) // self.workers)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _dispatch(self, job_id):
+        try:
+            future = self._get_pool().submit(_execute, str(self.store.path), job_id, str(self.out_dir), self.cores)
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None
+            future = self._get_pool().submit(_execute, str(self.store.path), job_id, str(self.out_dir), self.cores)
+        future.add_done_callback(partial(self._finished, job_id))
+
+    def _finished(self, job_id, future):
+        # A worker that died or raised outside the fit leaves the job running
+        error = future.exception()
+        if error is None:
+            return
+        logger.error(f"Fit job {job_id} crashed: {error}")
+        if isinstance(error, BrokenProcessPool):
+            with self._lock:
+                self._pool = None
+        job = self.store.get(job_id)
+        if job and job["status"] in ("queued", "running"):
+            self.store.update(
+                job_id, status="failed", stage=None, error=f"{type(error).__name__}: {error}", finished_at=time.time(),
+            )
+
+    def recover(self):
+        """
+        Resubmit the jobs left queued, or running in a process that is gone, by earlier runs.
+
+        Returns:
+            int: Number of jobs resubmitted.
+        """
+        job_ids = self.store.requeue_orphans()
+        for job_id in job_ids:
+            self._dispatch(job_id)
+        if job_ids:
+            logger.info(f"Resubmitted {len(job_ids)} interrupted fit jobs")
+        return len(job_ids)
+
+    def submit(self, model_type, values, dates, options=None):
+        """
+        Queue a fit, or return the existing job for the same model, options and data.
+
+        Args:
+            model_type (str): 'mean', 'trend' or 'var'.
+            values (array-like): The series to fit (e.g. log returns).
+            dates (array-like): Its dates.
+            options (dict, optional): See `normalize_options`.
+
+        Returns:
+            tuple: (job dict as returned by `get`, True if a fit was queued).
+        """
+        options = normalize_options(model_type, options or {})
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) < MIN_OBSERVATIONS:
+            raise ValueError(f"At least {MIN_OBSERVATIONS} observations are needed, got {len(values)}")
+        if not np.isfinite(values).all():
+            raise ValueError("The series contains missing or infinite values")
+
+        job_id = job_key(model_type, options, values)
+        _, queued = self.store.add(job_id, model_type, options, values, dates)
+        if queued:
+            self._dispatch(job_id)
+        return self.get(job_id), queued
+
+    def get(self, job_id):
+        """
+        Status, progress and, once done, the change point summary of a job.
+
+        Returns:
+            dict: JSON-serializable job description, or None for an unknown id.
+        """
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+
+        job["options"] = json.loads(job["options"])
+        end = job["finished_at"] or (time.time() if job["started_at"] else None)
+        job["seconds"] = None if end is None or job["started_at"] is None else round(end - job["started_at"], 3)
+        for name in ("created_at", "started_at", "finished_at"):
+            job[name] = _isoformat(job[name])
+        job.pop("pid")
+        job.pop("pid_start")
+        if job["status"] == "queued":
+            job["queue_position"] = self.store.queue_position(job_id)
+
+        job["result"] = None
+        if job["status"] == "done":
+            from modules.change_point_summary import summary_path
+
+            with open(summary_path(self.out_dir / job["path"])) as f:
+                job["result"] = json.load(f)
+        return job
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
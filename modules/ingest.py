@@ -0,0 +1,373 @@
+"""
+Validated, typed columnar copies of the CSV datasets.
+
+Each source CSV is parsed and validated once, in chunks of CHUNK_ROWS rows, into
+an uncompressed Feather (Arrow IPC) file in a `cache/` directory next to it.
+The file's schema metadata records SCHEMA_VERSION and the source's size,
+mtime and SHA-256, so a stale or older-format cache is rebuilt automatically. Loaders read the Feather file memory-mapped: numeric columns
+come back as views of the mapped file instead of parsed text, and the raw CSV
+text is never held in memory, however large the source.
+
+Without pyarrow the CSV is parsed directly with the same validation.
+
+Usage:
+    python -m modules.ingest [--prices data/brent_prices.csv] [--events data/key_events.csv]
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modules.config import EVENT_FILE, PANEL_FILE, PRICE_FILE
+from modules.logger import get_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # Columnar caching is optional; loaders fall back to the CSV
+    pa = None
+
+logger = get_logger()
+
+# Bump when the typed layout of a dataset changes, so older caches are rebuilt
+SCHEMA_VERSION = 2
+
+# Rows parsed and validated per chunk
+CHUNK_ROWS = 200_000
+
+CACHE_DIRNAME = "cache"
+CACHE_SUFFIX = ".feather"
+
+# Serializes building caches in this process; other processes write their own
+# temporary files, and the last atomic replace wins
+_ingest_lock = threading.Lock()
+
+
+def _drop(checks):
+    """
+    Combine row checks into a validity mask, counting the rows each check drops.
+
+    Args:
+        checks (dict): Reason -> boolean array, True where the row passes. A
+            row failing several checks is counted under the first.
+
+    Returns:
+        tuple: (validity mask, Counter of dropped rows by reason).
+    """
+    valid, dropped = None, Counter()
+    for reason, passes in checks.items():
+        failed = ~passes if valid is None else valid & ~passes
+        if failed.any():
+            dropped[reason] = int(failed.sum())
+        valid = passes if valid is None else valid & passes
+    return valid, dropped
+
+
+def _price_checks(date, price):
+    price = price.to_numpy()
+    return {
+        "unparsed date": date.notna().to_numpy(),
+        "missing or non-numeric price": ~np.isnan(price),
+        # Log returns need positive prices
+        "price <= 0": ~(price <= 0),
+    }
+
+
+def _prices_chunk(df, date_format):
+    """Type a chunk of a price CSV: datetime64 'date', positive float64 'price'."""
+    date = pd.to_datetime(df["date"], format=date_format, errors="coerce").astype("datetime64[ns]")
+    price = pd.to_numeric(df["price"], errors="coerce").astype(np.float64)
+    valid, dropped = _drop(_price_checks(date, price))
+    return pd.DataFrame({"date": date.to_numpy()[valid], "price": price.to_numpy()[valid]}), dropped
+
+
+def _asset_prices_chunk(df, date_format):
+    """Type a chunk of a long-format panel CSV: 'date', 'asset' and positive 'price'."""
+    date = pd.to_datetime(df["date"], format=date_format, errors="coerce").astype("datetime64[ns]")
+    price = pd.to_numeric(df["price"], errors="coerce").astype(np.float64)
+    asset = df["asset"].str.strip()
+    valid, dropped = _drop({"missing asset": asset.notna().to_numpy(), **_price_checks(date, price)})
+    return pd.DataFrame({
+        "date": date.to_numpy()[valid],
+        "asset": asset.to_numpy()[valid],
+        "price": price.to_numpy()[valid],
+    }), dropped
+
+
+def _events_chunk(df, date_format):
+    """
+    Type a chunk of an events CSV: datetime64 'start_date' plus text columns.
+
+    As in the original event loader, the date format is inferred unless one is
+    given, only rows whose date does not parse are dropped, and an empty
+    'event' is kept as a missing value.
+    """
+    start = pd.to_datetime(df["start_date"], format=date_format, errors="coerce").astype("datetime64[ns]")
+    valid, dropped = _drop({"unparsed date": start.notna().to_numpy()})
+    typed = {"event": df["event"], "start_date": start}
+    for column in ("region", "type", "notes"):
+        typed[column] = df[column]
+    return pd.DataFrame(typed)[valid].reset_index(drop=True), dropped
+
+
+# name: (required lowercase columns, sort column, default date format (None
+# infers it per chunk), chunk parser)
+DATASETS = {
+    "prices": (("date", "price"), "date", "%d-%b-%y", _prices_chunk),
+    "asset_prices": (("date", "asset", "price"), "date", "%Y-%m-%d", _asset_prices_chunk),
+    "events": (("event", "start_date", "region", "type", "notes"), "start_date", None, _events_chunk),
+}
+
+
+def arrow_schema(name):
+    """Arrow types of a dataset's typed columns, in order."""
+    if name == "prices":
+        return pa.schema([("date", pa.timestamp("ns")), ("price", pa.float64())])
+    if name == "asset_prices":
+        return pa.schema([("date", pa.timestamp("ns")), ("asset", pa.string()), ("price", pa.float64())])
+    return pa.schema([
+        ("event", pa.string()),
+        ("start_date", pa.timestamp("ns")),
+        ("region", pa.string()),
+        ("type", pa.string()),
+        ("notes", pa.string()),
+    ])
+
+
+def file_sha256(path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(source):
+    """Columnar cache of a CSV, e.g. data/brent_prices.csv -> data/cache/brent_prices.feather."""
+    source = Path(source)
+    return source.parent / CACHE_DIRNAME / (source.stem + CACHE_SUFFIX)
+
+
+def _chunks(name, source, chunk_rows, date_format):
+    """Yield (typed chunk, Counter of its dropped rows by reason) from a CSV, validating its header."""
+    required, _, default_format, parse = DATASETS[name]
+    reader = pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False, na_values=[""])
+    for raw in reader:
+        raw.columns = [str(col).strip().lower() for col in raw.columns]
+        missing = [col for col in required if col not in raw.columns]
+        if missing:
+            raise ValueError(f"{Path(source).name} is missing required columns {missing} for dataset '{name}'")
+        yield parse(raw, date_format or default_format)
+
+
+def _log_dropped(source, dropped):
+    if dropped:
+        reasons = ", ".join(f"{count} {reason}" for reason, count in dropped.most_common())
+        logger.warning(f"Dropped {sum(dropped.values())} invalid rows of {Path(source).name}: {reasons}")
+
+
+def parse_csv(name, source, chunk_rows=CHUNK_ROWS, date_format=None):
+    """
+    Parse and validate a CSV into a typed frame sorted by date, without a cache.
+
+    Args:
+        name (str): Dataset in DATASETS ('prices', 'asset_prices' or 'events').
+        source (str or Path): CSV file.
+        chunk_rows (int): Rows parsed per chunk.
+        date_format (str, optional): strptime format of the date column;
+            defaults to the dataset's.
+
+    Returns:
+        pd.DataFrame: Typed columns, invalid rows dropped (and logged), stably
+            sorted by date.
+    """
+    sort_column = DATASETS[name][1]
+    chunks, dropped = [], Counter()
+    for chunk, chunk_dropped in _chunks(name, source, chunk_rows, date_format):
+        chunks.append(chunk)
+        dropped += chunk_dropped
+    _log_dropped(source, dropped)
+    df = pd.concat(chunks, ignore_index=True)
+    return df.sort_values(sort_column, kind="stable", ignore_index=True)
+
+
+def read_metadata(path):
+    """
+    Schema metadata of a columnar cache file; reads only the file footer.
+
+    Returns:
+        dict: 'schema_version', 'dataset', 'source', 'source_sha256',
+            'source_mtime_ns', 'source_size' and 'rows'.
+    """
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        metadata = json.loads((reader.schema.metadata or {}).get(b"ingest", b"{}"))
+        metadata["rows"] = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    return metadata
+
+
+def is_current(path, source, name):
+    """True if the cache at `path` was built from this version of `source` with this schema."""
+    if not Path(path).exists():
+        return False
+    try:
+        metadata = read_metadata(path)
+    except (OSError, pa.ArrowInvalid):
+        return False
+    if metadata.get("schema_version") != SCHEMA_VERSION or metadata.get("dataset") != name:
+        return False
+
+    stat = os.stat(source)
+    if [metadata.get("source_mtime_ns"), metadata.get("source_size")] == [stat.st_mtime_ns, stat.st_size]:
+        return True
+    # Touched or copied but unchanged
+    return metadata.get("source_size") == stat.st_size and metadata.get("source_sha256") == file_sha256(source)
+
+
+def ingest(name, source, out_path=None, chunk_rows=CHUNK_ROWS, date_format=None):
+    """
+    Convert a CSV into a validated, typed Feather file, chunk by chunk.
+
+    Chunks are written as Arrow record batches as they are parsed. If the rows
+    were not already in date order, the typed table is sorted afterwards (a
+    stable sort of the typed columns, read back memory-mapped). The file is
+    written uncompressed, so readers map its buffers without decoding, and
+    replaced atomically. Rows that fail validation are dropped, and their
+    counts by reason logged.
+
+    Args:
+        name (str): Dataset in DATASETS ('prices', 'asset_prices' or 'events').
+        source (str or Path): CSV file.
+        out_path (str or Path, optional): Destination; defaults to `cache_path(source)`.
+        chunk_rows (int): Rows parsed per chunk.
+        date_format (str, optional): strptime format of the date column.
+
+    Returns:
+        Path: The written file.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    if name not in DATASETS:
+        raise ValueError(f"Unknown dataset '{name}'. Expected one of {tuple(DATASETS)}.")
+
+    source = Path(source)
+    out_path = Path(out_path) if out_path else cache_path(source)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per thread, so concurrent builds never write to the same file
+    tmp_path = out_path.with_name(out_path.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+    sort_column = DATASETS[name][1]
+
+    stat = os.stat(source)
+    metadata = {
+        "schema_version": SCHEMA_VERSION,
+        "dataset": name,
+        "source": source.name,
+        "source_sha256": file_sha256(source),
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_size": stat.st_size,
+    }
+
+    schema = arrow_schema(name).with_metadata({"ingest": json.dumps(metadata)})
+    rows = 0
+    dropped = Counter()
+    ordered, last = True, None
+    try:
+        with pa.ipc.new_file(str(tmp_path), schema) as writer:
+            for chunk, chunk_dropped in _chunks(name, source, chunk_rows, date_format):
+                dropped += chunk_dropped
+                rows += len(chunk)
+                dates = chunk[sort_column].to_numpy()
+                if len(dates):
+                    ordered = ordered and (last is None or dates[0] >= last) and bool((dates[1:] >= dates[:-1]).all())
+                    last = dates[-1]
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+        if not ordered:
+            # Sort the typed columns, read back memory-mapped, into a second file
+            sorted_path = tmp_path.with_name(tmp_path.name + ".sorted")
+            with pa.memory_map(str(tmp_path)) as mapped:
+                table = pa.ipc.open_file(mapped).read_all()
+                table = table.take(pc.sort_indices(table, sort_keys=[(sort_column, "ascending")]))
+                with pa.ipc.new_file(str(sorted_path), schema) as writer:
+                    writer.write_table(table)
+            os.replace(sorted_path, tmp_path)
+        os.replace(tmp_path, out_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    _log_dropped(source, dropped)
+    logger.info(f"Ingested {source.name} -> {out_path.name}: {rows} rows")
+    return out_path
+
+
+def load_dataset(name, source, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Typed frame of a CSV dataset, read through its columnar cache.
+
+    The cache is (re)built when missing, stale or of an older schema, by one
+    thread at a time, and replaced atomically. It is read memory-mapped, so numeric columns are views of the mapped file.
+    Without pyarrow, or when the cache cannot be written, the CSV is parsed
+    directly.
+
+    Args:
+        name (str): Dataset in DATASETS ('prices', 'asset_prices' or 'events').
+        source (str or Path): CSV file.
+        columns (list, optional): Read only these columns.
+        chunk_rows (int): Rows parsed per chunk when (re)building the cache.
+
+    Returns:
+        pd.DataFrame: Typed columns sorted by date, with a RangeIndex.
+    """
+    if not Path(source).exists():
+        raise FileNotFoundError(f"{source} not found.")
+    if pa is None:
+        df = parse_csv(name, source, chunk_rows=chunk_rows)
+        return df if columns is None else df[list(columns)]
+
+    path = cache_path(source)
+    if not is_current(path, source, name):
+        with _ingest_lock:
+            try:
+                # Another thread may have built it while we waited for the lock
+                if not is_current(path, source, name):
+                    ingest(name, source, path, chunk_rows=chunk_rows)
+            except OSError as e:
+                logger.warning(f"Cannot write the columnar cache of {Path(source).name} ({e}); parsing the CSV")
+                df = parse_csv(name, source, chunk_rows=chunk_rows)
+                return df if columns is None else df[list(columns)]
+
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    if columns is not None:
+        table = table.select(list(columns))
+    # split_blocks keeps each column in its own block, so no consolidation copy
+    return table.to_pandas(split_blocks=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest the CSV datasets into typed columnar caches.")
+    parser.add_argument("--prices", default=str(PRICE_FILE))
+    parser.add_argument("--events", default=str(EVENT_FILE))
+    parser.add_argument("--panel", default=str(PANEL_FILE), help="Asset price panel; skipped if missing")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--force", action="store_true", help="Rebuild even when the cache is current")
+    args = parser.parse_args()
+
+    sources = [("prices", args.prices), ("events", args.events)]
+    if Path(args.panel).exists():
+        sources.append(("asset_prices", args.panel))
+    for name, source in sources:
+        path = cache_path(source)
+        if args.force or not is_current(path, source, name):
+            ingest(name, source, path, chunk_rows=args.chunk_rows)
+        logger.info(f"{path}: {read_metadata(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,99 @@
 import numpy as np
 import pandas as pd
-import arviz as az
+from typing import TYPE_CHECKING
+
+from modules.event_index import EventIndex
+from modules.posterior_utils import change_point_samples
+
+if TYPE_CHECKING:
+    import arviz as az
 
 
 def associate_event(change_date, events_df):
     """
     Match the closest global event to a given change point date.
+
+    `events_df` may be a DataFrame or a prebuilt EventIndex; pass an
+    EventIndex when matching many dates against the same events.
     """
-    events_df = events_df.copy()
-    events_df["Start_Date"] = pd.to_datetime(events_df["Start_Date"])
-    events_df["Delta"] = (events_df["Start_Date"] - change_date).abs()
-    closest = events_df.loc[events_df["Delta"].idxmin()]
-    return closest.to_dict()
+    index = events_df if isinstance(events_df, EventIndex) else EventIndex(events_df)
+    closest = index.events.iloc[index.nearest([change_date])[0]].to_dict()
+    closest["Delta"] = abs(closest[index.date_col] - pd.Timestamp(change_date))
+    return closest
 
 
-def extract_multiple_change_points(trace: az.InferenceData, date_index: pd.Series):
+def extract_multiple_change_points(trace: "az.InferenceData", date_index: pd.Series):
     """
     Extract multiple change points from posterior samples in a PyMC trace.
     Supports 'tau', 'tau_pos', and 'cp' depending on model type.
     """
-    # Dynamically find the change point key
-    possible_keys = ["tau", "tau_pos", "cp"]
-    cp_key = next((k for k in possible_keys if k in trace.posterior), None)
-
-    if cp_key is None:
-        raise KeyError("No change point variable found in trace. Expected one of: 'tau', 'tau_pos', or 'cp'.")
-
-    tau_samples = trace.posterior[cp_key].values  # shape: (chains, draws) or (chains, draws, max_cp)
+    # Dynamically find the change point key; shape is always (chains, draws, N)
+    _, tau_samples = change_point_samples(trace)
 
-    # Ensure shape is always (chains, draws, N) for consistency
-    if tau_samples.ndim == 2:
-        tau_samples = tau_samples[:, :, np.newaxis]  # for models with one cp
-
-    max_cp = tau_samples.shape[-1]
     tau_means = tau_samples.mean(axis=(0, 1))  # average over chains and draws
-    tau_indices = sorted(set([int(round(t)) for t in tau_means if 0 <= int(round(t)) < len(date_index)]))
-    
-    return [date_index.iloc[i] for i in tau_indices]
+    tau_indices = np.unique(np.rint(tau_means).astype(np.int64))
+    tau_indices = tau_indices[(tau_indices >= 0) & (tau_indices < len(date_index))]
+
+    return list(date_index.iloc[tau_indices])
 
 
-def generate_insights(change_dates, events_df):
+def generate_insights(change_dates, events_df, event_types=None, regions=None, window_days=None):
     """
     For each change date, associate the most relevant global event and package insight.
+
+    All change dates are matched against the events in one batched binary search.
+
+    Args:
+        change_dates (list or dict): Change point dates, or asset name -> change
+            point dates for a panel; each insight then carries its 'Asset'.
+        events_df (pd.DataFrame or EventIndex): Events to match against.
+        event_types (str or list, optional): Only consider events of these types.
+        regions (str or list, optional): Only consider events in these regions.
+        window_days (int, optional): If set, also list every event within
+            +/- `window_days` of each change date under 'Events_In_Window'.
     """
+    if isinstance(change_dates, dict):
+        # Flatten the assets so their dates share one search
+        assets = [asset for asset, dates in change_dates.items() for _ in dates]
+        flat = [date for dates in change_dates.values() for date in dates]
+        insights = generate_insights(flat, events_df, event_types, regions, window_days)
+        return [{"Asset": asset, **insight} for asset, insight in zip(assets, insights)]
+
+    index = events_df if isinstance(events_df, EventIndex) else EventIndex(events_df)
+    if event_types is not None or regions is not None:
+        index = index.filter(types=event_types, regions=regions)
+    if len(change_dates) == 0 or len(index) == 0:
+        return []
+
+    change_ts = pd.to_datetime(list(change_dates))
+    positions = index.nearest(change_ts)
+    event_dates = pd.DatetimeIndex(index.dates[positions])
+    offsets = np.abs((event_dates - change_ts).days)
+
+    matched = index.events.iloc[positions]
+    names = matched["Event"].tolist()
+    notes = matched["Notes"].tolist() if "Notes" in matched else [""] * len(positions)
+    types = matched["Type"].tolist() if "Type" in matched else [""] * len(positions)
+    event_regions = matched["Region"].tolist() if "Region" in matched else [""] * len(positions)
+
+    if window_days is not None:
+        lo, hi = index.within(change_ts, window_days)
+        all_names = index.events["Event"].to_numpy()
+
     insights = []
-    for change_date in change_dates:
-        event = associate_event(change_date, events_df)
-        insights.append({
+    for i, change_date in enumerate(change_dates):
+        insight = {
             "Change_Point": change_date,
-            "Event": event["Event"],
-            "Event_Date": event["Start_Date"],
-            "Days_Offset": abs((event["Start_Date"] - change_date).days),
-            "Notes": event.get("Notes", ""),
-            "Type": event.get("Type", ""),
-            "Region": event.get("Region", "")
-        })
+            "Event": names[i],
+            "Event_Date": event_dates[i],
+            "Days_Offset": int(offsets[i]),
+            "Notes": notes[i],
+            "Type": types[i],
+            "Region": event_regions[i]
+        }
+        if window_days is not None:
+            insight["Events_In_Window"] = all_names[lo[i]:hi[i]].tolist()
+        insights.append(insight)
     return insights
 
 
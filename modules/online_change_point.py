@@ -0,0 +1,224 @@
+"""
+Online Bayesian change point detection (Adams & MacKay, 2007).
+
+The detector keeps the posterior over the current run length, the number of
+observations since the last change, and updates it with every new value.
+Each run length carries the Normal-Gamma posterior of its regime's mean and
+variance, so the predictive of the next value is a Student-t in closed form.
+The run-length distribution is truncated at `max_run_length` and run lengths
+whose probability falls below `prune_threshold` are dropped, so every update
+costs O(active run lengths) and memory stays bounded however long the stream.
+
+Usage:
+    python -m modules.online_change_point [--prices data/brent_prices.csv] [--follow]
+"""
+import argparse
+from collections import deque
+
+import numpy as np
+
+from modules.config import PRICE_FILE
+from modules.logger import get_logger
+
+logger = get_logger()
+
+
+class OnlineChangePointDetector:
+    """
+    Bayesian online change point detection with a constant hazard and
+    conjugate Normal-Gamma regimes.
+
+    The defaults suit daily log returns: the prior precision corresponds to a
+    daily sd of about 1%, and a change is expected every 250 trading days.
+    """
+
+    def __init__(self, hazard=1 / 250, mu0=0.0, kappa0=1.0, alpha0=1.0, beta0=1e-4,
+                 max_run_length=1000, prune_threshold=1e-8, lag=5, log_returns=False):
+        """
+        Args:
+            hazard (float): Prior probability of a change at each step.
+            mu0, kappa0, alpha0, beta0 (float): Normal-Gamma prior of a new regime
+                (mean, pseudo-count of the mean, shape and rate of the precision).
+            max_run_length (int): Longest run length tracked.
+            prune_threshold (float): Run lengths less probable than this are dropped.
+            lag (int): `change_probability` is the probability that the current
+                regime started within the last `lag` observations.
+            log_returns (bool): Treat pushed values as prices and detect changes
+                in their log returns; the first push only primes the detector.
+        """
+        self.log_hazard = np.log(hazard)
+        self.log_survival = np.log1p(-hazard)
+        self.prior = np.array([mu0, kappa0, alpha0, beta0], dtype=np.float64)
+        self.max_run_length = int(max_run_length)
+        self.log_prune = np.log(prune_threshold)
+        self.lag = int(lag)
+        self.log_returns = log_returns
+
+        # Active run lengths, their log posterior and Normal-Gamma parameters
+        self.run_lengths = np.zeros(1, dtype=np.int64)
+        self.log_probs = np.zeros(1)
+        self.params = self.prior[np.newaxis].copy()
+
+        self.n_observations = 0
+        self.last_date = None
+        self.last_price = None
+        self.state = None
+        # Dates of the most recent observations, to date regime starts
+        self._dates = deque(maxlen=self.max_run_length + 1)
+        self._regime_first = 1
+        self._regime_start = None
+
+    def _predictive_logpdf(self, x):
+        from scipy.special import gammaln
+
+        # Student-t predictive of each run length's Normal-Gamma posterior
+        mu, kappa, alpha, beta = self.params.T
+        df = 2 * alpha
+        scale2 = beta * (kappa + 1) / (alpha * kappa)
+        z = (x - mu) ** 2 / (df * scale2)
+        return (
+            gammaln((df + 1) / 2) - gammaln(df / 2)
+            - 0.5 * np.log(np.pi * df * scale2)
+            - (df + 1) / 2 * np.log1p(z)
+        )
+
+    def push(self, value, date=None):
+        """
+        Update the run-length posterior with one observation.
+
+        Args:
+            value (float): New observation (a price if `log_returns`).
+            date (optional): Its date, used to date regime starts.
+
+        Returns:
+            dict: The regime state after the update (see `state`), or None when
+                `log_returns` is set and this was the first price.
+        """
+        if self.log_returns:
+            previous, self.last_price = self.last_price, float(value)
+            if previous is None:
+                self.last_date = date
+                return None
+            value = np.log(self.last_price / previous)
+
+        from scipy.special import logsumexp
+
+        x = float(value)
+        pred = self._predictive_logpdf(x)
+
+        # Every run either grows by one or resets to zero
+        growth = self.log_probs + pred + self.log_survival
+        change = logsumexp(self.log_probs + pred + self.log_hazard)
+        log_probs = np.concatenate(([change], growth))
+        log_probs -= logsumexp(log_probs)
+
+        mu, kappa, alpha, beta = self.params.T
+        updated = np.column_stack((
+            (kappa * mu + x) / (kappa + 1),
+            kappa + 1,
+            alpha + 0.5,
+            beta + kappa * (x - mu) ** 2 / (2 * (kappa + 1)),
+        ))
+        params = np.vstack((self.prior, updated))
+        run_lengths = np.concatenate(([0], self.run_lengths + 1))
+
+        # Bound the work and memory of the next update
+        keep = (log_probs >= self.log_prune) & (run_lengths <= self.max_run_length)
+        keep[np.argmax(log_probs)] = True
+        self.log_probs = log_probs[keep] - logsumexp(log_probs[keep])
+        self.params = params[keep]
+        self.run_lengths = run_lengths[keep]
+
+        self.n_observations += 1
+        self.last_date = date
+        self._dates.append(date)
+        self.state = self._summarize(x, date)
+        return self.state
+
+    def _summarize(self, x, date):
+        probs = np.exp(self.log_probs)
+        best = int(np.argmax(probs))
+        map_run_length = int(self.run_lengths[best])
+        mu, kappa, alpha, beta = self.params[best]
+
+        # Run length k covers the last k observations (k = 0 only says the next
+        # one starts a regime, and under a constant hazard is never the mode)
+        if map_run_length < self.max_run_length:
+            length = min(max(map_run_length, 1), len(self._dates))
+            regime_first = self.n_observations - length + 1
+            regime_start = self._dates[-length]
+        else:
+            # Truncated: the regime is at least as old as its declared start
+            regime_first, regime_start = self._regime_first, self._regime_start
+
+        # A new regime is declared when its first observation moves forward by
+        # more than `lag`; smaller moves only re-date the same change
+        is_change = regime_first > self._regime_first + self.lag
+        if is_change or regime_first < self._regime_first:
+            self._regime_first, self._regime_start = regime_first, regime_start
+
+        return {
+            "date": date,
+            "value": x,
+            "observation": self.n_observations,
+            "change_probability": float(probs[self.run_lengths < self.lag].sum()),
+            "change_point": bool(is_change),
+            "run_length": map_run_length,
+            "expected_run_length": float(probs @ self.run_lengths),
+            "regime_start": regime_start,
+            "regime_mean": float(mu),
+            "regime_std": float(np.sqrt(beta / alpha)),
+            "active_run_lengths": int(len(self.run_lengths)),
+        }
+
+    def run_length_distribution(self):
+        """
+        Current posterior over run lengths.
+
+        Returns:
+            tuple: (run lengths, probabilities), sorted by run length.
+        """
+        order = np.argsort(self.run_lengths)
+        return self.run_lengths[order], np.exp(self.log_probs[order])
+
+
+def detect_stream(ticks, detector=None, **params):
+    """
+    Run the detector over a stream of (date, value) pairs.
+
+    Args:
+        ticks (iterable): (date, value) pairs, e.g. from `stream_brent_data`.
+        detector (OnlineChangePointDetector, optional): Detector to advance;
+            a new one is created from `params` otherwise.
+        **params: Keyword arguments of OnlineChangePointDetector.
+
+    Yields:
+        dict: The regime state after each observation.
+    """
+    detector = detector or OnlineChangePointDetector(**params)
+    for date, value in ticks:
+        state = detector.push(value, date)
+        if state is not None:
+            yield state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the Brent prices through the online change point detector.")
+    parser.add_argument("--prices", default=str(PRICE_FILE))
+    parser.add_argument("--hazard", type=float, default=1 / 250)
+    parser.add_argument("--follow", action="store_true", help="Keep watching the file for appended rows")
+    args = parser.parse_args()
+
+    from modules.data_loader import stream_brent_data
+
+    ticks = stream_brent_data(args.prices, follow=args.follow)
+    for state in detect_stream(ticks, hazard=args.hazard, log_returns=True):
+        if state["change_point"]:
+            logger.info(
+                f"{state['date']:%Y-%m-%d}: new regime since {state['regime_start']:%Y-%m-%d} "
+                f"(mean {state['regime_mean']:.5f}, sd {state['regime_std']:.5f})"
+            )
+
+
+if __name__ == "__main__":
+    main()
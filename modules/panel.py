@@ -0,0 +1,247 @@
+"""
+Multi-asset price panels aligned on a shared date index.
+
+A panel is a wide pd.DataFrame: a sorted DatetimeIndex named 'date', one
+float64 column per asset (Brent, WTI, Dubai, product cracks, ...) and NaN
+where an asset has no price. Its values are a single 2-D (dates x assets)
+float64 block, and every preprocessing step here -- calendar alignment, gap
+filling, log returns and outlier masking -- runs on that array for all
+assets at once instead of looping over them.
+
+Per-asset consumers (the change point models, batch fits) take the columns
+with `panel_series`, which drops each asset's missing dates.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from modules.config import PANEL_FILE, PRICE_FILE
+from modules.time_series_utils import log_returns
+
+# Robust z-score beyond which a return is treated as a data error
+OUTLIER_THRESHOLD = 10.0
+
+# Scales the median absolute deviation to a standard deviation for Normal data
+MAD_SCALE = 1.4826
+
+
+def build_panel(series):
+    """
+    Align price series on the union of their dates.
+
+    Args:
+        series (dict): Asset name -> date-indexed pd.Series (or a DataFrame
+            with 'date' and 'price' columns). Duplicate dates keep their last price.
+
+    Returns:
+        pd.DataFrame: Panel with a sorted 'date' index and one float64 column per asset.
+    """
+    columns = {}
+    for name, values in series.items():
+        if isinstance(values, pd.DataFrame):
+            values = values.set_index("date")["price"]
+        values = values[~values.index.duplicated(keep="last")]
+        columns[str(name)] = values.astype(np.float64)
+
+    panel = pd.concat(columns, axis=1, join="outer", sort=True)
+    panel.index = pd.DatetimeIndex(panel.index).astype("datetime64[ns]")
+    panel.index.name = "date"
+    panel.columns.name = "asset"
+    return panel
+
+
+def panel_from_long(df, date_col="date", asset_col="asset", value_col="price"):
+    """
+    Pivot long-format rows (one price per date and asset) into a panel.
+
+    Returns:
+        pd.DataFrame: Panel as returned by `build_panel`; duplicate (date, asset)
+            rows keep their last price.
+    """
+    df = df.drop_duplicates([date_col, asset_col], keep="last")
+    panel = df.pivot(index=date_col, columns=asset_col, values=value_col).sort_index()
+    panel = panel.astype(np.float64)
+    panel.index = pd.DatetimeIndex(panel.index).astype("datetime64[ns]")
+    panel.index.name = "date"
+    panel.columns = panel.columns.astype(str)
+    panel.columns.name = "asset"
+    return panel
+
+
+def load_panel(panel_file=PANEL_FILE, brent_file=PRICE_FILE, assets=None):
+    """
+    Load the price panel: Brent plus the assets of the optional long-format panel file.
+
+    Both files are read through their columnar caches (modules.ingest). Brent
+    comes from `brent_file` unless the panel file has a 'brent' asset.
+
+    Args:
+        panel_file (str or Path): CSV with date (YYYY-MM-DD), asset and price columns;
+            skipped if missing.
+        brent_file (str or Path): The Brent price CSV.
+        assets (list, optional): Keep only these assets, in this order.
+
+    Returns:
+        pd.DataFrame: Panel as returned by `build_panel`.
+    """
+    from pathlib import Path
+
+    from modules.ingest import load_dataset
+
+    others = pd.DataFrame()
+    if panel_file is not None and Path(panel_file).exists():
+        others = panel_from_long(load_dataset("asset_prices", panel_file))
+
+    series = {}
+    if "brent" not in others.columns and brent_file is not None:
+        series["brent"] = load_dataset("prices", brent_file).set_index("date")["price"]
+    series.update(others.items())
+
+    panel = build_panel(series)
+    return select_assets(panel, assets)
+
+
+def select_assets(panel, assets=None):
+    """Columns of `panel` for `assets` (all by default), raising ValueError on unknown names."""
+    if assets is None:
+        return panel
+    unknown = [asset for asset in assets if asset not in panel.columns]
+    if unknown:
+        raise ValueError(f"Unknown assets {unknown}. Available: {list(panel.columns)}")
+    return panel[list(assets)]
+
+
+def align_calendar(panel, freq="B"):
+    """
+    Reindex a panel onto a regular calendar between its first and last date.
+
+    Dates missing from the calendar become NaN rows (fill them with
+    `fill_gaps`); observations off the calendar (e.g. weekend prints with
+    freq='B') are dropped.
+
+    Args:
+        panel (pd.DataFrame): Panel.
+        freq (str, optional): pandas frequency ('B' business days, 'D' calendar
+            days); None keeps the panel's own dates.
+
+    Returns:
+        pd.DataFrame: Panel on the calendar.
+    """
+    if freq is None or panel.empty:
+        return panel
+    first, last = panel.index.values[[0, -1]].astype("datetime64[D]")
+    if freq in ("D", "B"):
+        # NumPy builds day calendars far faster than pd.date_range with offsets
+        days = np.arange(first, last + 1)
+        calendar = days if freq == "D" else days[np.is_busday(days)]
+        calendar = pd.DatetimeIndex(calendar.astype("datetime64[ns]"), name="date")
+    else:
+        calendar = pd.date_range(first, last, freq=freq, name="date").as_unit("ns")
+    return panel.reindex(calendar)
+
+
+def fill_gaps(values, limit=None):
+    """
+    Forward-fill NaNs down each column of a 2-D array in one vectorized pass.
+
+    Leading NaNs (before a column's first value) stay NaN.
+
+    Args:
+        values (np.ndarray): Dates x assets array.
+        limit (int, optional): Fill at most this many consecutive missing dates;
+            longer gaps keep their NaNs beyond the limit.
+
+    Returns:
+        np.ndarray: Filled copy.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return values.copy()
+    valid = ~np.isnan(values)
+    rows = np.arange(len(values))[:, np.newaxis]
+
+    # Row of the last valid value at or before each row, per column
+    last = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    filled = np.take_along_axis(values, np.maximum(last, 0), axis=0)
+    stale = last < 0
+    if limit is not None:
+        stale |= rows - last > limit
+    filled[stale] = np.nan
+    return filled
+
+
+def outlier_mask(returns, threshold=OUTLIER_THRESHOLD):
+    """
+    Flag returns more than `threshold` robust standard deviations from their column's median.
+
+    The scale is the median absolute deviation (times MAD_SCALE) of each column,
+    so a few corrupt prints do not inflate it the way they inflate the std.
+    Columns whose MAD is zero are never flagged.
+
+    Args:
+        returns (np.ndarray): Dates x assets returns; NaNs are ignored.
+        threshold (float): Robust z-score cutoff.
+
+    Returns:
+        np.ndarray: Boolean mask of the outliers, shaped like `returns`.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    with warnings.catch_warnings():
+        # All-NaN columns (assets without data in the range) have no median
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(returns, axis=0)
+        scale = MAD_SCALE * np.nanmedian(np.abs(returns - median), axis=0)
+
+    # A zero scale (mostly unchanged prices) gives no basis to flag anything
+    scale = np.where(scale > 0, scale, np.inf)
+    with np.errstate(invalid="ignore"):
+        return np.abs(returns - median) > threshold * scale
+
+
+def panel_log_returns(panel):
+    """Log returns of every asset, as a panel; the first row is dropped."""
+    returns = log_returns(panel.to_numpy(dtype=np.float64))
+    return pd.DataFrame(returns[1:], index=panel.index[1:], columns=panel.columns)
+
+
+def preprocess_panel(panel, freq="B", fill_limit=5, outlier_threshold=OUTLIER_THRESHOLD):
+    """
+    Calendar-aligned, gap-filled log returns of a price panel with outliers masked.
+
+    Every step is one array operation over all assets: reindex onto the
+    calendar, forward-fill gaps of at most `fill_limit` dates, take log returns
+    and set returns beyond `outlier_threshold` robust z-scores to NaN.
+
+    Args:
+        panel (pd.DataFrame): Price panel.
+        freq (str, optional): Calendar frequency (see `align_calendar`).
+        fill_limit (int, optional): Longest gap to fill; None fills every gap.
+        outlier_threshold (float, optional): Robust z-score cutoff; None keeps
+            every return.
+
+    Returns:
+        pd.DataFrame: Log return panel (first calendar date dropped).
+    """
+    aligned = align_calendar(panel, freq)
+    prices = fill_gaps(aligned.to_numpy(dtype=np.float64), limit=fill_limit)
+
+    returns = log_returns(prices)[1:]
+    if outlier_threshold is not None:
+        returns[outlier_mask(returns, outlier_threshold)] = np.nan
+    return pd.DataFrame(returns, index=aligned.index[1:], columns=aligned.columns)
+
+
+def panel_series(panel, assets=None):
+    """
+    Each asset's column with its missing dates dropped.
+
+    Args:
+        panel (pd.DataFrame): Panel (prices or returns).
+        assets (list, optional): Assets to return; all by default.
+
+    Returns:
+        dict: Asset name -> date-indexed pd.Series.
+    """
+    panel = select_assets(panel, assets)
+    return {asset: panel[asset].dropna() for asset in panel.columns}
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+CP_KEYS = ("tau", "tau_pos", "cp")
+
+
+def change_point_samples(trace):
+    """
+    Fetch the change point variable of a trace as an integer array.
+
+    Args:
+        trace (az.InferenceData or xr.Dataset): Posterior trace, or its posterior
+            group (e.g. from modules.trace_store.load_posterior), with one of
+            'tau', 'tau_pos' or 'cp'.
+
+    Returns:
+        tuple: (variable name, np.ndarray of shape (chains, draws, max_cp)).
+    """
+    posterior = getattr(trace, "posterior", trace)
+    cp_key = next((k for k in CP_KEYS if k in posterior), None)
+    if cp_key is None:
+        raise KeyError("No change point variable found in trace. Expected one of: 'tau', 'tau_pos', or 'cp'.")
+
+    samples = posterior[cp_key].values
+    if samples.ndim == 2:
+        samples = samples[:, :, np.newaxis]  # for models with one cp
+    return cp_key, samples
+
+
+def index_counts(samples, n):
+    """
+    Histogram of change point indices per change point, in one bincount.
+
+    Args:
+        samples (np.ndarray): Index samples, shape (chains, draws, max_cp).
+        n (int): Series length; indices outside [0, n) are ignored.
+
+    Returns:
+        np.ndarray: Counts of shape (max_cp, n).
+    """
+    idxs = np.rint(samples).astype(np.int64).reshape(-1, samples.shape[-1])
+    max_cp = idxs.shape[1]
+
+    # Offset each change point into its own block of n bins
+    keys = idxs + np.arange(max_cp) * n
+    valid = (idxs >= 0) & (idxs < n)
+    return np.bincount(keys[valid], minlength=max_cp * n).reshape(max_cp, n)
+
+
+def hdi_from_counts(counts, hdi_prob=0.94):
+    """
+    Narrowest contiguous index interval holding `hdi_prob` of the mass of each row.
+
+    Args:
+        counts (np.ndarray): Histogram of shape (max_cp, n).
+        hdi_prob (float): Probability mass of the interval.
+
+    Returns:
+        np.ndarray: Inclusive (lo, hi) index bounds, shape (max_cp, 2).
+    """
+    bounds = np.zeros((counts.shape[0], 2), dtype=np.int64)
+    for i, row in enumerate(counts):
+        total = row.sum()
+        if total == 0:
+            continue
+        needed = np.ceil(hdi_prob * total)
+        cum = np.cumsum(row)
+        before = cum - row
+        # For each start, the first end whose cumulative mass covers `needed`
+        ends = np.searchsorted(cum, before + needed, side="left")
+        ok = ends < len(row)
+        starts = np.flatnonzero(ok & (row > 0))
+        best = starts[np.argmin(ends[starts] - starts)]
+        bounds[i] = best, ends[best]
+    return bounds
+
+
+def summarize_posterior(samples, dates, hdi_prob=0.94):
+    """
+    Per change point probability mass, credible interval and mapped dates.
+
+    Args:
+        samples (np.ndarray): Index samples, shape (chains, draws) or (chains, draws, max_cp).
+        dates (array-like): Dates of the series the indices refer to.
+        hdi_prob (float): Probability mass of the credible intervals.
+
+    Returns:
+        dict: With keys
+            'counts' (max_cp, n) histogram,
+            'probability' (max_cp, n) normalized histogram,
+            'mode' (max_cp,) most probable index,
+            'mode_probability' (max_cp,),
+            'mean' (max_cp,) posterior mean index,
+            'hdi' (max_cp, 2) inclusive index bounds,
+            'mode_dates' and 'hdi_dates' as ISO date strings,
+            'indices' sorted distinct in-range indices over all change points,
+            'index_dates' their ISO dates.
+    """
+    dates = pd.DatetimeIndex(dates).values
+    samples = np.asarray(samples)
+    if samples.ndim == 2:
+        samples = samples[:, :, np.newaxis]
+
+    counts = index_counts(samples, len(dates))
+    totals = np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    probability = counts / totals
+
+    mode = counts.argmax(axis=1)
+    hdi = hdi_from_counts(counts, hdi_prob)
+    indices = np.flatnonzero(counts.sum(axis=0))
+
+    return {
+        "counts": counts,
+        "probability": probability,
+        "mode": mode,
+        "mode_probability": probability[np.arange(len(mode)), mode],
+        "mean": samples.reshape(-1, samples.shape[-1]).mean(axis=0),
+        "hdi": hdi,
+        "mode_dates": np.datetime_as_string(dates[mode], unit="D"),
+        "hdi_dates": np.datetime_as_string(dates[hdi], unit="D"),
+        "indices": indices,
+        "index_dates": np.datetime_as_string(dates[indices], unit="D"),
+    }
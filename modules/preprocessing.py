@@ -1,20 +1,7 @@
-import numpy as np
 import pandas as pd
 
-def compute_log_returns(df, price_col="Price"):
-    """
-    Compute log returns from price data.
-    
-    Args:
-        df (pd.DataFrame): DataFrame with a price column.
-        price_col (str): Name of the column with price/time-series values.
-        
-    Returns:
-        pd.DataFrame: DataFrame with added 'Log_Return' column and dropped NA rows.
-    """
-    df = df.copy()
-    df["Log_Return"] = np.log(df[price_col] / df[price_col].shift(1))
-    return df.dropna()
+# Single implementation in time_series_utils; kept importable from here
+from modules.time_series_utils import compute_log_returns  # noqa: F401
 
 def preprocess_time_series(df, value_col="sentiment_score", date_col="date"):
     """
@@ -22,17 +9,19 @@ def preprocess_time_series(df, value_col="sentiment_score", date_col="date"):
     
     Args:
         df (pd.DataFrame): Raw time series data with date and value columns.
-        value_col (str): Column name for values (e.g. sentiment_score).
+        value_col (str or list): Column name for values (e.g. sentiment_score), or
+            several columns (e.g. one per asset) processed together.
         date_col (str): Column name for the datetime column.
     
     Returns:
         pd.DataFrame: Preprocessed time series with datetime index and sorted.
     """
-    df = df.copy()
+    value_cols = [value_col] if isinstance(value_col, str) else list(value_col)
+    df = df[[date_col, *value_cols]].copy()
     df[date_col] = pd.to_datetime(df[date_col])
-    df = df[[date_col, value_col]].dropna()
+    # Rows need a date and at least one value
+    df = df[df[date_col].notna()].dropna(subset=value_cols, how="all")
     df = df.sort_values(date_col)
     df.set_index(date_col, inplace=True)
     df = df.asfreq("D")  # Ensure daily frequency (can be parameterized)
-    df.fillna(method="ffill", inplace=True)
-    return df
+    return df.ffill()
@@ -0,0 +1,221 @@
+"""
+Headless, cached rendering of matplotlib figures to PNG / SVG bytes.
+
+Figures are drawn on the Agg backend through matplotlib.figure.Figure, never
+through pyplot, so rendering needs no display, keeps no global figure state
+and is safe in batch jobs and server threads. Each render is cached under a
+hash of the plot name, a fingerprint of its input data (arrays, frames,
+traces or source files) and the plot parameters: in memory for the process
+and on disk (PLOT_DIR) across processes and restarts, so a plot is drawn once
+per version of its data however many times it is requested. Both caches are
+bounded: the disk cache keeps the DISK_ENTRIES most recently used renders.
+
+matplotlib is imported inside the functions that draw.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modules.config import BASE_DIR
+
+PLOT_DIR = BASE_DIR / "models" / "plots"
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+DEFAULT_DPI = 100
+
+# Renders kept in memory per process
+MEMORY_ENTRIES = 64
+# Render files kept on disk; the least recently used beyond this are deleted
+DISK_ENTRIES = 512
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+# matplotlib is not thread-safe; cache misses draw one at a time
+_draw_lock = threading.Lock()
+
+
+def fingerprint(*parts):
+    """
+    Stable hash of plot inputs.
+
+    Arrays and pandas objects are hashed by content, az.InferenceData / xarray
+    datasets by their posterior arrays, Path objects by their file signature
+    (mtime, size) and anything else by its JSON form.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha1()
+
+    def update(part):
+        if isinstance(part, Path):
+            stat = os.stat(part)
+            digest.update(f"path:{part}:{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8"))
+        elif isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part)
+            digest.update(f"array:{part.dtype}:{part.shape}".encode("utf-8"))
+            digest.update(part.view(np.uint8) if part.dtype != object else repr(part.tolist()).encode("utf-8"))
+        elif isinstance(part, (pd.Series, pd.DataFrame, pd.Index)):
+            digest.update(f"pandas:{getattr(part, 'columns', None)}".encode("utf-8"))
+            update(pd.util.hash_pandas_object(part, index=not isinstance(part, pd.Index)).to_numpy())
+        elif hasattr(part, "data_vars") or hasattr(part, "posterior"):
+            posterior = getattr(part, "posterior", part)
+            for name in sorted(posterior.data_vars):
+                digest.update(f"var:{name}".encode("utf-8"))
+                update(np.asarray(posterior[name].values))
+        elif isinstance(part, (list, tuple)):
+            digest.update(f"seq:{len(part)}".encode("utf-8"))
+            for item in part:
+                update(item)
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+
+    for part in parts:
+        update(part)
+    return digest.hexdigest()
+
+
+def figure_bytes(fig, fmt="png", dpi=DEFAULT_DPI):
+    """Serialize a Figure with the Agg canvas ('png') or the SVG backend ('svg')."""
+    import io
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Expected one of {tuple(FORMATS)}.")
+    FigureCanvasAgg(fig)
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi)
+    return buf.getvalue()
+
+
+def render(name, draw, key, fmt="png", figsize=(10, 4), dpi=DEFAULT_DPI, cache_dir=PLOT_DIR):
+    """
+    Render a plot to bytes, reusing a cached render of the same inputs.
+
+    Args:
+        name (str): Plot name, part of the cache key and file name.
+        draw (callable): Draws into a fresh matplotlib Figure passed as its argument.
+        key (tuple): Everything the plot depends on, passed to `fingerprint`.
+        fmt (str): 'png' or 'svg'.
+        figsize (tuple): Figure size in inches.
+        dpi (int): Resolution of PNG renders.
+        cache_dir (str or Path, optional): Directory of the on-disk cache; None
+            keeps renders in memory only.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Expected one of {tuple(FORMATS)}.")
+    token = f"{name}-{fingerprint(name, key, fmt, list(figsize), dpi)[:20]}"
+
+    with _memory_lock:
+        if token in _memory:
+            _memory.move_to_end(token)
+            return _memory[token]
+
+    path = Path(cache_dir) / f"{token}.{fmt}" if cache_dir is not None else None
+    with _draw_lock:
+        # Another thread may have rendered it while we waited for the lock
+        if path is not None and path.exists():
+            body = path.read_bytes()
+            # The file's mtime is its last use, for pruning
+            os.utime(path)
+        else:
+            from matplotlib.figure import Figure
+
+            fig = Figure(figsize=figsize, layout="tight")
+            draw(fig)
+            body = figure_bytes(fig, fmt, dpi)
+            if path is not None:
+                # Write atomically so other processes never read a partial file
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+                tmp_path.write_bytes(body)
+                os.replace(tmp_path, path)
+                _prune(path.parent)
+
+    with _memory_lock:
+        _memory[token] = body
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+    return body
+
+
+def _prune(cache_dir, max_entries=DISK_ENTRIES):
+    """Delete the least recently used render files of `cache_dir` beyond `max_entries`."""
+    entries = []
+    for path in Path(cache_dir).iterdir():
+        if path.suffix.lstrip(".") not in FORMATS:
+            continue
+        try:
+            entries.append((path.stat().st_mtime_ns, path))
+        except FileNotFoundError:
+            # Pruned by another process meanwhile
+            continue
+    entries.sort()
+    for _, path in entries[:max(0, len(entries) - max_entries)]:
+        path.unlink(missing_ok=True)
+
+
+def output(name, draw, key, fmt=None, figsize=(10, 4), dpi=DEFAULT_DPI):
+    """
+    Show a plot interactively (fmt=None) or render it headless to cached bytes.
+
+    Returns:
+        bytes or None: The image when `fmt` is set.
+    """
+    if fmt is not None:
+        return render(name, draw, key, fmt=fmt, figsize=figsize, dpi=dpi)
+
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=figsize, layout="tight")
+    draw(fig)
+    plt.show()
+    return None
+
+
+def histogram_from_counts(values, counts, bins=50, value_range=None):
+    """
+    Re-bin a histogram of distinct values (e.g. posterior change point index
+    counts) into `bins` equal-width bins without expanding it to raw samples.
+
+    Args:
+        values (np.ndarray): Distinct values.
+        counts (np.ndarray): Count of each value.
+        bins (int): Number of bins.
+        value_range (tuple, optional): (lo, hi); defaults to the values' range.
+
+    Returns:
+        tuple: (counts per bin, bin edges).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if value_range is None:
+        value_range = (values.min(), values.max()) if len(values) else (0.0, 1.0)
+    return np.histogram(values, bins=bins, range=value_range, weights=np.asarray(counts, dtype=np.float64))
+
+
+def sample_histograms(samples, bins=40):
+    """
+    Histogram of each row of a 2-D sample array (e.g. chains or vector
+    components) on shared bin edges.
+
+    Returns:
+        tuple: (counts of shape (rows, bins), bin edges).
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    finite = samples[np.isfinite(samples)]
+    lo, hi = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+    edges = np.linspace(lo, hi if hi > lo else lo + 1.0, bins + 1)
+    # One bincount over all rows, offset per row
+    positions = np.clip(np.searchsorted(edges, samples, side="right") - 1, 0, bins - 1)
+    keys = positions + np.arange(samples.shape[0])[:, np.newaxis] * bins
+    counts = np.bincount(keys[np.isfinite(samples)], minlength=samples.shape[0] * bins)
+    return counts.reshape(samples.shape[0], bins), edges
@@ -0,0 +1,561 @@
+"""
+Batched ADF and KPSS stationarity tests over many windows of a series.
+
+`check_stationarity` (modules.time_series_utils) runs one `adfuller` on a
+whole series. Validating regimes needs the same tests over rolling and
+expanding windows and over the segments between change points, i.e.
+thousands of small regressions. Here they are batched:
+
+- ADF: every window's regression uses rows of one lagged design matrix
+  built once per series (level, lagged differences, deterministic terms,
+  target). The cross products X'X / X'y of any contiguous block of rows are
+  differences of prefix sums, so overlapping windows share all the work,
+  each lag order in the AIC/BIC search is a sub-block of the same matrix,
+  and a window costs one small k x k solve, done for all windows at once.
+- KPSS: windows of equal length are stacked into one 2-D array and their
+  residuals, partial sums and Newey-West variances computed together.
+
+Statistics, lag selection and p-values match statsmodels' `adfuller`
+(autolag 'AIC'/'BIC' or a fixed lag) and `kpss` (nlags 'auto'/'legacy'/int).
+`stationarity_table` spreads series and window chunks over a process pool
+and returns one tidy row per (series, window, test).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.logger import get_logger
+
+logger = get_logger()
+
+TESTS = ("adf", "kpss")
+ADF_REGRESSIONS = ("n", "c", "ct")
+KPSS_REGRESSIONS = ("c", "ct")
+
+# MacKinnon (1994) p-value approximation for one I(1) series (N=1), as in
+# statsmodels.tsa.adfvalues, whose module-level tables are private: the
+# statistic's p-value is Phi(polynomial(stat)) with the small-p coefficients
+# up to the switch point and the large-p ones above it, clipped to 0 / 1
+# outside [min, max]. Coefficients in increasing powers.
+ADF_PVALUE_TABLE = {
+    "n": {"small": (0.6344, 1.2378, 0.032496), "large": (0.4797, 0.93557, -0.06999, 0.033066),
+          "switch": -1.04, "min": -19.04, "max": np.inf},
+    "c": {"small": (2.1659, 1.4412, 0.038269), "large": (1.7339, 0.93202, -0.12745, -0.010368),
+          "switch": -1.61, "min": -18.83, "max": 2.74},
+    "ct": {"small": (3.2512, 1.6047, 0.049588), "large": (2.5261, 0.61654, -0.37956, -0.060285),
+           "switch": -2.89, "min": -16.18, "max": 0.7},
+}
+
+# Kwiatkowski et al. (1992) table: statistic cut-offs for the p-values below
+KPSS_CRITICAL = {"c": (0.347, 0.463, 0.574, 0.739), "ct": (0.119, 0.146, 0.176, 0.216)}
+KPSS_PVALUES = (0.10, 0.05, 0.025, 0.01)
+
+# Windows per pool task; a task builds the design over its windows' span only
+CHUNK_WINDOWS = 500
+
+# Bound on the temporary per-row outer products (elements) when accumulating prefix sums
+_BLOCK_ELEMENTS = 1 << 22
+
+
+def rolling_windows(n, window, step=1):
+    """
+    Half-open [start, end) windows of fixed length sliding over n observations.
+
+    Returns:
+        np.ndarray: int64 array of shape (k, 2).
+    """
+    starts = np.arange(0, n - window + 1, step, dtype=np.int64)
+    return np.column_stack([starts, starts + window])
+
+
+def expanding_windows(n, min_window, step=1):
+    """
+    Windows starting at the first observation and growing by `step` from `min_window` to n.
+
+    Returns:
+        np.ndarray: int64 array of shape (k, 2).
+    """
+    ends = np.arange(min_window, n + 1, step, dtype=np.int64)
+    return np.column_stack([np.zeros_like(ends), ends])
+
+
+def regime_windows(n, change_points, min_size=20):
+    """
+    Segments between change points (each the first index of a new segment).
+
+    Args:
+        n (int): Series length.
+        change_points (array-like): Change point indices, in any order.
+        min_size (int): Segments shorter than this are dropped.
+
+    Returns:
+        np.ndarray: int64 array of shape (k, 2).
+    """
+    cps = np.unique(np.asarray(change_points, dtype=np.int64))
+    edges = np.concatenate([[0], cps[(cps > 0) & (cps < n)], [n]])
+    windows = np.column_stack([edges[:-1], edges[1:]])
+    return windows[windows[:, 1] - windows[:, 0] >= min_size]
+
+
+def default_maxlag(nobs, regression="c"):
+    """Schwert's 12 * (nobs / 100)^(1/4) lags, capped as in statsmodels' adfuller."""
+    nobs = np.asarray(nobs)
+    ntrend = 0 if regression == "n" else len(regression)
+    maxlag = np.ceil(12.0 * np.power(nobs / 100.0, 0.25)).astype(np.int64)
+    return np.minimum(maxlag, nobs // 2 - ntrend - 1)
+
+
+def _prefix_at(Z, positions):
+    """
+    Sums of z_r z_r^T over rows r < p for each p in `positions` (sorted, unique).
+
+    Rows are accumulated in blocks, so memory stays bounded however long Z is.
+
+    Returns:
+        np.ndarray: Array of shape (len(positions), K, K).
+    """
+    rows, k = Z.shape
+    out = np.zeros((len(positions), k, k))
+    total = np.zeros((k, k))
+    block = max(1, _BLOCK_ELEMENTS // (k * k))
+    lo = int(np.searchsorted(positions, 1))  # positions of 0 stay zero
+
+    for start in range(0, rows, block):
+        stop = min(start + block, rows)
+        hi = int(np.searchsorted(positions, stop, side="right"))
+        chunk = Z[start:stop]
+        if hi > lo:
+            cum = np.cumsum(chunk[:, :, None] * chunk[:, None, :], axis=0)
+            cum += total
+            out[lo:hi] = cum[positions[lo:hi] - start - 1]
+            total = cum[-1]
+        else:
+            total = total + chunk.T @ chunk
+        lo = hi
+    return out
+
+
+def _solve(A, b):
+    """
+    Batched OLS pieces: coefficients and the first diagonal entry of inv(A).
+
+    Singular systems (e.g. constant windows) give NaN instead of failing the batch.
+    """
+    rhs = np.zeros(b.shape + (2,))
+    rhs[..., 0] = b
+    rhs[:, 0, 1] = 1.0
+    try:
+        sol = np.linalg.solve(A, rhs)
+    except np.linalg.LinAlgError:
+        sol = np.full(rhs.shape, np.nan)
+        for i in range(len(A)):
+            try:
+                sol[i] = np.linalg.solve(A[i], rhs[i])
+            except np.linalg.LinAlgError:
+                pass
+    return sol[..., 0], sol[:, 0, 1]
+
+
+def _ols(M, cols, target):
+    """
+    OLS of column `target` on `cols` from stacked cross-product matrices M.
+
+    Returns:
+        tuple: (coefficients (m, k), residual sum of squares (m,), inv(X'X)[0, 0] (m,)).
+    """
+    XtX = M[:, cols][:, :, cols]
+    Xty = M[:, cols, target]
+    beta, inv00 = _solve(XtX, Xty)
+    ssr = M[:, target, target] - np.einsum("ij,ij->i", beta, Xty)
+    return beta, np.maximum(ssr, 0.0), inv00
+
+
+def adf_pvalues(stats, regression="c"):
+    """MacKinnon (1994) approximate p-values of ADF statistics (vectorized `mackinnonp` with N=1)."""
+    from scipy.special import ndtr
+
+    table = ADF_PVALUE_TABLE[regression]
+    stats = np.asarray(stats, dtype=np.float64)
+    small = np.polynomial.polynomial.polyval(stats, table["small"])
+    large = np.polynomial.polynomial.polyval(stats, table["large"])
+    pvalues = ndtr(np.where(stats <= table["switch"], small, large))
+    pvalues = np.where(stats > table["max"], 1.0, pvalues)
+    pvalues = np.where(stats < table["min"], 0.0, pvalues)
+    return np.where(np.isnan(stats), np.nan, pvalues)
+
+
+def adf_critical_values(nobs, regression="c"):
+    """MacKinnon (2010) 1%, 5% and 10% critical values for each sample size; shape (m, 3)."""
+    from statsmodels.tsa.adfvalues import mackinnoncrit
+
+    # Windows share a handful of sizes: one `mackinnoncrit` call per distinct size
+    sizes, inverse = np.unique(np.asarray(nobs, dtype=np.int64).ravel(), return_inverse=True)
+    table = np.array([mackinnoncrit(N=1, regression=regression, nobs=size) for size in sizes]).reshape(-1, 3)
+    return table[inverse]
+
+
+def adf_batch(x, windows, regression="c", maxlag=None, autolag="aic"):
+    """
+    Augmented Dickey-Fuller test of every window of a series.
+
+    Equivalent to calling statsmodels' `adfuller(x[start:end], maxlag, regression,
+    autolag)` per window. Windows too short for the regression, or constant,
+    give NaN statistics instead of raising.
+
+    Args:
+        x (np.ndarray): The series (NaN-free).
+        windows (np.ndarray): (k, 2) half-open [start, end) positions.
+        regression (str): Deterministic terms: 'n', 'c' or 'ct'.
+        maxlag (int, optional): Highest lag order; defaults per window to `default_maxlag`.
+        autolag (str, optional): 'aic' or 'bic' to pick the lag order, None to use maxlag.
+
+    Returns:
+        dict: Arrays 'statistic', 'p_value', 'lags', 'nobs' and 'critical' ((k, 3): 1%, 5%, 10%).
+    """
+    if regression not in ADF_REGRESSIONS:
+        raise ValueError(f"Unknown regression '{regression}'. Expected one of {ADF_REGRESSIONS}.")
+    autolag = autolag.lower() if autolag else None
+    if autolag not in (None, "aic", "bic"):
+        raise ValueError(f"Unknown autolag '{autolag}'. Expected 'aic', 'bic' or None.")
+
+    x = np.asarray(x, dtype=np.float64)
+    windows = np.asarray(windows, dtype=np.int64).reshape(-1, 2)
+    starts, ends = windows[:, 0], windows[:, 1]
+    length = ends - starts
+    ntrend = 0 if regression == "n" else len(regression)
+
+    maxlags = default_maxlag(length, regression) if maxlag is None else np.full(len(windows), int(maxlag))
+    valid = (maxlags >= 0) & (maxlags <= length // 2 - ntrend - 1)
+    maxlags = np.where(valid, maxlags, 0)
+
+    result = {
+        "statistic": np.full(len(windows), np.nan),
+        "lags": np.where(valid, maxlags, -1),
+        "nobs": np.zeros(len(windows), dtype=np.int64),
+    }
+    if not valid.any():
+        result["p_value"] = np.full(len(windows), np.nan)
+        result["critical"] = np.full((len(windows), 3), np.nan)
+        return result
+
+    # Lagged design over the whole series. Row r is the regression at time t = r + 1:
+    # [x_{t-1}, dx_{t-1}, ..., dx_{t-P}, deterministic terms, dx_t]
+    n = len(x)
+    P = int(maxlags[valid].max())
+    dx = np.diff(x)
+    # The constant absorbs a level shift; centring keeps the prefix sums well conditioned
+    level = x[:-1] - (x.mean() if regression != "n" else 0.0)
+    Z = np.zeros((n - 1, P + 2 + ntrend))
+    Z[:, 0] = level
+    for lag in range(1, P + 1):
+        Z[lag:, lag] = dx[:-lag]
+    if ntrend:
+        Z[:, P + 1] = 1.0
+    if ntrend == 2:
+        # A global trend spans the same space as each window's own trend
+        Z[:, P + 2] = np.arange(1, n) / n
+    target = Z.shape[1] - 1
+    Z[:, target] = dx
+    det = list(range(P + 1, P + 1 + ntrend))
+
+    # A window of lag order L uses rows [start + L, end - 1); collect every bound needed
+    idx = np.flatnonzero(valid)
+    lag_starts = [starts[idx] + maxlags[idx]]
+    if autolag:
+        lag_starts = [starts[idx] + lag for lag in range(P + 1)]
+    positions = np.unique(np.concatenate(lag_starts + [ends[idx] - 1]))
+    prefix = _prefix_at(Z, positions)
+
+    def block(lo, hi):
+        return prefix[np.searchsorted(positions, hi)] - prefix[np.searchsorted(positions, lo)]
+
+    def columns(lag):
+        return [0] + list(range(1, lag + 1)) + det
+
+    usedlag = maxlags.copy()
+    if autolag:
+        # Every lag order is fitted on the sample of the highest one, so ICs compare
+        common = block(starts[idx] + maxlags[idx], ends[idx] - 1)
+        nobs = (ends[idx] - 1 - starts[idx] - maxlags[idx]).astype(np.float64)
+        best = np.full(len(idx), np.inf)
+        for lag in range(P + 1):
+            active = maxlags[idx] >= lag
+            if not active.any():
+                continue
+            _, ssr, _ = _ols(common[active], columns(lag), target)
+            k = 1 + lag + ntrend
+            with np.errstate(divide="ignore", invalid="ignore"):
+                llf = -nobs[active] / 2 * (np.log(2 * np.pi) + np.log(ssr / nobs[active]) + 1)
+            penalty = 2 * k if autolag == "aic" else np.log(nobs[active]) * k
+            ic = -2 * llf + penalty
+            # Ties keep the shorter lag, as in statsmodels
+            better = np.zeros(len(idx), dtype=bool)
+            better[active] = ic < best[active]
+            best[better] = ic[better[active]]
+            usedlag[idx[better]] = lag
+
+    # Final regression at the chosen lag, grouped by lag order
+    for lag in np.unique(usedlag[idx]):
+        group = idx[usedlag[idx] == lag]
+        M = block(starts[group] + lag, ends[group] - 1)
+        beta, ssr, inv00 = _ols(M, columns(int(lag)), target)
+        nobs = ends[group] - 1 - starts[group] - lag
+        dof = nobs - (1 + lag + ntrend)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            stat = beta[:, 0] / np.sqrt(ssr / dof * inv00)
+        result["statistic"][group] = np.where(np.isfinite(stat), stat, np.nan)
+        result["nobs"][group] = nobs
+
+    result["lags"] = np.where(valid, usedlag, -1)
+    result["p_value"] = adf_pvalues(result["statistic"], regression)
+    result["critical"] = np.where(
+        valid[:, None], adf_critical_values(np.maximum(result["nobs"], 1), regression), np.nan
+    )
+    return result
+
+
+def _kpss_group(X, regression, nlags):
+    """KPSS statistics and lags for a stack of equal-length windows X (m, L)."""
+    m, L = X.shape
+    resid = X - X.mean(axis=1, keepdims=True)
+    if regression == "ct":
+        t = np.arange(1, L + 1) - (L + 1) / 2
+        resid -= np.outer(resid @ t / (t @ t), t)
+
+    def autocov(lag):
+        return np.einsum("ij,ij->i", resid[:, lag:], resid[:, :L - lag])
+
+    if nlags == "auto":
+        # Hobijn et al. (1998) data-dependent bandwidth, per window
+        covlags = int(np.power(L, 2.0 / 9.0))
+        s0 = np.einsum("ij,ij->i", resid, resid) / L
+        s1 = np.zeros(m)
+        for i in range(1, covlags + 1):
+            prod = autocov(i) / (L / 2.0)
+            s0 += prod
+            s1 += i * prod
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gamma = 1.1447 * np.power((s1 / s0) ** 2, 1.0 / 3.0)
+        lags = np.where(np.isfinite(gamma), gamma * np.power(L, 1.0 / 3.0), 0).astype(np.int64)
+        lags = np.minimum(lags, L - 1)
+    elif nlags == "legacy":
+        lags = np.full(m, min(int(np.ceil(12.0 * np.power(L / 100.0, 0.25))), L - 1))
+    else:
+        lags = np.full(m, int(nlags))
+
+    s_hat = np.einsum("ij,ij->i", resid, resid)
+    for i in range(1, int(lags.max(initial=0)) + 1):
+        weight = np.where(lags >= i, 1.0 - i / (lags + 1.0), 0.0)
+        s_hat += 2 * weight * autocov(i)
+    s_hat /= L
+
+    eta = np.sum(np.cumsum(resid, axis=1) ** 2, axis=1) / L**2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stat = eta / s_hat
+    return np.where(np.isfinite(stat), stat, np.nan), lags
+
+
+def kpss_batch(x, windows, regression="c", nlags="auto"):
+    """
+    KPSS test of every window of a series.
+
+    Equivalent to calling statsmodels' `kpss(x[start:end], regression, nlags)`
+    per window. Windows of the same length are tested together; windows
+    shorter than 2 observations, or with an integer nlags not below their
+    length, give NaN.
+
+    Args:
+        x (np.ndarray): The series (NaN-free).
+        windows (np.ndarray): (k, 2) half-open [start, end) positions.
+        regression (str): 'c' (level stationary) or 'ct' (trend stationary).
+        nlags (str or int): 'auto', 'legacy' or a fixed number of lags.
+
+    Returns:
+        dict: Arrays 'statistic', 'p_value' (clipped to the table's [0.01, 0.10]),
+            'lags', 'nobs' and 'critical' ((k, 3): 1%, 5%, 10%).
+    """
+    if regression not in KPSS_REGRESSIONS:
+        raise ValueError(f"Unknown regression '{regression}'. Expected one of {KPSS_REGRESSIONS}.")
+    if isinstance(nlags, str) and nlags not in ("auto", "legacy"):
+        raise ValueError(f"Unknown nlags '{nlags}'. Expected 'auto', 'legacy' or an integer.")
+
+    x = np.asarray(x, dtype=np.float64)
+    windows = np.asarray(windows, dtype=np.int64).reshape(-1, 2)
+    length = windows[:, 1] - windows[:, 0]
+    stats = np.full(len(windows), np.nan)
+    lags = np.full(len(windows), -1, dtype=np.int64)
+
+    for L in np.unique(length):
+        if L < 2 or (not isinstance(nlags, str) and int(nlags) >= L):
+            continue
+        group = np.flatnonzero(length == L)
+        # Bound the stacked copy for long windows
+        for part in np.array_split(group, max(1, len(group) * L // _BLOCK_ELEMENTS + 1)):
+            X = x[windows[part, 0, None] + np.arange(L)]
+            stats[part], lags[part] = _kpss_group(X, regression, nlags)
+
+    crit = np.asarray(KPSS_CRITICAL[regression])
+    pvalues = np.interp(stats, crit, KPSS_PVALUES)
+    critical = np.tile(crit[[3, 1, 0]], (len(windows), 1))
+    return {
+        "statistic": stats,
+        "p_value": np.where(np.isnan(stats), np.nan, pvalues),
+        "lags": lags,
+        "nobs": length,
+        "critical": critical,
+    }
+
+
+def _test_windows(values, windows, tests, options):
+    """Pool task: run `tests` over windows of one series, restricted to the windows' span."""
+    lo, hi = int(windows[:, 0].min()), int(windows[:, 1].max())
+    local = windows - lo
+    results = {}
+    if "adf" in tests:
+        results["adf"] = adf_batch(values[lo:hi], local, **options["adf"])
+    if "kpss" in tests:
+        results["kpss"] = kpss_batch(values[lo:hi], local, **options["kpss"])
+    return results
+
+
+def _as_series(series):
+    if isinstance(series, dict):
+        return {str(name): values for name, values in series.items()}
+    return {getattr(series, "name", None) or "series": series}
+
+
+def stationarity_table(
+    series,
+    windows,
+    tests=TESTS,
+    adf_regression="c",
+    maxlag=None,
+    autolag="aic",
+    kpss_regression="c",
+    nlags="auto",
+    alpha=0.05,
+    workers=None,
+    chunk_size=CHUNK_WINDOWS,
+):
+    """
+    ADF and KPSS tests over windows of one or several series, as a tidy table.
+
+    Each series is split into chunks of `chunk_size` windows; chunks run in a
+    process pool when `workers` > 1 and there is more than one chunk.
+
+    Args:
+        series (pd.Series, np.ndarray or dict): A series, or name -> series (e.g.
+            modules.panel.panel_series). NaNs are dropped first; window positions
+            refer to the remaining observations.
+        windows (np.ndarray or callable): (k, 2) [start, end) positions, or a
+            function of the series length returning them (e.g.
+            `lambda n: rolling_windows(n, 252, 21)`).
+        tests (tuple): Any of 'adf' and 'kpss'.
+        adf_regression, maxlag, autolag: ADF options (see `adf_batch`).
+        kpss_regression, nlags: KPSS options (see `kpss_batch`).
+        alpha (float): Significance level of the 'stationary' column: ADF rejects
+            its unit root (p < alpha), KPSS fails to reject stationarity (p >= alpha).
+        workers (int, optional): Pool size; defaults to os.cpu_count().
+        chunk_size (int): Windows per pool task.
+
+    Returns:
+        pd.DataFrame: One row per series, window and test with columns series,
+            test, start, end, start_date, end_date (for date-indexed series),
+            statistic, p_value, lags, nobs, crit_1%, crit_5%, crit_10% and stationary.
+    """
+    unknown = [test for test in tests if test not in TESTS]
+    if unknown or not tests:
+        raise ValueError(f"Invalid tests {unknown}, expected some of {list(TESTS)}")
+    options = {
+        "adf": {"regression": adf_regression, "maxlag": maxlag, "autolag": autolag},
+        "kpss": {"regression": kpss_regression, "nlags": nlags},
+    }
+
+    tasks = []
+    prepared = {}
+    for name, values in _as_series(series).items():
+        if isinstance(values, pd.Series):
+            values = values.dropna()
+            dates = values.index if isinstance(values.index, pd.DatetimeIndex) else None
+            values = values.to_numpy(dtype=np.float64)
+        else:
+            values = np.asarray(values, dtype=np.float64)
+            values, dates = values[~np.isnan(values)], None
+
+        spans = windows(len(values)) if callable(windows) else windows
+        spans = np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+        if len(spans) and (spans.min() < 0 or spans[:, 1].max() > len(values) or (spans[:, 1] < spans[:, 0]).any()):
+            raise ValueError(f"Windows out of range for series '{name}' of length {len(values)}")
+        # Sorting keeps each chunk's span, and so its design matrix, short
+        spans = spans[np.lexsort((spans[:, 1], spans[:, 0]))]
+        prepared[name] = (spans, dates)
+        for start in range(0, len(spans), chunk_size):
+            tasks.append((name, values, spans[start:start + chunk_size]))
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    logger.info(f"Testing {sum(len(task[2]) for task in tasks)} windows in {len(tasks)} chunks on {workers} workers")
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_test_windows, values, spans, tests, options) for _, values, spans in tasks]
+            outputs = [future.result() for future in futures]
+    else:
+        outputs = [_test_windows(values, spans, tests, options) for _, values, spans in tasks]
+
+    frames = []
+    for (name, _, spans), output in zip(tasks, outputs):
+        dates = prepared[name][1]
+        for test, result in output.items():
+            frame = pd.DataFrame({
+                "series": name,
+                "test": test,
+                "start": spans[:, 0],
+                "end": spans[:, 1],
+                "statistic": result["statistic"],
+                "p_value": result["p_value"],
+                "lags": result["lags"],
+                "nobs": result["nobs"],
+                "crit_1%": result["critical"][:, 0],
+                "crit_5%": result["critical"][:, 1],
+                "crit_10%": result["critical"][:, 2],
+            })
+            if dates is not None:
+                # Inclusive dates of each window's first and last observation
+                frame.insert(4, "start_date", dates[np.minimum(spans[:, 0], len(dates) - 1)])
+                frame.insert(5, "end_date", dates[np.maximum(spans[:, 1] - 1, 0)])
+            reject = frame["p_value"] < alpha
+            frame["stationary"] = reject if test == "adf" else ~reject & frame["p_value"].notna()
+            frame.loc[frame["p_value"].isna(), "stationary"] = False
+            frames.append(frame)
+
+    columns = ["series", "test", "start", "end", "statistic", "p_value", "lags", "nobs", "stationary"]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    table = pd.concat(frames, ignore_index=True)
+    return table.sort_values(["series", "test", "start", "end"], kind="stable", ignore_index=True)
+
+
+def regime_stationarity(series, change_points, min_size=20, **kwargs):
+    """
+    Test each segment between change points, e.g. to check that a mean-shift
+    model's regimes have stationary returns.
+
+    Args:
+        series (pd.Series or np.ndarray): The series; NaNs are dropped.
+        change_points (array-like): Change point indices, or dates when `series`
+            has a DatetimeIndex (a date starts the segment it falls in).
+        min_size (int): Segments shorter than this are skipped.
+        **kwargs: Passed to `stationarity_table`.
+
+    Returns:
+        pd.DataFrame: As returned by `stationarity_table`.
+    """
+    if isinstance(series, pd.Series):
+        series = series.dropna()
+    cps = np.asarray(change_points)
+    if isinstance(series, pd.Series) and isinstance(series.index, pd.DatetimeIndex) and len(cps) \
+            and not np.issubdtype(cps.dtype, np.integer):
+        cps = series.index.searchsorted(pd.DatetimeIndex(cps))
+    windows = regime_windows(len(series), cps, min_size=min_size)
+    return stationarity_table(series, windows, **kwargs)
@@ -1,13 +1,274 @@
 import numpy as np
-import pandas as pd
-from statsmodels.tsa.stattools import adfuller
 
-def compute_log_returns(df):
-    df = df.copy()
-    df["Log_Return"] = np.log(df["Price"]) - np.log(df["Price"].shift(1))
-    return df.dropna()
+# Trading days per year, to annualize daily volatility
+PERIODS_PER_YEAR = 252
+
+
+def _float_array(x):
+    """View `x` as a float array without copying float32 / float64 input."""
+    x = np.asarray(x)
+    return x if x.dtype in (np.float32, np.float64) else x.astype(np.float64)
+
+
+def log_returns(prices, out=None):
+    """
+    Log returns aligned with the prices: out[0] is NaN, out[t] = log(p[t] / p[t-1]).
+
+    Works along the first axis, so a 2-D (dates x assets) panel is handled in one pass.
+
+    Args:
+        prices (array-like): Positive prices, float32 or float64 (others become float64).
+        out (np.ndarray, optional): Destination of the same shape and dtype; may
+            be `prices` itself to overwrite the prices in place.
+
+    Returns:
+        np.ndarray: Log returns in the dtype of the prices.
+    """
+    prices = _float_array(prices)
+    if out is None:
+        out = np.empty_like(prices)
+    if not len(prices):
+        return out
+
+    np.log(prices, out=out)
+    # NumPy buffers the overlapping operands, so the in-place difference is exact
+    np.subtract(out[1:], out[:-1], out=out[1:])
+    out[0] = np.nan
+    return out
+
+
+def compute_log_returns(df, price_col="Price"):
+    """
+    Add log return columns and drop the rows without one.
+
+    Args:
+        df (pd.DataFrame): DataFrame with price columns.
+        price_col (str or list): Price column, giving 'Log_Return', or several
+            columns, giving '<column>_Log_Return' each (computed in one pass).
+
+    Returns:
+        pd.DataFrame: New frame with the log return columns and NA rows dropped.
+    """
+    if isinstance(price_col, str):
+        return df.assign(Log_Return=log_returns(df[price_col].to_numpy())).dropna()
+
+    returns = log_returns(df[list(price_col)].to_numpy(dtype=np.float64))
+    return df.assign(**{f"{col}_Log_Return": returns[:, i] for i, col in enumerate(price_col)}).dropna()
+
+
+def _window_sums(x, window):
+    """
+    Per-window count, sum and sum of squares of the finite values of `x`, in O(n).
+
+    Sums come from float64 prefix sums of x minus its first finite value, which
+    keeps the cancellation in sum(x^2) - sum(x)^2 / n small for series far from
+    zero (prices) as well as for float32 input. Windows are trailing and
+    include the current element; `window=None` gives expanding windows. `x` is
+    2-D (dates x series); every column is handled in the same pass.
+    """
+    valid = np.isfinite(x)
+    first = np.argmax(valid, axis=0)
+    shift = np.where(valid.any(axis=0), x[first, np.arange(x.shape[1])], 0.0)
+    centered = np.where(valid, x - shift, 0.0).astype(np.float64)
+
+    def prefix(values, dtype):
+        out = np.zeros((len(x) + 1, x.shape[1]), dtype=dtype)
+        np.cumsum(values, axis=0, out=out[1:])
+        return out
+
+    c0 = prefix(valid, np.int64)
+    c1 = prefix(centered, np.float64)
+    c2 = prefix(centered * centered, np.float64)
+
+    end = np.arange(1, len(x) + 1)
+    start = np.zeros_like(end) if window is None else np.maximum(end - window, 0)
+    return c0[end] - c0[start], c1[end] - c1[start], c2[end] - c2[start], shift
+
+
+def rolling_mean_std(x, window=None, min_periods=None, ddof=1):
+    """
+    Trailing rolling (or expanding) mean and standard deviation in O(n).
+
+    NaNs are skipped. Windows with fewer than `min_periods` finite values (or
+    `ddof` or fewer, for the std) are NaN. A 2-D `x` is treated as one series
+    per column.
+
+    Args:
+        x (array-like): Series (or dates x series panel), float32 or float64.
+        window (int, optional): Window length; None for expanding statistics.
+        min_periods (int, optional): Defaults to `window` (1 when expanding).
+        ddof (int): Delta degrees of freedom of the std.
+
+    Returns:
+        tuple: (mean, std) arrays shaped like `x`, in its dtype.
+    """
+    x = _float_array(x)
+    if min_periods is None:
+        min_periods = window or 1
+
+    count, s1, s2, shift = _window_sums(x.reshape(len(x), -1), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s1 / count
+        var = np.maximum(s2 - s1 * mean, 0.0) / (count - ddof)
+    mean += shift
+    mean[count < min_periods] = np.nan
+    var[(count < min_periods) | (count <= ddof)] = np.nan
+    mean, std = mean.reshape(x.shape), np.sqrt(var).reshape(x.shape)
+    return mean.astype(x.dtype, copy=False), std.astype(x.dtype, copy=False)
+
+
+def rolling_volatility(returns, window, annualize=False, min_periods=None):
+    """
+    Rolling standard deviation of returns.
+
+    Args:
+        returns (array-like): Returns, e.g. from `log_returns`.
+        window (int): Window length in periods.
+        annualize (bool): Scale by sqrt(PERIODS_PER_YEAR).
+        min_periods (int, optional): See `rolling_mean_std`.
+
+    Returns:
+        np.ndarray: Volatility in the dtype of `returns`.
+    """
+    _, std = rolling_mean_std(returns, window, min_periods=min_periods)
+    if annualize:
+        std *= np.sqrt(PERIODS_PER_YEAR).astype(std.dtype)
+    return std
+
+
+def rolling_zscore(x, window, min_periods=None, out=None):
+    """
+    Distance of each value from its trailing rolling mean, in rolling standard deviations.
+
+    Args:
+        x (array-like): Series.
+        window (int): Window length (the window includes the current value).
+        min_periods (int, optional): See `rolling_mean_std`.
+        out (np.ndarray, optional): Destination; may be `x` itself.
+
+    Returns:
+        np.ndarray: z-scores in the dtype of `x`.
+    """
+    x = _float_array(x)
+    mean, std = rolling_mean_std(x, window, min_periods=min_periods)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.subtract(x, mean, out=out)
+        return np.divide(out, std, out=out)
+
+
+def ewma(x, span=None, alpha=None):
+    """
+    Exponentially weighted mean and variance (adjust=False recursion) in O(n).
+
+    Uses the incremental update m_t = m_{t-1} + alpha (x_t - m_{t-1}),
+    v_t = (1 - alpha) (v_{t-1} + alpha (x_t - m_{t-1})^2), started at the first
+    finite value with zero variance. Both recursions run as first-order linear
+    filters (scipy.signal.lfilter), so there is no Python loop; a 2-D `x` is
+    filtered along its first axis, every column at once. Matches pandas
+    `ewm(adjust=False).mean()` and `.var(bias=True)`.
+
+    Args:
+        x (array-like): Series (or dates x series panel); leading NaNs are
+            skipped, later values must be finite.
+        span (float, optional): alpha = 2 / (span + 1).
+        alpha (float, optional): Smoothing factor in (0, 1]; give this or `span`.
+
+    Returns:
+        tuple: (mean, variance) arrays shaped like `x`, in its dtype.
+    """
+    if (span is None) == (alpha is None):
+        raise ValueError("Pass exactly one of span or alpha")
+    if alpha is None:
+        alpha = 2.0 / (span + 1.0)
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha must be in (0, 1]")
+
+    from scipy.signal import lfilter
+
+    x = _float_array(x)
+    y = x.reshape(len(x), -1).astype(np.float64)
+    if not len(y):
+        return x.copy(), x.copy()
+
+    # Hold each column at its first finite value before it starts: the
+    # recursions then stay at (x_first, 0) until then
+    finite = np.isfinite(y)
+    first = np.where(finite.any(axis=0), np.argmax(finite, axis=0), len(y))
+    leading = np.arange(len(y))[:, np.newaxis] < first
+    if (~finite & ~leading).any():
+        raise ValueError("ewma input must be finite after its first finite value")
+    start = y[np.minimum(first, len(y) - 1), np.arange(y.shape[1])]
+    y[leading] = np.broadcast_to(start, y.shape)[leading]
+
+    decay = 1.0 - alpha
+    m = np.empty_like(y)
+    m[0] = y[0]
+    m[1:], _ = lfilter([alpha], [1.0, -decay], y[1:], axis=0, zi=decay * y[:1])
+
+    v = np.zeros_like(y)
+    increments = decay * alpha * (y[1:] - m[:-1]) ** 2
+    v[1:] = lfilter([1.0], [1.0, -decay], increments, axis=0)
+
+    m[leading] = np.nan
+    v[leading] = np.nan
+    return m.reshape(x.shape).astype(x.dtype, copy=False), v.reshape(x.shape).astype(x.dtype, copy=False)
+
+
+def drawdowns(prices, out=None):
+    """
+    Drawdown from the running peak: prices / max(prices[:t+1]) - 1 (0 at a peak, negative below).
+
+    Works along the first axis, so a 2-D panel gives one drawdown series per column.
+
+    Args:
+        prices (array-like): Positive prices.
+        out (np.ndarray, optional): Destination; may be `prices` itself.
+
+    Returns:
+        tuple: (drawdown, running peak) arrays in the dtype of the prices.
+    """
+    prices = _float_array(prices)
+    peak = np.fmax.accumulate(prices)
+    out = np.divide(prices, peak, out=out)
+    out -= 1
+    return out, peak
+
+
+def compute_features(prices, window=21, span=21, annualize=False):
+    """
+    The rolling feature set of a price series, every array aligned with the prices.
+
+    Args:
+        prices (array-like): Prices in date order, or a 2-D (dates x assets)
+            panel, whose features are computed for every column in one pass.
+        window (int): Rolling window of the volatility and z-score.
+        span (float): Span of the EWMA mean / volatility of the log returns.
+        annualize (bool): Annualize the volatilities.
+
+    Returns:
+        dict: Feature name -> np.ndarray ('log_return', 'volatility', 'zscore',
+            'ewma_mean', 'ewma_volatility', 'drawdown').
+    """
+    prices = _float_array(prices)
+    returns = log_returns(prices)
+    ewma_mean, ewma_var = ewma(returns, span=span)
+    ewma_volatility = np.sqrt(ewma_var, out=ewma_var)
+    if annualize:
+        ewma_volatility *= np.sqrt(PERIODS_PER_YEAR).astype(ewma_volatility.dtype)
+
+    return {
+        "log_return": returns,
+        "volatility": rolling_volatility(returns, window, annualize=annualize),
+        "zscore": rolling_zscore(returns, window),
+        "ewma_mean": ewma_mean,
+        "ewma_volatility": ewma_volatility,
+        "drawdown": drawdowns(prices)[0],
+    }
+
 
 def check_stationarity(series):
+    from statsmodels.tsa.stattools import adfuller
+
     result = adfuller(series.dropna())
     return {
         "ADF Statistic": result[0],
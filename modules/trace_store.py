@@ -0,0 +1,137 @@
+"""
+Chunked, compressed trace files with lazy posterior access.
+
+Traces stay NetCDF4 files with one HDF5 group per InferenceData group, so
+az.from_netcdf still reads them, but every variable is written gzip-compressed
+in chunks of about CHUNK_BYTES (one chain and a block of draws per chunk).
+Readers open only the posterior group and read only the variables they ask
+for, so serving `tau_pos` from a trace never touches the y_obs-sized
+log_likelihood or posterior_predictive groups, and memory does not grow with
+the size of the trace.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import xarray as xr
+
+ENGINE = "h5netcdf"
+
+# Target size of one compressed chunk before compression
+CHUNK_BYTES = 1 << 20
+
+# Groups holding one value per observation and draw, dropped by `strip`
+BULKY_GROUPS = ("log_likelihood", "posterior_predictive", "prior_predictive")
+
+
+def _chunks(shape, itemsize, chunk_bytes=CHUNK_BYTES):
+    """
+    Chunk shape filling about `chunk_bytes`, contiguous in the trailing dimensions.
+
+    Leading dimensions (chain, then draw) get one element per chunk until the
+    trailing ones are exhausted, so a chunk is one chain and a block of draws.
+    """
+    budget = max(1, chunk_bytes // itemsize)
+    chunks = [1] * len(shape)
+    for axis in range(len(shape) - 1, -1, -1):
+        chunks[axis] = int(max(1, min(shape[axis], budget)))
+        budget //= max(1, shape[axis])
+        if budget < 1:
+            break
+    return tuple(chunks)
+
+
+def _encoding(dataset, complevel):
+    encoding = {}
+    for name, variable in dataset.variables.items():
+        if variable.dtype.kind not in "biufc" or variable.size == 0:
+            continue
+        encoding[name] = {
+            "zlib": True,
+            "complevel": complevel,
+            "chunksizes": _chunks(variable.shape, variable.dtype.itemsize),
+        }
+    return encoding
+
+
+def save_trace(trace, path, strip=False, thin=None, groups=None, complevel=4):
+    """
+    Write an InferenceData to a chunked, compressed NetCDF4 file, atomically.
+
+    Args:
+        trace (az.InferenceData): Trace to write.
+        path (str or Path): Destination; replaced only once fully written.
+        strip (bool): Drop the per-observation groups in BULKY_GROUPS.
+        thin (int, optional): Keep every `thin`-th draw.
+        groups (list, optional): Write only these groups.
+        complevel (int): gzip level, 1-9.
+
+    Returns:
+        Path: The written file.
+    """
+    path = Path(path)
+    if thin and thin > 1:
+        trace = trace.sel(draw=slice(None, None, thin))
+
+    names = [
+        group for group in trace.groups()
+        if (groups is None or group in groups) and not (strip and group in BULKY_GROUPS)
+    ]
+
+    tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+    mode = "w"
+    if trace.attrs:
+        xr.Dataset(attrs=trace.attrs).to_netcdf(tmp_path, mode=mode, engine=ENGINE)
+        mode = "a"
+    for group in names:
+        dataset = getattr(trace, group)
+        dataset.to_netcdf(tmp_path, mode=mode, group=group, engine=ENGINE, encoding=_encoding(dataset, complevel))
+        mode = "a"
+    os.replace(tmp_path, path)
+    return path
+
+
+def open_posterior(path, var_names=None):
+    """
+    Open the posterior group of a trace file lazily.
+
+    Nothing is read until a variable's values are accessed, and values are not
+    kept after use. Close the dataset (or use it as a context manager) when done.
+
+    Args:
+        path (str or Path): Trace file written by `save_trace` or az.to_netcdf.
+        var_names (list, optional): Keep only these variables (missing names are ignored).
+
+    Returns:
+        xr.Dataset: Lazy posterior dataset.
+    """
+    dataset = xr.open_dataset(path, group="posterior", engine=ENGINE, cache=False)
+    if var_names is not None:
+        dataset = dataset[[name for name in var_names if name in dataset.data_vars]]
+    return dataset
+
+
+def load_posterior(path, var_names=None):
+    """
+    Read posterior variables of a trace file into memory and close it.
+
+    Args:
+        path (str or Path): Trace file.
+        var_names (list, optional): Variables to read; all by default.
+
+    Returns:
+        xr.Dataset: In-memory dataset holding only the requested variables.
+    """
+    with open_posterior(path, var_names) as dataset:
+        return dataset.load()
+
+
+def group_nbytes(path):
+    """Uncompressed size in bytes of every group of a trace file, from its metadata alone."""
+    import h5netcdf
+
+    sizes = {}
+    with h5netcdf.File(path, "r") as f:
+        for name, group in f.groups.items():
+            sizes[name] = int(sum(np.prod(v.shape) * v.dtype.itemsize for v in group.variables.values()))
+    return sizes
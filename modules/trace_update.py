@@ -0,0 +1,102 @@
+"""
+Refresh the served change point traces after prices are appended.
+
+Each trace in the models directory is extended to the current Brent log
+returns with `change_point_model.update_fit`: when the new days leave the
+posterior where it was, the previous draws are reweighted and no sampler runs;
+otherwise the model is refit warm with a short tuning phase. The trace is
+replaced atomically and its JSON summary recompiled, so the API serves the
+update on its next request.
+
+Traces fitted before fit metadata was recorded cannot be extended; fit them
+again once with the bayesian_* functions.
+
+Usage:
+    python -m modules.trace_update [--models mean trend var] [--models-dir models] [--force]
+"""
+import argparse
+import time
+from pathlib import Path
+
+from modules.change_point_summary import MODEL_DIR, TRACE_FILES, compile_trace_summary
+from modules.config import PRICE_FILE
+from modules.logger import get_logger
+
+logger = get_logger()
+
+
+def update_trace_file(trace_path, data, dates, force=False, random_seed=None, cores=None, strip=False):
+    """
+    Extend the trace at `trace_path` to `data` and rewrite it with its summary.
+
+    Args:
+        trace_path (str or Path): NetCDF trace of one of the bayesian_* functions.
+        data (array-like): The series the trace was fitted on, with new observations appended.
+        dates (array-like): Dates passed to `compile_trace_summary`.
+        force (bool): Refit even when reweighting suffices.
+        random_seed (int, optional): Seed.
+        cores (int, optional): Processes running the NUTS chains.
+        strip (bool): Save the trace without its per-observation groups.
+
+    Returns:
+        dict: 'update' ('reweighted', 'refit' or 'unchanged'), 'pareto_k' and 'seconds'.
+    """
+    import arviz as az
+
+    from modules.change_point_model import update_fit
+    from modules.trace_store import load_posterior, save_trace
+
+    trace_path = Path(trace_path)
+    started = time.perf_counter()
+
+    # The update only needs the posterior draws and their attributes
+    trace = az.InferenceData(posterior=load_posterior(trace_path))
+    new_trace, _ = update_fit(trace, data, force=force, random_seed=random_seed, cores=cores)
+    if new_trace is trace:
+        return {"update": "unchanged", "pareto_k": None, "seconds": time.perf_counter() - started}
+
+    save_trace(new_trace, trace_path, strip=strip)
+    compile_trace_summary(trace_path, dates)
+
+    attrs = new_trace.posterior.attrs
+    return {"update": attrs["update"], "pareto_k": attrs["pareto_k"], "seconds": time.perf_counter() - started}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extend the change point traces to newly appended prices.")
+    parser.add_argument("--prices", default=str(PRICE_FILE))
+    parser.add_argument("--models", nargs="+", default=list(TRACE_FILES), choices=list(TRACE_FILES))
+    parser.add_argument("--models-dir", default=str(MODEL_DIR))
+    parser.add_argument("--force", action="store_true", help="Refit even when reweighting suffices")
+    parser.add_argument("--cores", type=int, default=None)
+    parser.add_argument(
+        "--strip", action="store_true",
+        help="Drop the per-observation groups (log_likelihood, posterior_predictive) from the saved traces",
+    )
+    args = parser.parse_args()
+
+    from modules.data_loader import load_brent_data
+    from modules.time_series_utils import compute_log_returns
+
+    prices = load_brent_data(args.prices)
+    returns = compute_log_returns(prices)["Log_Return"].values
+
+    for model_type in args.models:
+        trace_path = Path(args.models_dir) / TRACE_FILES[model_type]
+        if not trace_path.exists():
+            logger.info(f"Skipping missing trace {trace_path}")
+            continue
+        try:
+            result = update_trace_file(
+                trace_path, returns, prices["Date"], force=args.force, cores=args.cores, strip=args.strip,
+            )
+        except ValueError as e:
+            logger.error(f"Cannot update {trace_path.name}: {e}")
+            continue
+
+        pareto_k = "" if result["pareto_k"] is None else f", Pareto k {result['pareto_k']:.2f}"
+        logger.info(f"{trace_path.name}: {result['update']} in {result['seconds']:.1f}s{pareto_k}")
+
+
+if __name__ == "__main__":
+    main()
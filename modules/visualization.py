@@ -1,62 +1,188 @@
-import matplotlib.pyplot as plt
 import numpy as np
-import scipy.stats as stats
-import arviz as az
 import pandas as pd
+from typing import TYPE_CHECKING
 
+from modules.posterior_utils import change_point_samples, index_counts
+from modules.rendering import DEFAULT_DPI, histogram_from_counts, output, sample_histograms
 
-def plot_price_and_log_returns(df: pd.DataFrame):
-    """
-    Plot Brent Oil Price and its Log Returns.
+if TYPE_CHECKING:
+    import arviz as az
 
-    Args:
-        df (pd.DataFrame): Must contain 'Date', 'Price', and 'Log_Return' columns.
-    """
-    fig, axs = plt.subplots(2, 1, figsize=(14, 6))
+# Every plot below is shown with pyplot when `fmt` is None (the default) and
+# rendered headless to cached PNG / SVG bytes when `fmt` is 'png' or 'svg'
+# (see modules.rendering). The draw_* functions draw into a given Figure from
+# precomputed arrays and are shared by both paths and by /api/plots.
+
+TRACE_VARS = ["tau", "mu_1", "mu_2", "sigma_1", "sigma_2"]
 
-    axs[0].plot(df["Date"], df["Price"], color='navy')
+# Trace panels draw at most this many points per chain
+MAX_TRACE_POINTS = 1000
+
+
+def draw_price_and_log_returns(fig, dates, prices, returns):
+    axs = fig.subplots(2, 1)
+
+    axs[0].plot(dates, prices, color='navy')
     axs[0].set_title("Brent Oil Price")
     axs[0].set_ylabel("Price (USD)")
     axs[0].grid(True)
 
-    axs[1].plot(df["Date"], df["Log_Return"], color='darkgreen')
+    axs[1].plot(dates, returns, color='darkgreen')
     axs[1].set_title("Log Returns")
     axs[1].set_ylabel("Log Return")
     axs[1].grid(True)
 
-    plt.tight_layout()
-    plt.show()
+
+def draw_change_point_histograms(fig, components, dates, bins=50, title="Posterior Distributions of Change Points",
+                                 modes=None):
+    """
+    Draw change point posteriors from index counts, one histogram per component.
+
+    Args:
+        fig (matplotlib.figure.Figure): Figure to draw into.
+        components (list): (label, distinct indices, counts) per change point.
+        dates (array-like): Dates of the series the indices refer to.
+        bins (int): Number of histogram bins.
+        title (str): Axes title.
+        modes (list, optional): Indices to mark; defaults to each component's mode.
+    """
+    ax = fig.subplots()
+    indices = [np.asarray(idx) for _, idx, _ in components if len(idx)]
+    value_range = (min(i.min() for i in indices), max(i.max() for i in indices)) if indices else None
+    dates = pd.DatetimeIndex(dates)
+    alpha = 1.0 if len(components) == 1 else 0.5
+
+    for label, idx, counts in components:
+        if not len(idx):
+            continue
+        hist, edges = histogram_from_counts(idx, counts, bins=bins, value_range=value_range)
+        mode_index = int(idx[np.argmax(counts)])
+        if modes is None:
+            label = f"{label}: {dates[mode_index].date()} (Index {mode_index})"
+            ax.axvline(mode_index, color='black', linestyle='--')
+        ax.stairs(hist, edges, fill=True, alpha=alpha, label=label)
+    for mode_index in modes or []:
+        ax.axvline(mode_index, color='black', linestyle='--')
+
+    ax.set_title(title)
+    ax.set_xlabel("Index")
+    ax.set_ylabel("Frequency")
+    ax.legend()
+    ax.grid(True)
+
+
+def trace_statistics(posterior, var_names, bins=40, max_points=MAX_TRACE_POINTS):
+    """
+    Precompute what a trace plot needs: histograms and thinned draws per variable.
+
+    Args:
+        posterior (xr.Dataset or az.InferenceData): Posterior samples.
+        var_names (list): Variables to summarize.
+        bins (int): Histogram bins per variable.
+        max_points (int): Draws kept per chain for the trace panel.
+
+    Returns:
+        list: Dicts with 'name', 'counts' (components x bins), 'edges', 'draws'
+            (thinned draw numbers) and 'values' (chains x kept draws x components).
+    """
+    posterior = getattr(posterior, "posterior", posterior)
+    stats = []
+    for name in var_names:
+        values = np.asarray(posterior[name].values, dtype=np.float64)
+        chains, draws = values.shape[:2]
+        values = values.reshape(chains, draws, -1)
+
+        # One row of samples per component, chains pooled
+        counts, edges = sample_histograms(values.transpose(2, 0, 1).reshape(values.shape[2], -1), bins=bins)
+        step = max(1, -(-draws // max_points))
+        stats.append({
+            "name": name,
+            "counts": counts,
+            "edges": edges,
+            "draws": np.arange(0, draws, step),
+            "values": values[:, ::step],
+        })
+    return stats
+
+
+def draw_trace(fig, stats):
+    """Draw a trace plot (histogram and draws per variable) from `trace_statistics` output."""
+    fig.set_size_inches(12, 2.5 * len(stats))
+    axs = fig.subplots(len(stats), 2, squeeze=False)
+    for row, stat in zip(axs, stats):
+        hist_ax, trace_ax = row
+        for counts in stat["counts"]:
+            hist_ax.stairs(counts, stat["edges"], alpha=0.7)
+        hist_ax.set_title(stat["name"])
+        hist_ax.set_yticks([])
+
+        for chain in stat["values"]:
+            trace_ax.plot(stat["draws"], chain, linewidth=0.5, alpha=0.7)
+        trace_ax.set_title(stat["name"])
+
+
+def plot_price_and_log_returns(df: pd.DataFrame, fmt=None, dpi=DEFAULT_DPI):
+    """
+    Plot Brent Oil Price and its Log Returns.
+
+    Args:
+        df (pd.DataFrame): Must contain 'Date', 'Price', and 'Log_Return' columns.
+        fmt (str, optional): 'png' or 'svg' to render headless instead of showing.
+        dpi (int): Resolution of PNG renders.
+
+    Returns:
+        bytes or None: The image when `fmt` is set.
+    """
+    columns = df[["Date", "Price", "Log_Return"]]
+    return output(
+        "price_and_log_returns",
+        lambda fig: draw_price_and_log_returns(fig, columns["Date"], columns["Price"], columns["Log_Return"]),
+        key=(columns,), fmt=fmt, figsize=(14, 6), dpi=dpi,
+    )
 
 
-def plot_trace_summary(trace: az.InferenceData):
+def plot_trace_summary(trace: "az.InferenceData", var_names=None, fmt=None, dpi=DEFAULT_DPI):
     """
     Plot trace and posterior summaries for key parameters.
 
     Args:
         trace (az.InferenceData): MCMC samples from PyMC.
-    
+        var_names (list, optional): Variables to plot; defaults to those of
+            TRACE_VARS in the trace, else every posterior variable.
+        fmt (str, optional): 'png' or 'svg' to render headless instead of showing.
+        dpi (int): Resolution of PNG renders.
+
     Returns:
-        az.Summary: Posterior summary statistics.
+        az.Summary: Posterior summary statistics, or the image (bytes) when `fmt` is set.
     """
+    import arviz as az
+
     if not isinstance(trace, az.InferenceData):
         raise TypeError("Expected ArviZ InferenceData. Use `return_inferencedata=True` in pm.sample().")
 
     available_vars = list(trace.posterior.data_vars)
-    expected_vars = ["tau", "mu_1", "mu_2", "sigma_1", "sigma_2"]
-    present_vars = [v for v in expected_vars if v in available_vars]
+    if var_names is None:
+        present_vars = [v for v in TRACE_VARS if v in available_vars] or available_vars
+    else:
+        present_vars = [v for v in var_names if v in available_vars]
 
     if not present_vars:
-        raise ValueError(f"No expected variables found in trace: {expected_vars}")
+        raise ValueError(f"No expected variables found in trace: {var_names or TRACE_VARS}")
 
-    az.plot_trace(trace, var_names=present_vars)
-    plt.tight_layout()
-    plt.show()
+    image = output(
+        "trace",
+        lambda fig: draw_trace(fig, trace_statistics(trace, present_vars)),
+        key=(trace, present_vars), fmt=fmt, dpi=dpi,
+    )
+    if fmt is not None:
+        return image
 
     summary = az.summary(trace, var_names=present_vars)
     print(summary)
     return summary
 
-def plot_tau_posterior(trace: az.InferenceData, dates: pd.Series, var_name="tau") -> pd.Timestamp:
+
+def plot_tau_posterior(trace: "az.InferenceData", dates: pd.Series, var_name="tau", fmt=None, dpi=DEFAULT_DPI):
     """
     Plot the posterior distribution of change point variable and return most likely date.
 
@@ -64,59 +190,63 @@ def plot_tau_posterior(trace: az.InferenceData, dates: pd.Series, var_name="tau"
         trace (az.InferenceData): Posterior samples from PyMC.
         dates (pd.Series): Date series corresponding to the time series index.
         var_name (str): Name of the change point variable in the trace (default 'tau').
+        fmt (str, optional): 'png' or 'svg' to render headless instead of showing.
+        dpi (int): Resolution of PNG renders.
 
     Returns:
-        pd.Timestamp: The most probable change point date.
+        pd.Timestamp: The most probable change point date, or the image (bytes) when `fmt` is set.
     """
     if var_name not in trace.posterior.data_vars:
         raise ValueError(f"Variable '{var_name}' not found in trace.posterior")
 
-    cp_samples = trace.posterior[var_name].values.flatten()
-
-    plt.figure(figsize=(10, 4))
-    plt.hist(cp_samples, bins=50, color='skyblue', edgecolor='k')
-
-    mode_cp = stats.mode(cp_samples, keepdims=True).mode[0]
-    plt.axvline(mode_cp, color='red', linestyle='--', label=f"Most Likely {var_name} (Index {mode_cp})")
-
-    plt.legend()
-    plt.title(f"Posterior Distribution of Change Point '{var_name}'")
-    plt.xlabel("Index")
-    plt.ylabel("Frequency")
-    plt.grid(True)
-    plt.show()
-
-    return dates.iloc[int(mode_cp)]
-
-
-def plot_multiple_change_points(trace: az.InferenceData, dates: pd.Series, param="tau"):
+    samples = trace.posterior[var_name].values
+    samples = samples.reshape(samples.shape[0], samples.shape[1], -1)
+    # All components pooled, one bincount instead of flattening and scipy.stats.mode
+    counts = index_counts(samples, len(dates)).sum(axis=0)
+    indices = np.flatnonzero(counts)
+    mode_cp = int(np.argmax(counts))
+
+    image = output(
+        "tau_posterior",
+        lambda fig: draw_change_point_histograms(
+            fig, [(f"Most Likely {var_name}", indices, counts[indices])], dates,
+            title=f"Posterior Distribution of Change Point '{var_name}'",
+        ),
+        key=(np.asarray(dates), indices, counts[indices], var_name), fmt=fmt, dpi=dpi,
+    )
+    return image if fmt is not None else dates.iloc[mode_cp]
+
+
+def plot_multiple_change_points(trace: "az.InferenceData", dates: pd.Series, param="tau", fmt=None, dpi=DEFAULT_DPI):
     """
     Visualize posterior distributions of multiple change points.
 
     Args:
         trace (az.InferenceData): Posterior samples.
         dates (pd.Series): Date index for time series.
-        param (str): Change point parameter, e.g. 'tau', 'tau_0', 'tau_1', etc.
-    """
-    tau_vars = [v for v in trace.posterior.data_vars if "tau" in v]
-
-    if not tau_vars:
-        raise ValueError("No τ (change point) variables found in trace.")
+        param (str): Change point parameter ('tau', 'tau_pos' or 'cp'); the
+            trace's change point variable is used if it is missing.
+        fmt (str, optional): 'png' or 'svg' to render headless instead of showing.
+        dpi (int): Resolution of PNG renders.
 
-    plt.figure(figsize=(12, 6))
-
-    for i, var in enumerate(tau_vars):
-        tau_values = trace.posterior[var].values.flatten()
-        mode_index = stats.mode(tau_values, keepdims=True).mode[0]
-        mode_date = dates.iloc[int(mode_index)]
-
-        plt.hist(tau_values, bins=50, alpha=0.5, label=f"{var}: {mode_date.date()}")
-        plt.axvline(mode_index, color='black', linestyle='--')
-
-    plt.title("Posterior Distributions of Change Points")
-    plt.xlabel("Index")
-    plt.ylabel("Frequency")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+    Returns:
+        bytes or None: The image when `fmt` is set.
+    """
+    if param in trace.posterior.data_vars:
+        samples = trace.posterior[param].values
+        cp_key, samples = param, samples.reshape(samples.shape[0], samples.shape[1], -1)
+    else:
+        cp_key, samples = change_point_samples(trace)
+
+    counts = index_counts(samples, len(dates))
+    components = []
+    for i, row in enumerate(counts):
+        indices = np.flatnonzero(row)
+        label = cp_key if len(counts) == 1 else f"{cp_key}[{i}]"
+        components.append((label, indices, row[indices]))
+
+    return output(
+        "change_points",
+        lambda fig: draw_change_point_histograms(fig, components, dates),
+        key=(np.asarray(dates), components), fmt=fmt, figsize=(12, 6), dpi=dpi,
+    )
@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+import pytest
+
+from modules import batch_fitting
+from modules.batch_fitting import BLAS_THREAD_VARS, make_jobs, run_batch
+
+
+def test_workers_import_numpy_with_single_threaded_blas(monkeypatch):
+    monkeypatch.setenv("OMP_NUM_THREADS", "8")
+    monkeypatch.delenv("MKL_NUM_THREADS", raising=False)
+
+    with batch_fitting._worker_pool(1) as pool:
+        worker_env = {var: pool.submit(os.getenv, var).result() for var in BLAS_THREAD_VARS}
+
+    assert worker_env == dict.fromkeys(BLAS_THREAD_VARS, "1")
+    # The parent's own settings are restored
+    assert os.environ["OMP_NUM_THREADS"] == "8"
+    assert "MKL_NUM_THREADS" not in os.environ
+
+
+def test_run_batch_writes_traces_and_resumes(tmp_path):
+    rng = np.random.default_rng(0)
+    y = np.concatenate([rng.normal(0, 0.5, 40), rng.normal(0, 3.0, 40)])
+    jobs = make_jobs({"synthetic": y}, ["var"], inference="map", marginalized=True, random_seed=0)
+
+    report = run_batch(jobs, out_dir=tmp_path, total_cores=1)
+    assert list(report["status"]) == ["done"], report.get("error")
+    assert (tmp_path / f"{jobs[0]['job_id']}.nc").exists()
+
+    assert run_batch(jobs, out_dir=tmp_path, total_cores=1).empty
+    with pytest.raises(ValueError):
+        make_jobs({"synthetic": y}, ["var"], inference="slice")
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from modules.change_point_model import (
+    bayesian_mean_shift_flexible, bayesian_trend_change_model, bayesian_variance_shift_model,
+)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.mark.parametrize("inference", ["map", "advi"])
+def test_mean_shift_rejects_gradient_free_inference(rng, inference):
+    # The rounded change points pass no gradient, so these would return their start
+    with pytest.raises(ValueError, match="nuts"):
+        bayesian_mean_shift_flexible(rng.normal(size=100), max_cp=1, inference=inference)
+
+
+def test_batch_and_background_fits_reject_mean_shift_map(rng):
+    from modules.batch_fitting import make_jobs
+    from modules.fit_jobs import normalize_options
+
+    with pytest.raises(ValueError, match="mean"):
+        make_jobs({"s": rng.normal(size=100)}, ["trend", "mean"], inference="map")
+    with pytest.raises(ValueError, match="mean"):
+        normalize_options("mean", {"inference": "advi"})
+    assert normalize_options("var", {"inference": "map"})["inference"] == "map"
+
+
+def test_trend_change_map(rng):
+    x = np.arange(200.0)
+    y = np.where(x < 120, 0.05 * x, 6.0 - 0.1 * (x - 120)) + rng.normal(0.0, 0.3, 200)
+    trace, _ = bayesian_trend_change_model(y, inference="map", random_seed=1)
+    posterior = trace.posterior
+
+    assert posterior["cp"].shape == (1, 1000)
+    assert float(posterior["cp"].median()) == pytest.approx(120, abs=5)
+    assert float(posterior["a1"].mean()) == pytest.approx(0.05, abs=0.01)
+    assert float(posterior["a2"].mean()) == pytest.approx(-0.1, abs=0.02)
+    assert float(posterior["sigma"].mean()) == pytest.approx(0.3, abs=0.05)
+
+
+def test_variance_shift_map(rng):
+    y = np.concatenate([rng.normal(0.0, 0.5, 120), rng.normal(0.0, 3.0, 80)])
+    trace, _ = bayesian_variance_shift_model(y, inference="map", random_seed=1)
+    posterior = trace.posterior
+
+    assert posterior["cp"].shape == (1, 1000)
+    assert float(posterior["cp"].median()) == pytest.approx(120, abs=5)
+    assert float(posterior["sigma1"].mean()) == pytest.approx(0.5, rel=0.2)
+    assert float(posterior["sigma2"].mean()) == pytest.approx(3.0, rel=0.2)
+
+
+def test_unknown_inference_is_rejected(rng):
+    with pytest.raises(ValueError):
+        bayesian_variance_shift_model(rng.normal(size=50), inference="sgd")
+
+
+def test_initvals_place_the_mean_shift_change_points(rng):
+    from modules.change_point_model import build_mean_shift_model, change_point_initvals
+
+    y = np.concatenate([rng.normal(0.0, 1.0, 100), rng.normal(4.0, 1.0, 80), rng.normal(-2.0, 1.0, 120)])
+    initvals = change_point_initvals("mean", y, max_cp=4, min_dist=5)
+
+    model = build_mean_shift_model(y, max_cp=4, min_dist=5)
+    (tau_pos,) = model.replace_rvs_by_values([model["tau_pos"]])
+    tau_pos = model.compile_fn(tau_pos, inputs=[model.rvs_to_values[model["delta_tau"]]])
+    positions = tau_pos({"delta_tau_log__": np.log(initvals["delta_tau"])})
+    # The last index of each segment; the last change point is fixed at n - min_dist
+    np.testing.assert_array_equal(positions[:2], [99, 179])
+    assert positions[-1] == len(y) - 5
+    assert (np.diff(positions) > 0).all()
+
+
+def test_initvals_of_the_single_change_point_models(rng):
+    from modules.change_point_model import change_point_initvals
+
+    y = np.concatenate([rng.normal(0.0, 0.5, 120), rng.normal(0.0, 3.0, 80)])
+    assert change_point_initvals("var", y)["cp"] == pytest.approx(120, abs=3)
+    assert change_point_initvals("var", y, change_points=[2])["cp"] == 10
+    with pytest.raises(ValueError):
+        change_point_initvals("slope", y)
@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from modules.change_point_summary import summary_path
+from routes import change_points
+from utils import loader
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    """A models directory holding a copy of the mean trace and no summaries."""
+    shutil.copy(os.path.join(change_points.MODEL_DIR, "trace_mean.nc"), tmp_path / "trace_mean.nc")
+    monkeypatch.setattr(change_points, "MODEL_DIR", str(tmp_path))
+    for type, filename in change_points.TRACE_FILES.items():
+        loader.registry.register(f"cp_{type}", str(summary_path(tmp_path / filename)), change_points._load_json)
+    yield tmp_path
+    for type, filename in change_points.TRACE_FILES.items():
+        path = summary_path(os.path.join(change_points.MODEL_DIR, filename))
+        loader.registry.register(f"cp_{type}", str(path), change_points._load_json)
+
+
+@pytest.fixture
+def client(model_dir):
+    from app import app
+
+    return app.test_client()
+
+
+def test_missing_summary_is_compiled(client, model_dir):
+    response = client.get("/api/change_points/mean")
+    assert response.status_code == 200
+
+    sidecar = summary_path(model_dir / "trace_mean.nc")
+    with open(sidecar) as f:
+        summary = json.load(f)
+    assert summary["n_dates"] == len(loader.get_prices())
+    assert response.get_json()["change_points"] == summary["dates"]
+    assert response.get_json()["summary"] == summary["change_points"]
+
+
+def test_stale_summary_is_recompiled(client, model_dir):
+    trace = model_dir / "trace_mean.nc"
+    client.get("/api/change_points/mean")
+    sidecar = summary_path(trace)
+    compiled = os.stat(sidecar).st_mtime_ns
+
+    stat = os.stat(trace)
+    os.utime(trace, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert client.get("/api/change_points/mean").status_code == 200
+    with open(sidecar) as f:
+        assert json.load(f)["source_signature"][0] == stat.st_mtime_ns + 10**9
+    assert os.stat(sidecar).st_mtime_ns != compiled
+
+
+def test_missing_trace_is_404(client):
+    response = client.get("/api/change_points/trend")
+    assert response.status_code == 404
+    assert "trace" in response.get_json()["error"]
+
+
+def test_unknown_type_is_400(client):
+    assert client.get("/api/change_points/slope").status_code == 400
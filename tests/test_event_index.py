@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.event_index import EventIndex
+
+
+@pytest.fixture
+def events():
+    return pd.DataFrame({
+        "Event": ["c", "a", "bad", "b1", "b2", "d"],
+        "Start_Date": ["2005-01-11", "2005-01-01", "not a date", "2005-01-06", "2005-01-06", "2006-01-01"],
+        "Type": ["War", "Policy", "War", "Economic", "War", "Policy"],
+        "Region": ["ME", "US", "US", "EU", "ME", "US"],
+    })
+
+
+def scan_nearest(index, date):
+    """The reference: idxmin of the distance over the sorted table."""
+    return int(np.abs(index.events["Start_Date"] - pd.Timestamp(date)).idxmin())
+
+
+def test_events_are_sorted_and_unparsed_dates_dropped(events):
+    index = EventIndex(events)
+    assert list(index.events["Event"]) == ["a", "b1", "b2", "c", "d"]
+    assert index.dates.dtype == np.dtype("datetime64[ns]")
+
+
+def test_nearest_matches_a_scan(events):
+    index = EventIndex(events)
+    queries = pd.date_range("2004-06-01", "2006-06-01", freq="D")
+    expected = [scan_nearest(index, date) for date in queries]
+    np.testing.assert_array_equal(index.nearest(queries), expected)
+
+
+def test_nearest_ties(events):
+    index = EventIndex(events)
+    # Halfway between two events goes to the earlier one ...
+    halfway = ["2005-01-03 12:00", "2005-01-08 12:00"]
+    assert list(index.events["Event"][index.nearest(halfway)]) == ["a", "b1"]
+    # ... and among events on the same date to the first
+    assert list(index.events["Event"][index.nearest(["2005-01-06", "2005-01-07"])]) == ["b1", "b1"]
+
+
+def test_nearest_out_of_range(events):
+    index = EventIndex(events)
+    positions = index.nearest(["1990-01-01", "2030-01-01"])
+    assert list(index.events["Event"][positions]) == ["a", "d"]
+
+
+def test_nearest_of_no_dates_and_of_no_events(events):
+    index = EventIndex(events)
+    assert len(index.nearest([])) == 0
+    with pytest.raises(ValueError, match="empty"):
+        index.filter(types="Sports").nearest(["2005-01-01"])
+
+
+def test_filter_and_within(events):
+    index = EventIndex(events)
+    war = index.filter(types="War", regions=["ME", "EU"])
+    assert list(war.events["Event"]) == ["b2", "c"]
+    assert war.events["Event"][war.nearest("2005-01-01")[0]] == "b2"
+
+    lo, hi = index.within(["2005-01-06", "2005-06-01"], days=5)
+    assert list(index.events["Event"][lo[0]:hi[0]]) == ["a", "b1", "b2", "c"]
+    assert lo[1] == hi[1]
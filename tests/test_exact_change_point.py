@@ -0,0 +1,52 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from modules.exact_change_point import SegmentCost, binary_segmentation, detect_change_points, pelt
+
+
+def brute_force(cost, penalty, min_dist):
+    """Penalized optimum over every segmentation with segments of at least min_dist."""
+    n = cost.n
+    best, best_cps = cost.cost(0, n), ()
+    for k in range(1, n // min_dist):
+        for cps in itertools.combinations(range(min_dist, n - min_dist + 1), k):
+            bounds = (0,) + cps + (n,)
+            if min(np.diff(bounds)) < min_dist:
+                continue
+            total = cost.cost(np.array(bounds[:-1]), np.array(bounds[1:])).sum() + penalty * k
+            if total < best - 1e-9:
+                best, best_cps = total, cps
+    return best_cps
+
+
+@pytest.mark.parametrize("model", ["mean", "var", "meanvar", "linear"])
+@pytest.mark.parametrize("seed", range(4))
+def test_pelt_matches_brute_force(model, seed):
+    rng = np.random.default_rng(seed)
+    x = np.concatenate([
+        rng.normal(0.0, 1.0, 8),
+        rng.normal(3.0, 0.3, 6),
+        rng.normal(-1.0, 2.0, 8),
+    ])
+    cost = SegmentCost(x, model)
+    for penalty in (2.0, 6.0):
+        expected = brute_force(cost, penalty, min_dist=3)
+        np.testing.assert_array_equal(pelt(cost, penalty, min_dist=3), expected)
+
+
+def test_pelt_short_series_has_no_change_points():
+    assert len(pelt(SegmentCost(np.arange(5.0)), penalty=1.0, min_dist=3)) == 0
+
+
+def test_detect_mean_shift():
+    rng = np.random.default_rng(0)
+    x = np.concatenate([rng.normal(0.0, 1.0, 200), rng.normal(5.0, 1.0, 200)])
+    for method in ("pelt", "binseg"):
+        assert list(detect_change_points(x, model="mean", method=method)) == [200]
+
+
+def test_binary_segmentation_n_bkps():
+    x = np.repeat([0.0, 4.0, -4.0], 50) + np.random.default_rng(1).normal(0.0, 0.5, 150)
+    assert list(binary_segmentation(SegmentCost(x), n_bkps=2)) == [50, 100]
@@ -0,0 +1,28 @@
+import pytest
+
+
+@pytest.fixture
+def client():
+    from app import app
+
+    return app.test_client()
+
+
+@pytest.mark.parametrize("query", [
+    "window=abc", "window=1", "window=-5", "window=2.5", "window=10001",
+    "span=abc", "span=0", "span=-1", "span=nan", "span=inf",
+    "features=price",
+])
+def test_invalid_arguments_are_400(client, query):
+    response = client.get(f"/api/features?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_window_and_span_are_applied(client):
+    short = client.get("/api/features?format=columnar&window=5&span=2.5&features=volatility,ewma_mean")
+    default = client.get("/api/features?format=columnar&features=volatility,ewma_mean")
+    assert short.status_code == default.status_code == 200
+    short, default = short.get_json(), default.get_json()
+    assert short["volatility"] != default["volatility"]
+    assert short["ewma_mean"] != default["ewma_mean"]
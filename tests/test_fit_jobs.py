@@ -0,0 +1,149 @@
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from modules import fit_jobs
+from modules.fit_jobs import FitManager, JobStore, job_key, normalize_options
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..", "backend")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(tmp_path / "jobs.sqlite")
+
+
+def add_job(store, seed=0, n=50):
+    values = np.random.default_rng(seed).normal(size=n)
+    dates = np.datetime64("2020-01-01") + np.arange(n)
+    options = normalize_options("var", {"inference": "map"})
+    job_id = job_key("var", options, values)
+    return store.add(job_id, "var", options, values, dates)
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_store_keeps_one_job_per_request(store):
+    job, created = add_job(store)
+    assert created and job["status"] == "queued" and job["n_observations"] == 50
+    assert job["start_date"] == "2020-01-01" and job["end_date"] == "2020-02-19"
+
+    again, created = add_job(store)
+    assert not created and again["id"] == job["id"]
+
+    values, dates = store.load_data(job["id"])
+    np.testing.assert_array_equal(values, np.random.default_rng(0).normal(size=50))
+    assert dates[0] == np.datetime64("2020-01-01")
+
+
+def test_store_claims_a_job_once_and_requeues_failures(store):
+    job, _ = add_job(store)
+    other, _ = add_job(store, seed=1)
+    assert store.queue_position(other["id"]) == 1
+
+    assert store.claim(job["id"], os.getpid())
+    assert not store.claim(job["id"], os.getpid())
+    assert store.get(job["id"])["status"] == "running"
+    assert store.queue_position(other["id"]) == 0
+
+    store.update(job["id"], status="failed", error="boom")
+    _, created = add_job(store)
+    assert created
+    assert store.get(job["id"])["status"] == "queued"
+    assert store.get(job["id"])["error"] is None
+
+    with pytest.raises(ValueError):
+        store.update(job["id"], data=b"")
+
+
+def test_orphaned_jobs_are_requeued(store):
+    live, _ = add_job(store)
+    dead, _ = add_job(store, seed=1)
+    store.claim(live["id"], os.getpid())
+    store.claim(dead["id"], dead_pid())
+
+    assert store.requeue_orphans() == [dead["id"]]
+    assert store.get(live["id"])["status"] == "running"
+    assert store.get(dead["id"])["status"] == "queued"
+
+
+@pytest.mark.skipif(fit_jobs._process_start(os.getpid()) is None, reason="needs /proc")
+def test_a_reused_pid_does_not_keep_a_job_running(store):
+    job, _ = add_job(store)
+    store.claim(job["id"], os.getpid())
+    # The job's worker was an earlier process that had this pid
+    store.update(job["id"], pid_start="earlier-boot:1")
+
+    assert store.requeue_orphans() == [job["id"]]
+
+
+def test_options_are_validated():
+    assert normalize_options("trend", {"marginalized": "true", "random_seed": "3"}) == {
+        "inference": "nuts", "marginalized": True, "random_seed": 3,
+    }
+    for model_type, options in [
+        ("nope", {}), ("var", {"max_cp": 2}), ("var", {"inference": "slice"}),
+        ("mean", {"max_cp": 50}), ("mean", {"min_dist": "x"}),
+    ]:
+        with pytest.raises(ValueError):
+            normalize_options(model_type, options)
+
+
+def test_spawned_workers_do_not_build_the_app():
+    # A spawn worker runs the parent's main script as __mp_main__
+    code = (
+        "import runpy, sys\n"
+        f"namespace = runpy.run_path({os.path.join(BACKEND_DIR, 'app.py')!r}, run_name='__mp_main__')\n"
+        "assert 'app' not in namespace\n"
+        "assert not any(name.startswith(('routes', 'flask')) for name in sys.modules)\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=BACKEND_DIR)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    from app import app
+    from routes import fits
+
+    manager = FitManager(out_dir=tmp_path, workers=1)
+    monkeypatch.setattr(fits, "_manager", manager)
+    yield app.test_client()
+    manager.shutdown()
+
+
+def test_fit_route_runs_a_job(client):
+    body = {"model_type": "var", "inference": "map", "start_date": "2020-01-01", "end_date": "2020-06-30"}
+    response = client.post("/api/fits", json=body)
+    assert response.status_code == 202
+    job_id = response.get_json()["id"]
+    assert response.headers["Location"] == f"/api/fits/{job_id}"
+
+    deadline = time.monotonic() + 180
+    while True:
+        job = client.get(f"/api/fits/{job_id}").get_json()
+        if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+            break
+        time.sleep(0.5)
+
+    assert job["status"] == "done", job["error"]
+    assert job["progress"] == 1.0
+    assert job["result"]["change_points"]
+    # The same request is answered from the finished job
+    again = client.post("/api/fits", json=body)
+    assert again.status_code == 200 and again.get_json()["id"] == job_id
+
+
+def test_fit_route_rejects_invalid_requests(client):
+    assert client.post("/api/fits", json={}).status_code == 400
+    assert client.post("/api/fits", json={"model_type": "mean", "inference": "map"}).status_code == 400
+    assert client.post("/api/fits", json={"model_type": "var", "start_date": "2020-01-01",
+                                          "end_date": "2020-01-05"}).status_code == 400
+    assert client.get("/api/fits/unknown").status_code == 404
@@ -0,0 +1,99 @@
+import os
+
+import pytest
+from flask import Flask, jsonify
+
+from utils import http_cache
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "prices.csv"
+    path.write_text("Date,Price\n")
+    return path
+
+
+@pytest.fixture
+def app(source):
+    app = Flask(__name__)
+    http_cache.init_app(app)
+    app.calls = 0
+
+    @app.route("/data")
+    @http_cache.cacheable(lambda: [source])
+    def data():
+        app.calls += 1
+        return jsonify({"calls": app.calls})
+
+    @app.route("/missing")
+    @http_cache.cacheable(lambda: None)
+    def missing():
+        app.calls += 1
+        return jsonify({"calls": app.calls})
+
+    return app
+
+
+def test_revalidation_returns_304_without_running_the_view(app):
+    client = app.test_client()
+    first = client.get("/data")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == http_cache.CACHE_CONTROL
+
+    second = client.get("/data", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert second.get_data() == b""
+    assert app.calls == 1
+
+
+def test_body_cache_serves_repeat_requests(app):
+    client = app.test_client()
+    assert client.get("/data").get_json() == {"calls": 1}
+    assert client.get("/data").get_json() == {"calls": 1}
+    assert app.calls == 1
+
+
+def test_source_change_invalidates(app, source):
+    client = app.test_client()
+    etag = client.get("/data").headers["ETag"]
+
+    source.write_text("Date,Price\n2020-01-01,1.0\n")
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    response = client.get("/data", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json() == {"calls": 2}
+
+
+def test_token_varies_on_query_and_accept(app):
+    client = app.test_client()
+    etags = {
+        client.get("/data").headers["ETag"],
+        client.get("/data?format=columnar").headers["ETag"],
+        client.get("/data", headers={"Accept-Encoding": "gzip"}).headers["ETag"],
+    }
+    assert len(etags) == 3
+
+
+def test_uncacheable_requests_pass_through(app):
+    client = app.test_client()
+    assert client.get("/missing").get_json() == {"calls": 1}
+    assert client.get("/missing").get_json() == {"calls": 2}
+    assert "ETag" not in client.get("/missing").headers
+
+
+def test_response_cache_is_bounded():
+    cache = http_cache.ResponseCache(max_entries=2, max_bytes=10)
+    cache.put("a", b"1234", 200, [])
+    cache.put("b", b"1234", 200, [])
+    cache.get("a")
+    cache.put("c", b"1234", 200, [])
+    assert cache.get("b") is None and cache.get("a") is not None
+    cache.put("d", b"12345678", 200, [])
+    assert cache.get("a") is None and cache.get("c") is None
+    cache.put("e", b"x" * 11, 200, [])
+    assert cache.get("e") is None
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+from benchmarks.bench_import_time import ENTRY_POINTS, HEAVY, import_profile
+
+# Budgets are for a quiet machine; scale them on slow or shared CI runners
+BUDGET_SCALE = float(os.environ.get("IMPORT_BUDGET_SCALE", 1.0))
+
+CHECKED = [name for name, (_, _, budget) in ENTRY_POINTS.items() if budget is not None]
+
+
+@pytest.mark.parametrize("name", CHECKED)
+def test_entry_point_imports_no_heavy_package_within_budget(name):
+    cwd, module, budget = ENTRY_POINTS[name]
+    # The first import also writes .pyc files; keep the faster run
+    runs = [import_profile(cwd, module) for _ in range(2)]
+
+    heavy = sorted({imported.split(".")[0] for imported in runs[0][1]} & set(HEAVY))
+    assert not heavy, f"{name} imports {', '.join(heavy)} at start-up"
+    seconds = min(run[0] for run in runs)
+    assert seconds <= budget * BUDGET_SCALE, f"{name} took {seconds:.3f}s, over its {budget * BUDGET_SCALE:.2f}s budget"
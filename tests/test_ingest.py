@@ -0,0 +1,88 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules import ingest
+from modules.event_collector import load_key_events
+from modules.ingest import cache_path, is_current, load_dataset, parse_csv
+from modules.logger import get_logger
+
+EVENTS_CSV = """Event,Start_Date,Region,Type,Notes
+Embargo,06/01/2005,ME,Economic,n
+,07/02/2006,US,Policy,x
+Bad date,not a date,US,Policy,x
+Sanctions,01/15/2001,EU,War,
+"""
+
+
+def test_load_key_events_infers_dates_and_keeps_unnamed_events(tmp_path):
+    source = tmp_path / "key_events.csv"
+    source.write_text(EVENTS_CSV)
+
+    df = load_key_events(str(source))
+    assert list(df["Start_Date"]) == list(pd.to_datetime(["2001-01-15", "2005-06-01", "2006-07-02"]))
+    assert list(df["Event"].fillna("")) == ["Sanctions", "Embargo", ""]
+    assert df["Notes"].isna().tolist() == [True, False, False]
+    assert is_current(cache_path(source), source, "events")
+
+
+def test_cache_matches_csv_parse(tmp_path):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2000-01-03", periods=500)[::-1]
+    source = tmp_path / "prices.csv"
+    pd.DataFrame({"Date": dates.strftime("%d-%b-%y"), "Price": rng.uniform(10, 100, 500).round(2)}).to_csv(
+        source, index=False
+    )
+
+    cached = load_dataset("prices", source, chunk_rows=64)
+    parsed = parse_csv("prices", source, chunk_rows=64)
+    assert cached["date"].is_monotonic_increasing
+    pd.testing.assert_frame_equal(cached, parsed, check_dtype=False)
+
+
+def test_invalid_prices_are_dropped_and_logged(tmp_path, caplog):
+    source = tmp_path / "prices.csv"
+    source.write_text(
+        "Date,Price\n"
+        "02-Jan-20,66.25\n"
+        "03-Jan-20,-1.5\n"
+        "06-Jan-20,0\n"
+        "07-Jan-20,\n"
+        "not a date,68.0\n"
+        "08-Jan-20,65.4\n"
+    )
+
+    with caplog.at_level(logging.WARNING, logger=get_logger().name):
+        df = load_dataset("prices", source)
+    assert list(df["price"]) == [66.25, 65.4]
+    message = " ".join(record.getMessage() for record in caplog.records)
+    assert "Dropped 4 invalid rows" in message
+    assert "2 price <= 0" in message
+    assert "1 missing or non-numeric price" in message
+    assert "1 unparsed date" in message
+
+
+def test_concurrent_first_loads_build_one_cache(tmp_path, monkeypatch):
+    source = tmp_path / "prices.csv"
+    dates = pd.bdate_range("2000-01-03", periods=2000)
+    prices = np.linspace(10, 100, 2000).round(2)
+    pd.DataFrame({"Date": dates.strftime("%d-%b-%y"), "Price": prices}).to_csv(source, index=False)
+
+    builds = []
+    original = ingest.ingest
+
+    def counting_ingest(*args, **kwargs):
+        builds.append(threading.get_ident())
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(ingest, "ingest", counting_ingest)
+    with ThreadPoolExecutor(8) as pool:
+        frames = list(pool.map(lambda _: load_dataset("prices", source, chunk_rows=100), range(8)))
+
+    assert len(builds) == 1
+    for df in frames:
+        np.testing.assert_array_equal(df["price"], prices)
+    assert [path.name for path in cache_path(source).parent.iterdir()] == [cache_path(source).name]
@@ -0,0 +1,91 @@
+import arviz as az
+import numpy as np
+import pytest
+from scipy.special import logsumexp, softmax
+
+from modules.change_point_model import (
+    CP_MARGIN,
+    _trend_pointwise_loglik,
+    _variance_pointwise_loglik,
+    build_trend_change_model,
+    build_variance_shift_model,
+    recover_change_point,
+)
+
+N = 60
+CANDIDATES = np.arange(CP_MARGIN, N - CP_MARGIN + 1)
+
+# name: (model builder, pointwise log-likelihood, draws of the continuous parameters)
+MODELS = {
+    "trend": (
+        build_trend_change_model,
+        _trend_pointwise_loglik,
+        {
+            "a1": [0.0, 0.01], "b1": [0.2, 0.0], "a2": [0.01, 0.0],
+            "b2": [0.5, 0.6], "sigma": [1.5, 1.8],
+        },
+    ),
+    "var": (
+        build_variance_shift_model,
+        _variance_pointwise_loglik,
+        {"mu": [0.0, 0.2], "sigma1": [0.5, 1.0], "sigma2": [2.0, 1.5]},
+    ),
+}
+
+
+@pytest.fixture
+def y():
+    rng = np.random.default_rng(0)
+    return np.concatenate([rng.normal(0, 0.5, 30), rng.normal(1, 2.0, N - 30)])
+
+
+def value_point(model, params, cp=None):
+    """Values of the model's free variables (log-transformed scales) for one parameter draw."""
+    point = {}
+    for name in model.initial_point():
+        base = name.removesuffix("_log__")
+        value = cp if base == "cp" else params[base]
+        point[name] = np.log(value) if name.endswith("_log__") else np.asarray(value)
+    return point
+
+
+def discrete_logps(model, params):
+    """The discrete model's joint logp at every change point, parameters fixed."""
+    logp = model.compile_logp()
+    return np.array([logp(value_point(model, params, cp)) for cp in CANDIDATES])
+
+
+@pytest.mark.parametrize("model_type", list(MODELS))
+def test_marginalized_logp_sums_the_discrete_model_over_cp(y, model_type):
+    build, _, draws = MODELS[model_type]
+    discrete, marginalized = build(y), build(y, marginalized=True)
+    logp = marginalized.compile_logp()
+
+    for i in range(2):
+        params = {name: values[i] for name, values in draws.items()}
+        # The uniform prior of the discrete cp is the marginalized model's -log(K)
+        expected = logsumexp(discrete_logps(discrete, params))
+        assert logp(value_point(marginalized, params)) == pytest.approx(expected, rel=1e-10)
+
+
+@pytest.mark.parametrize("model_type", list(MODELS))
+def test_recovered_change_point_matches_the_enumerated_conditional(y, model_type):
+    build, pointwise_loglik, draws = MODELS[model_type]
+    discrete = build(y)
+    conditionals = np.array([
+        softmax(discrete_logps(discrete, {name: values[i] for name, values in draws.items()}))
+        for i in range(2)
+    ])
+
+    # Each parameter draw repeated, to check the cp draws against its conditional
+    repeats = 2000
+    posterior = {name: np.repeat(values, repeats)[np.newaxis] for name, values in draws.items()}
+    trace = recover_change_point(az.from_dict(posterior=posterior), y, pointwise_loglik, random_seed=0, chunk_size=300)
+
+    np.testing.assert_allclose(trace.cp_posterior["probability"].values, conditionals.mean(axis=0), atol=1e-10)
+    np.testing.assert_array_equal(trace.cp_posterior["cp_index"].values, CANDIDATES)
+
+    cp = trace.posterior["cp"].values.reshape(2, repeats)
+    for i in range(2):
+        frequencies = (cp[i][:, None] == CANDIDATES).mean(axis=0)
+        np.testing.assert_allclose(frequencies, conditionals[i], atol=0.03)
@@ -0,0 +1,73 @@
+import itertools
+
+import numpy as np
+import pytest
+from scipy.special import gammaln
+
+from modules.online_change_point import OnlineChangePointDetector
+
+PRIOR = {"mu0": 0.0, "kappa0": 1.0, "alpha0": 2.0, "beta0": 1.0}
+
+
+def segment_log_marginal(x, mu0, kappa0, alpha0, beta0):
+    """Closed-form log marginal likelihood of a Normal-Gamma segment."""
+    n = len(x)
+    kappa = kappa0 + n
+    alpha = alpha0 + n / 2
+    beta = beta0 + 0.5 * ((x - x.mean()) ** 2).sum() + kappa0 * n * (x.mean() - mu0) ** 2 / (2 * kappa)
+    return (
+        gammaln(alpha) - gammaln(alpha0) + alpha0 * np.log(beta0) - alpha * np.log(beta)
+        + 0.5 * np.log(kappa0 / kappa) - n / 2 * np.log(2 * np.pi)
+    )
+
+
+def brute_force_run_lengths(x, hazard):
+    """Run-length posterior after the last value, by enumerating every change pattern."""
+    t = len(x)
+    log_post = np.full(t + 1, -np.inf)
+    # changes[i]: a new regime starts after x[i]
+    for changes in itertools.product((False, True), repeat=t):
+        starts = [0] + [i + 1 for i in range(t - 1) if changes[i]]
+        ends = starts[1:] + [t]
+        log_p = sum(segment_log_marginal(x[a:b], **PRIOR) for a, b in zip(starts, ends))
+        log_p += sum(np.log(hazard) if c else np.log1p(-hazard) for c in changes)
+        run_length = 0 if changes[-1] else t - starts[-1]
+        log_post[run_length] = np.logaddexp(log_post[run_length], log_p)
+    return np.exp(log_post - np.logaddexp.reduce(log_post))
+
+
+def test_run_length_posterior_matches_enumeration():
+    x = np.array([0.3, -0.5, 0.1, 2.8, 3.4, 2.9, 3.1, -0.2])
+    hazard = 0.2
+    detector = OnlineChangePointDetector(hazard=hazard, prune_threshold=1e-300, **PRIOR)
+
+    for t in range(1, len(x) + 1):
+        detector.push(x[t - 1])
+        run_lengths, probs = detector.run_length_distribution()
+        np.testing.assert_array_equal(run_lengths, np.arange(t + 1))
+        np.testing.assert_allclose(probs, brute_force_run_lengths(x[:t], hazard), rtol=1e-9, atol=1e-15)
+
+
+def test_mean_shift_is_detected():
+    rng = np.random.default_rng(0)
+    y = np.concatenate([rng.normal(0.0, 0.01, 300), rng.normal(0.03, 0.01, 200)])
+    detector = OnlineChangePointDetector(hazard=1 / 250)
+
+    changes = []
+    for i, value in enumerate(y):
+        state = detector.push(value, i)
+        if state["change_point"]:
+            changes.append(state)
+
+    assert changes, "the shift was not detected"
+    first = changes[0]
+    assert 300 <= first["date"] <= 320
+    assert first["regime_start"] == pytest.approx(300, abs=3)
+    assert detector.state["regime_mean"] == pytest.approx(0.03, abs=0.005)
+
+
+@pytest.mark.parametrize("query", ["limit=abc", "limit=-1", "limit=2.5", "hazard=0.3"])
+def test_regime_route_rejects_invalid_arguments(query):
+    from app import app
+
+    assert app.test_client().get(f"/api/regime?{query}").status_code == 400
@@ -0,0 +1,79 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.panel import MAD_SCALE, align_calendar, build_panel, fill_gaps, outlier_mask, preprocess_panel
+
+
+@pytest.fixture
+def gappy():
+    rng = np.random.default_rng(0)
+    values = rng.uniform(50, 100, size=(300, 4))
+    values[rng.random(values.shape) < 0.3] = np.nan
+    values[:7, 1] = np.nan  # leading gap
+    values[100:130, 2] = np.nan  # long gap
+    values[:, 3] = np.nan  # asset without data
+    return values
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range("2020-01-01", periods=200)
+    brent = pd.Series(60 * np.exp(np.cumsum(rng.normal(0, 0.02, 200))), index=dates)
+    wti = brent.iloc[20:].drop(dates[[50, 51, 52, 90]]) * 0.95
+    # A weekend print, off the business-day calendar
+    wti[pd.Timestamp("2020-03-07")] = 40.0
+    return build_panel({"brent": brent, "wti": wti.sort_index()})
+
+
+@pytest.mark.parametrize("limit", [None, 1, 3, 10])
+def test_fill_gaps_matches_pandas_ffill(gappy, limit):
+    expected = pd.DataFrame(gappy).ffill(limit=limit).to_numpy()
+    np.testing.assert_array_equal(fill_gaps(gappy, limit=limit), expected)
+
+
+def test_fill_gaps_of_no_rows():
+    assert fill_gaps(np.empty((0, 3))).shape == (0, 3)
+
+
+def test_outlier_mask_uses_the_robust_scale(gappy):
+    returns = np.log(pd.DataFrame(gappy).ffill()).diff().to_numpy(copy=True)
+    returns[150, 0] = 5.0
+    returns[:, 2] = np.where(np.isnan(returns[:, 2]), np.nan, 0.0)  # unchanged prices: zero MAD
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        mask = outlier_mask(returns, threshold=8)
+
+    frame = pd.DataFrame(returns)
+    median = frame.median()
+    scale = MAD_SCALE * (frame - median).abs().median()
+    expected = ((frame - median).abs() > 8 * scale).to_numpy(copy=True)
+    expected[:, 2] = False
+    np.testing.assert_array_equal(mask, expected)
+    assert mask[150, 0] and not mask[:, 2:].any()
+
+
+@pytest.mark.parametrize("freq", ["B", "D", "W-FRI"])
+def test_align_calendar_matches_pandas_reindex(panel, freq):
+    calendar = pd.date_range(panel.index[0], panel.index[-1], freq=freq, name="date")
+    pd.testing.assert_frame_equal(align_calendar(panel, freq), panel.reindex(calendar), check_freq=False)
+
+
+def test_align_calendar_drops_off_calendar_prints(panel):
+    aligned = align_calendar(panel, "B")
+    assert pd.Timestamp("2020-03-07") not in aligned.index
+    assert aligned["wti"].isna().sum() == 20 + 4
+    assert align_calendar(panel, None) is panel
+
+
+def test_preprocess_panel_matches_a_pandas_pipeline(panel):
+    calendar = pd.bdate_range(panel.index[0], panel.index[-1], name="date")
+    prices = panel.reindex(calendar).ffill(limit=2)
+    expected = np.log(prices).diff().iloc[1:]
+
+    result = preprocess_panel(panel, fill_limit=2, outlier_threshold=None)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
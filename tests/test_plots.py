@@ -0,0 +1,123 @@
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import rendering
+from modules.rendering import fingerprint, render
+
+
+def png_size(body):
+    """Width and height from a PNG's IHDR chunk."""
+    assert body[:8] == b"\x89PNG\r\n\x1a\n"
+    return struct.unpack(">II", body[16:24])
+
+
+@pytest.fixture
+def fresh_memory(monkeypatch):
+    monkeypatch.setattr(rendering, "_memory", rendering.OrderedDict())
+
+
+def counting_draw(calls):
+    def draw(fig):
+        calls.append(fig)
+        fig.add_subplot().plot([0, 1], [1, 0])
+    return draw
+
+
+def test_fingerprint_hashes_content(tmp_path):
+    a = np.arange(10.0)
+    assert fingerprint(a) == fingerprint(a.copy())
+    assert fingerprint(a) != fingerprint(a[::-1].copy())
+    assert fingerprint(a) != fingerprint(a.astype(np.float32))
+    assert fingerprint(pd.Series(a)) == fingerprint(pd.Series(a.copy()))
+    assert fingerprint(pd.Series(a)) != fingerprint(pd.Series(a, index=a + 1))
+    assert fingerprint(("x", 1)) == fingerprint(["x", 1])
+
+    source = tmp_path / "prices.csv"
+    source.write_text("a")
+    before = fingerprint(source)
+    assert fingerprint(source) == before
+    os.utime(source, ns=(0, 0))
+    assert fingerprint(source) != before
+
+
+def test_render_draws_once_per_key(tmp_path, fresh_memory):
+    calls = []
+    first = render("demo", counting_draw(calls), key=("a",), cache_dir=tmp_path)
+    assert render("demo", counting_draw(calls), key=("a",), cache_dir=tmp_path) == first
+    assert len(calls) == 1
+
+    # A new process finds the render on disk
+    rendering._memory.clear()
+    assert render("demo", counting_draw(calls), key=("a",), cache_dir=tmp_path) == first
+    assert len(calls) == 1
+
+    render("demo", counting_draw(calls), key=("b",), cache_dir=tmp_path)
+    render("demo", counting_draw(calls), key=("a",), fmt="svg", cache_dir=tmp_path)
+    assert len(calls) == 3
+    assert len(list(tmp_path.iterdir())) == 3
+
+
+def test_dpi_is_part_of_the_key_and_the_size(tmp_path, fresh_memory):
+    calls = []
+    low = render("demo", counting_draw(calls), key=(), figsize=(4, 2), dpi=50, cache_dir=tmp_path)
+    high = render("demo", counting_draw(calls), key=(), figsize=(4, 2), dpi=100, cache_dir=tmp_path)
+    assert len(calls) == 2
+    assert png_size(low) == (200, 100)
+    assert png_size(high) == (400, 200)
+
+
+def test_disk_cache_is_pruned_to_the_most_recent(tmp_path, fresh_memory):
+    for i in range(5):
+        path = tmp_path / f"old-{i}.png"
+        path.write_bytes(b"")
+        os.utime(path, ns=(i, i))
+    (tmp_path / "notes.txt").write_text("kept")
+
+    rendering._prune(tmp_path, max_entries=2)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["notes.txt", "old-3.png", "old-4.png"]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, fresh_memory):
+    from app import app
+    from routes import plots
+
+    keys = []
+
+    def recording_render(name, draw, key, **kwargs):
+        keys.append((name, rendering.fingerprint(key), kwargs["fmt"], kwargs["dpi"]))
+        return render(name, draw, key, cache_dir=tmp_path, **kwargs)
+
+    monkeypatch.setattr(plots, "render", recording_render)
+    client = app.test_client()
+    client.keys = keys
+    return client
+
+
+@pytest.mark.parametrize("query", ["dpi=abc", "dpi=49", "dpi=301", "dpi=1e2", "dpi=-100", "format=gif"])
+def test_invalid_plot_arguments_are_400(client, query):
+    assert client.get(f"/api/plots/prices?{query}").status_code == 400
+    assert not client.keys
+
+
+def test_unknown_plots_and_types(client):
+    assert client.get("/api/plots/nope").status_code == 404
+    assert client.get("/api/plots/trace?type=nope").status_code == 400
+
+
+def test_prices_plot_keys(client):
+    # 2020-01-04 is a Saturday: both ranges start on the same price
+    saturday = client.get("/api/plots/prices?start_date=2020-01-04&end_date=2020-03-31&dpi=50")
+    monday = client.get("/api/plots/prices?start_date=2020-01-06&end_date=2020-03-31&dpi=50")
+    assert saturday.status_code == monday.status_code == 200
+    assert saturday.mimetype == "image/png"
+    assert saturday.data == monday.data
+    assert client.keys[0] == client.keys[1]
+
+    sharper = client.get("/api/plots/prices?start_date=2020-01-06&end_date=2020-03-31&dpi=100")
+    assert client.keys[2][1] == client.keys[0][1] and client.keys[2][3] == 100
+    assert png_size(sharper.data)[0] == 2 * png_size(monday.data)[0]
@@ -0,0 +1,59 @@
+import arviz as az
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.posterior_utils import hdi_from_counts, index_counts, summarize_posterior
+
+N = 300
+
+
+@pytest.fixture
+def samples():
+    # Two change points, 4 chains x 251 draws: 0.94 of 1004 samples is not a whole count
+    rng = np.random.default_rng(0)
+    first = np.rint(rng.normal(80, 6, size=(4, 251)))
+    second = np.rint(rng.gamma(4, 5, size=(4, 251)) + 180)
+    return np.stack([first, second], axis=-1).astype(np.int64)
+
+
+def test_counts_match_numpy_histogram(samples):
+    counts = index_counts(samples, N)
+    for i in range(samples.shape[-1]):
+        expected, _ = np.histogram(samples[..., i], bins=np.arange(N + 1) - 0.5)
+        np.testing.assert_array_equal(counts[i], expected)
+
+
+def test_out_of_range_indices_are_ignored():
+    samples = np.array([[[-1], [0], [4], [5], [4]]])
+    np.testing.assert_array_equal(index_counts(samples, 5), [[1, 0, 0, 0, 2]])
+
+
+@pytest.mark.parametrize("hdi_prob", [0.5, 0.9, 0.94])
+def test_hdi_matches_arviz(samples, hdi_prob):
+    bounds = hdi_from_counts(index_counts(samples, N), hdi_prob)
+    for i in range(samples.shape[-1]):
+        expected = az.hdi(samples[..., i].ravel().astype(float), hdi_prob=hdi_prob)
+        np.testing.assert_array_equal(bounds[i], expected)
+
+
+def test_hdi_is_the_narrowest_interval_with_the_mass():
+    counts = np.array([[0, 5, 1, 1, 1, 10, 2, 0], [0, 0, 0, 0, 0, 0, 0, 0]])
+    np.testing.assert_array_equal(hdi_from_counts(counts, 0.5), [[5, 5], [0, 0]])
+    np.testing.assert_array_equal(hdi_from_counts(counts, 0.8), [[1, 5], [0, 0]])
+
+
+def test_summary_maps_indices_to_dates(samples):
+    dates = pd.bdate_range("2010-01-01", periods=N)
+    post = summarize_posterior(samples, dates)
+
+    flat = samples.reshape(-1, 2)
+    np.testing.assert_allclose(post["mean"], flat.mean(axis=0))
+    np.testing.assert_allclose(post["probability"].sum(axis=1), 1.0)
+    for i in range(2):
+        values, counts = np.unique(flat[:, i], return_counts=True)
+        assert post["mode"][i] == values[counts.argmax()]
+        assert post["mode_probability"][i] == pytest.approx(counts.max() / len(flat))
+        assert post["mode_dates"][i] == str(dates[post["mode"][i]].date())
+    np.testing.assert_array_equal(post["indices"], np.unique(flat))
+    assert list(post["index_dates"]) == [str(dates[i].date()) for i in np.unique(flat)]
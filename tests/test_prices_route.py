@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from utils import loader
+
+
+@pytest.fixture
+def client():
+    from app import app
+
+    return app.test_client()
+
+
+def test_auto_downsamples_the_daily_series(client):
+    prices = loader.get_prices()["price"]
+    response = client.get("/api/prices?format=columnar&resolution=auto&max_points=300&method=minmax")
+    assert response.status_code == 200
+    assert response.headers["X-Resolution"] == "daily"
+
+    body = response.get_json()
+    assert len(body["price"]) <= 300
+    # The extremes the change points refer to survive, unlike with period closes
+    assert max(body["price"]) == prices.max()
+    assert min(body["price"]) == prices.min()
+    assert set(body["date"]) <= set(np.datetime_as_string(prices.index.values, unit="D"))
+
+
+def test_levels_serve_ohlc_without_a_price_line(client):
+    body = client.get("/api/prices?format=columnar&resolution=monthly").get_json()
+    assert "price" not in body
+    assert {"open", "high", "low", "close"} <= set(body)
+    assert max(body["high"]) == loader.get_prices()["price"].max()
+
+
+@pytest.mark.parametrize("query", ["max_points=abc", "max_points=2", "resolution=auto", "resolution=hourly"])
+def test_invalid_arguments_are_400(client, query):
+    assert client.get(f"/api/prices?{query}").status_code == 400
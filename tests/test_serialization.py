@@ -0,0 +1,88 @@
+import gzip
+import json
+
+import numpy as np
+import pyarrow as pa
+import pytest
+from flask import Flask
+
+from utils import serialization
+
+
+@pytest.fixture
+def columns():
+    return {
+        "date": np.array(["2020-01-01", "2020-01-02", "2020-01-03"], dtype="datetime64[ns]"),
+        "price": np.array([1.5, np.nan, 3.0]),
+        "count": np.array([1, 2, 3]),
+        "event": np.array(["a", None, "c"], dtype=object),
+    }
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def test_columnar_json(columns):
+    assert json.loads(serialization.to_columnar_json(columns)) == {
+        "date": ["2020-01-01", "2020-01-02", "2020-01-03"],
+        "price": [1.5, None, 3.0],
+        "count": [1, 2, 3],
+        "event": ["a", None, "c"],
+    }
+
+
+def test_records_json(columns):
+    records = json.loads(serialization.to_records_json(columns))
+    assert records[1] == {"date": "2020-01-02", "price": None, "count": 2, "event": None}
+    assert [r["price"] for r in records] == [1.5, None, 3.0]
+
+
+def test_arrow_round_trip(columns):
+    table = pa.ipc.open_stream(serialization.to_arrow_ipc(columns)).read_all()
+    assert table.schema.field("date").type == pa.date32()
+    assert table.column("price").to_pylist() == [1.5, None, 3.0]
+    assert table.column("count").to_pylist() == [1, 2, 3]
+    assert table.column("event").to_pylist() == ["a", None, "c"]
+
+
+def test_frame_columns_emits_index_first():
+    import pandas as pd
+
+    df = pd.DataFrame({"price": [1.0, 2.0]}, index=pd.to_datetime(["2020-01-01", "2020-01-02"]))
+    columns = serialization.frame_columns(df, index_name="date")
+    assert list(columns) == ["date", "price"]
+    np.testing.assert_array_equal(columns["date"], df.index.to_numpy())
+
+
+@pytest.mark.parametrize("query,headers,expected", [
+    ("", {}, "records"),
+    ("?format=columnar", {}, "columnar"),
+    ("", {"Accept": serialization.ARROW_MIMETYPE}, "arrow"),
+    ("?format=records", {"Accept": serialization.ARROW_MIMETYPE}, "records"),
+])
+def test_negotiate_format(app, query, headers, expected):
+    with app.test_request_context(f"/{query}", headers=headers):
+        assert serialization.negotiate_format() == expected
+
+
+def test_negotiate_format_rejects_unknown(app):
+    with app.test_request_context("/?format=xml"), pytest.raises(ValueError):
+        serialization.negotiate_format()
+
+
+def test_respond_compresses_large_bodies(app):
+    columns = {"price": np.arange(1000, dtype=np.float64)}
+    with app.test_request_context("/?format=columnar", headers={"Accept-Encoding": "gzip"}):
+        response = serialization.respond(columns)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.get_data())) == {"price": list(range(1000))}
+    assert {"Accept", "Accept-Encoding"} <= set(response.vary)
+
+
+def test_respond_leaves_small_bodies_uncompressed(app, columns):
+    with app.test_request_context("/", headers={"Accept-Encoding": "gzip"}):
+        response = serialization.respond(columns)
+    assert "Content-Encoding" not in response.headers
+    assert len(json.loads(response.get_data())) == 3
@@ -0,0 +1,77 @@
+import warnings
+
+import numpy as np
+import pytest
+from statsmodels.tools.sm_exceptions import InterpolationWarning
+from statsmodels.tsa.stattools import adfuller, kpss
+
+from modules.stationarity import (
+    adf_batch, expanding_windows, kpss_batch, regime_windows, rolling_windows, stationarity_table,
+)
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    walk = np.cumsum(rng.normal(size=200))
+    noise = rng.normal(size=200)
+    return np.concatenate([walk, noise + walk[-1]])
+
+
+@pytest.mark.parametrize("regression", ["n", "c", "ct"])
+@pytest.mark.parametrize("autolag", ["aic", "bic", None])
+def test_adf_batch_matches_statsmodels(series, regression, autolag):
+    windows = np.vstack([rolling_windows(len(series), 120, step=70), [[0, len(series)]]])
+    result = adf_batch(series, windows, regression=regression, autolag=autolag)
+
+    for i, (start, end) in enumerate(windows):
+        with warnings.catch_warnings():
+            # Newer statsmodels warns about its upcoming result object
+            warnings.simplefilter("ignore", FutureWarning)
+            stat, pvalue, lags, nobs, critical = adfuller(
+                series[start:end], regression=regression, autolag=autolag
+            )[:5]
+        assert result["lags"][i] == lags
+        assert result["nobs"][i] == nobs
+        assert result["statistic"][i] == pytest.approx(stat, rel=1e-6)
+        assert result["p_value"][i] == pytest.approx(pvalue, rel=1e-6, abs=1e-12)
+        np.testing.assert_allclose(result["critical"][i], [critical[k] for k in ("1%", "5%", "10%")])
+
+
+def test_adf_batch_short_and_constant_windows_are_nan(series):
+    x = series.copy()
+    x[:30] = 1.0
+    result = adf_batch(x, [[0, 30], [0, 4]], maxlag=2, autolag=None)
+    assert np.isnan(result["statistic"]).all()
+    assert result["lags"][1] == -1
+
+
+@pytest.mark.parametrize("regression", ["c", "ct"])
+@pytest.mark.parametrize("nlags", ["auto", "legacy", 4])
+def test_kpss_batch_matches_statsmodels(series, regression, nlags):
+    windows = np.vstack([rolling_windows(len(series), 120, step=70), expanding_windows(len(series), 300, 100)])
+    result = kpss_batch(series, windows, regression=regression, nlags=nlags)
+
+    for i, (start, end) in enumerate(windows):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", InterpolationWarning)
+            warnings.simplefilter("ignore", FutureWarning)
+            stat, pvalue, lags, critical = kpss(series[start:end], regression=regression, nlags=nlags)
+        assert result["lags"][i] == lags
+        assert result["statistic"][i] == pytest.approx(stat, rel=1e-9)
+        assert result["p_value"][i] == pytest.approx(pvalue)
+        np.testing.assert_allclose(result["critical"][i], [critical[k] for k in ("1%", "5%", "10%")])
+
+
+def test_regime_windows():
+    np.testing.assert_array_equal(regime_windows(100, [60, 10, 30], min_size=15), [[10, 30], [30, 60], [60, 100]])
+
+
+def test_stationarity_table_rows(series):
+    windows = rolling_windows(len(series), 120, step=70)
+    table = stationarity_table(series, windows, workers=1)
+    assert len(table) == 2 * len(windows)
+    adf = table[table["test"] == "adf"]
+    np.testing.assert_array_equal(adf["start"], windows[:, 0])
+    np.testing.assert_allclose(adf["statistic"], adf_batch(series, windows)["statistic"])
+    np.testing.assert_array_equal(adf["stationary"], adf["p_value"] < 0.05)
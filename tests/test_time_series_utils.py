@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.time_series_utils import (
+    compute_features, drawdowns, ewma, log_returns, rolling_mean_std, rolling_zscore,
+)
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(0)
+    values = 1500.0 * np.exp(np.cumsum(rng.normal(0.0, 0.02, 600)))
+    values[[50, 51, 300]] = np.nan
+    return values
+
+
+@pytest.mark.parametrize("window,min_periods", [(21, None), (21, 5), (None, None)])
+def test_rolling_mean_std_matches_pandas(prices, window, min_periods):
+    mean, std = rolling_mean_std(prices, window, min_periods=min_periods)
+    series = pd.Series(prices)
+    roll = series.expanding(min_periods or 1) if window is None else series.rolling(window, min_periods=min_periods)
+    np.testing.assert_allclose(mean, roll.mean(), rtol=1e-9)
+    np.testing.assert_allclose(std, roll.std(), rtol=1e-7)
+
+
+def test_rolling_mean_std_panel_and_float32(prices):
+    panel = np.column_stack([prices, prices[::-1] / 7.0])
+    mean, std = rolling_mean_std(panel.astype(np.float32), 30)
+    assert mean.dtype == np.float32 and mean.shape == panel.shape
+    expected = pd.DataFrame(panel).rolling(30)
+    np.testing.assert_allclose(mean, expected.mean(), rtol=1e-5)
+    np.testing.assert_allclose(std, expected.std(), rtol=1e-4)
+
+
+def test_rolling_zscore_matches_pandas(prices):
+    series = pd.Series(prices)
+    expected = (series - series.rolling(21).mean()) / series.rolling(21).std()
+    np.testing.assert_allclose(rolling_zscore(prices, 21), expected, rtol=1e-6)
+
+
+def test_ewma_matches_pandas(prices):
+    returns = log_returns(prices[:50])
+    mean, var = ewma(returns, span=10)
+    ewm = pd.Series(returns).ewm(span=10, adjust=False)
+    np.testing.assert_allclose(mean, ewm.mean(), rtol=1e-10)
+    np.testing.assert_allclose(var, ewm.var(bias=True), rtol=1e-8, atol=1e-15)
+
+
+def test_ewma_rejects_gaps_after_start():
+    with pytest.raises(ValueError):
+        ewma(np.array([np.nan, 1.0, np.nan, 2.0]), span=3)
+
+
+def test_compute_features_matches_pandas(prices):
+    prices = prices[:50]
+    features = compute_features(prices, window=10, span=5)
+    series = pd.Series(prices)
+    returns = np.log(series).diff()
+
+    np.testing.assert_allclose(features["log_return"], returns, rtol=1e-12)
+    np.testing.assert_allclose(features["volatility"], returns.rolling(10).std(), rtol=1e-7)
+    np.testing.assert_allclose(features["ewma_mean"], returns.ewm(span=5, adjust=False).mean(), rtol=1e-10)
+    np.testing.assert_allclose(features["drawdown"], series / series.cummax() - 1, rtol=1e-12)
+
+
+def test_drawdowns_skip_missing_prices():
+    drawdown, peak = drawdowns(np.array([1.0, 2.0, np.nan, 1.0, 3.0]))
+    np.testing.assert_allclose(peak, [1.0, 2.0, 2.0, 2.0, 3.0])
+    np.testing.assert_allclose(drawdown, [0.0, 0.0, np.nan, -0.5, 0.0])
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from modules.change_point_model import bayesian_variance_shift_model, update_fit
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(0)
+    y = np.concatenate([rng.normal(0.0, 0.5, 120), rng.normal(0.0, 2.0, 100)])
+    trace, _ = bayesian_variance_shift_model(y[:200], marginalized=True, random_seed=1, cache=True, cores=1)
+    return trace, y
+
+
+def test_update_matches_forced_refit(fitted):
+    trace, y = fitted
+    fractions = []
+    warm, _ = update_fit(trace, y, random_seed=2, cores=1)
+    forced, _ = update_fit(trace, y, force=True, random_seed=3, cores=1, progress=fractions.append)
+
+    assert warm.posterior.attrs["n_observations"] == forced.posterior.attrs["n_observations"] == len(y)
+    assert forced.posterior.attrs["update"] == "refit"
+    assert warm.posterior["cp"].shape == forced.posterior["cp"].shape
+    assert float(warm.posterior["cp"].median()) == pytest.approx(float(forced.posterior["cp"].median()), abs=3)
+    for name in ("sigma1", "sigma2"):
+        assert float(warm.posterior[name].mean()) == pytest.approx(float(forced.posterior[name].mean()), rel=0.1)
+    assert fractions == sorted(fractions) and fractions[-1] == pytest.approx(1.0)
+
+
+def test_update_requires_an_extension(fitted):
+    trace, y = fitted
+    with pytest.raises(ValueError):
+        update_fit(trace, y[::-1])
+    unchanged, _ = update_fit(trace, y[:200])
+    assert unchanged is trace